@@ -0,0 +1,432 @@
+import json
+import random
+import threading
+import time
+from collections import OrderedDict, deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, as_completed, wait
+from functools import lru_cache, partial
+
+from cache import make_key
+from metrics import METRICS
+from ratelimit import RateLimiter
+
+TONE_INSTRUCTIONS = {
+    "Friendly": "Write in a warm, conversational tone.",
+    "Formal": "Use a professional and respectful tone.",
+    "Data-driven": "Use language that emphasizes insights and value.",
+    "Short & Punchy": "Be concise, bold, and impactful."
+}
+FALLBACK_MESSAGE = "Hi {first_name}, I’d love to connect regarding insights relevant to {position} at {company}."
+SYSTEM_PROMPT = "You are a LinkedIn outreach assistant."
+MAX_TOKENS = 100
+# Packed generation (generate_messages with pack_size > 1) asks for several
+# messages per request. GPT-4's context window bounds the prompt plus
+# MAX_TOKENS of reply per lead; the number of leads per request starts at
+# PACK_START_SIZE and adapts so a reply takes about PACK_LATENCY_TARGET
+# seconds at most.
+CONTEXT_TOKENS = 8192
+PACK_START_SIZE = 2
+PACK_LATENCY_TARGET = 30.0
+# GPT-4 list prices in USD per token, used for the cost estimate only.
+PROMPT_TOKEN_PRICE = 0.03 / 1000
+COMPLETION_TOKEN_PRICE = 0.06 / 1000
+# openai (and aiohttp with it) takes about a second to import, so it is only
+# loaded when the first message is requested. set_api_key() stores the key
+# until then.
+_api_key = None
+
+
+def set_api_key(api_key):
+    global _api_key
+    _api_key = api_key
+
+
+def _openai():
+    import openai
+
+    if _api_key is not None:
+        openai.api_key = _api_key
+    return openai
+
+
+@lru_cache(maxsize=None)
+def retryable_errors():
+    openai = _openai()
+    return (
+        openai.error.RateLimitError, openai.error.APIError, openai.error.Timeout,
+        openai.error.ServiceUnavailableError, openai.error.APIConnectionError,
+    )
+
+
+class MessageCache:
+    # Bounded in-memory LRU in front of an optional on-disk tier (any object
+    # with get/set, normally a cache.SQLiteCache).
+    def __init__(self, max_entries=512, disk=None):
+        self.max_entries = max_entries
+        self.disk = disk
+        self.entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.lock = threading.Lock()
+
+    def get(self, key):
+        with self.lock:
+            if key in self.entries:
+                self.entries.move_to_end(key)
+                self.hits += 1
+                METRICS.inc("cache_lookups_total", cache="ai_messages", result="hit")
+                return self.entries[key]
+        value = self.disk.get(key) if self.disk is not None else None
+        METRICS.inc("cache_lookups_total", cache="ai_messages", result="miss" if value is None else "hit")
+        with self.lock:
+            if value is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+            self._remember(key, value)
+        return value
+
+    def set(self, key, value):
+        with self.lock:
+            self._remember(key, value)
+        if self.disk is not None:
+            self.disk.set(key, value)
+
+    def _remember(self, key, value):
+        self.entries[key] = value
+        self.entries.move_to_end(key)
+        while len(self.entries) > self.max_entries:
+            self.entries.popitem(last=False)
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "entries": len(self.entries),
+        }
+
+
+def build_prompt(first_name, position, company, tone=None, custom_instruction=None):
+    base_prompt = (
+        f"You're writing a LinkedIn connection request to {first_name}, "
+        f"who is a {position} at {company}."
+    )
+    tone_text = TONE_INSTRUCTIONS.get(tone, "") if tone else ""
+    custom_text = custom_instruction if custom_instruction else ""
+    return f"{base_prompt} {tone_text} {custom_text} Keep it under 250 characters."
+
+
+def build_packed_prompt(leads, tone=None, custom_instruction=None):
+    # leads is a sequence of (position, company); the reply is expected to be
+    # a JSON array with one {"id", "message"} object per lead, ids being the
+    # positions in leads.
+    tone_text = TONE_INSTRUCTIONS.get(tone, "") if tone else ""
+    custom_text = custom_instruction if custom_instruction else ""
+    people = "\n".join(
+        json.dumps({"id": index, "position": position, "company": company}, ensure_ascii=False)
+        for index, (position, company) in enumerate(leads)
+    )
+    return (
+        "Write one LinkedIn connection request for each person below. Address each of them as "
+        "{first_name}, written literally, since the name is filled in later. "
+        f"{tone_text} {custom_text} Keep each under 250 characters.\n"
+        'Reply with only a JSON array of objects {"id": <id>, "message": <text>}, one per person.\n'
+        f"{people}"
+    )
+
+
+def parse_packed_messages(reply, size):
+    # {id: message} for the well-formed entries of a packed reply. Entries
+    # that are missing, repeated, out of range or not a non-empty string are
+    # left out so the caller can ask again for those leads.
+    start, end = reply.find("["), reply.rfind("]")
+    try:
+        items = json.loads(reply[start:end + 1]) if 0 <= start < end else []
+    except ValueError:
+        return {}
+    messages = {}
+    for item in items if isinstance(items, list) else []:
+        if not isinstance(item, dict):
+            continue
+        index, message = item.get("id"), item.get("message")
+        if (type(index) is int and 0 <= index < size and index not in messages
+                and isinstance(message, str) and message.strip()):
+            messages[index] = message.strip()
+    return messages
+
+
+def _chat(prompt, max_tokens, stats=None):
+    try:
+        with METRICS.timer("openai_request_seconds"):
+            response = _openai().ChatCompletion.create(
+                model="gpt-4",
+                messages=[
+                    {"role": "system", "content": SYSTEM_PROMPT},
+                    {"role": "user", "content": prompt}
+                ],
+                temperature=0.9,
+                max_tokens=max_tokens
+            )
+    except Exception as e:
+        METRICS.inc("openai_requests_total", status=type(e).__name__)
+        raise
+    METRICS.inc("openai_requests_total", status="ok")
+    usage = response.get("usage", {})
+    METRICS.inc("openai_tokens_total", usage.get("prompt_tokens", 0), kind="prompt")
+    METRICS.inc("openai_tokens_total", usage.get("completion_tokens", 0), kind="completion")
+    if stats is not None:
+        stats.record_usage(usage)
+    return response['choices'][0]
+
+
+def request_ai_message(prompt, stats=None):
+    return _chat(prompt, MAX_TOKENS, stats)['message']['content'].strip()
+
+
+def request_packed_messages(prompt, size, stats=None):
+    # Returns (reply, complete); complete is False when the reply ran into
+    # max_tokens and was cut off.
+    choice = _chat(prompt, MAX_TOKENS * size, stats)
+    return choice['message']['content'], choice.get('finish_reason') != "length"
+
+
+def generate_ai_message(first_name, position, company, tone=None, custom_instruction=None, cache=None,
+                        refresh=False):
+    # refresh=True skips the lookup and overwrites the cached entry, so a new
+    # variant can still be requested for the same inputs.
+    key = make_key("ai-message", first_name, position, company, tone, custom_instruction or "")
+    if cache is not None and not refresh:
+        cached = cache.get(key)
+        if cached is not None:
+            return cached
+    try:
+        message = request_ai_message(build_prompt(first_name, position, company, tone, custom_instruction))
+    except Exception:
+        # Fallbacks are not cached so the next attempt asks the API again.
+        METRICS.inc("ai_fallbacks_total")
+        return FALLBACK_MESSAGE.format(first_name=first_name, position=position, company=company)
+    if cache is not None:
+        cache.set(key, message)
+    return message
+
+
+# === BATCH PERSONALIZATION ===
+
+class BatchStats:
+    def __init__(self):
+        self.leads = 0
+        self.unique_prompts = 0
+        self.cached = 0
+        self.requests = 0
+        self.retries = 0
+        self.failures = 0
+        self.requeued = 0
+        self.prompt_tokens = 0
+        self.completion_tokens = 0
+        self.latencies = []
+        self.lock = threading.Lock()
+
+    def record_usage(self, usage):
+        with self.lock:
+            self.prompt_tokens += usage.get("prompt_tokens", 0)
+            self.completion_tokens += usage.get("completion_tokens", 0)
+
+    def record_request(self, latency):
+        with self.lock:
+            self.requests += 1
+            self.latencies.append(latency)
+
+    @property
+    def cost(self):
+        return self.prompt_tokens * PROMPT_TOKEN_PRICE + self.completion_tokens * COMPLETION_TOKEN_PRICE
+
+    def summary(self):
+        latencies = sorted(self.latencies)
+        return {
+            "leads": self.leads,
+            "unique_prompts": self.unique_prompts,
+            "cached": self.cached,
+            "requests": self.requests,
+            "retries": self.retries,
+            "failures": self.failures,
+            "requeued": self.requeued,
+            "prompt_tokens": self.prompt_tokens,
+            "completion_tokens": self.completion_tokens,
+            "cost_usd": round(self.cost, 4),
+            "p50_latency_s": round(latencies[len(latencies) // 2], 3) if latencies else None,
+            "max_latency_s": round(latencies[-1], 3) if latencies else None,
+        }
+
+
+class PackSizer:
+    # Leads per packed request. Doubles after each clean reply until the
+    # first bad one, then grows by one lead per clean reply and halves on a
+    # reply that is slow, cut off or incomplete, so it settles just under
+    # the latency target.
+    def __init__(self, max_size, latency_target=PACK_LATENCY_TARGET, start=PACK_START_SIZE):
+        self.max_size = max_size
+        self.size = max(1, min(start, max_size))
+        self.latency_target = latency_target
+        self.slow_start = True
+        self.lock = threading.Lock()
+
+    def record(self, size, latency, complete):
+        with self.lock:
+            if complete and latency <= self.latency_target:
+                # Only a reply at the current size says the next one is safe.
+                if size >= self.size:
+                    self.size = min(self.max_size, self.size * 2 if self.slow_start else self.size + 1)
+            else:
+                self.slow_start = False
+                self.size = max(1, min(self.size, size) // 2)
+
+
+def _estimate_tokens(prompt, replies=1):
+    # Roughly four characters per token plus the system prompt and the reply.
+    return len(prompt) // 4 + 20 + MAX_TOKENS * replies
+
+
+def _request_with_retries(request, tokens, limiter, stats, max_retries):
+    # request(stats) makes one API call; tokens is its estimated cost.
+    for attempt in range(max_retries + 1):
+        if limiter is not None:
+            limiter.acquire(tokens)
+        start = time.monotonic()
+        try:
+            message = request(stats)
+        except retryable_errors():
+            with stats.lock:
+                stats.retries += attempt < max_retries
+            if attempt < max_retries:
+                METRICS.inc("openai_retries_total")
+                time.sleep(min(2 ** attempt, 30) + random.uniform(0, 0.5))
+            continue
+        except Exception:
+            break
+        stats.record_request(time.monotonic() - start)
+        return message
+    return None
+
+
+def _request_pack(prompt, size, sizer, stats=None):
+    start = time.monotonic()
+    reply, complete = request_packed_messages(prompt, size, stats)
+    messages = parse_packed_messages(reply, size)
+    sizer.record(size, time.monotonic() - start, complete and len(messages) == size)
+    return messages
+
+
+def _take_pack(queue, size, lines):
+    # Pops up to size keys off queue, fewer if their lines and replies would
+    # not fit in the context window.
+    keys = []
+    tokens = _estimate_tokens(build_packed_prompt([]), 0)
+    while queue and len(keys) < size:
+        cost = len(lines[queue[0]]) // 4 + MAX_TOKENS
+        if keys and tokens + cost > CONTEXT_TOKENS:
+            break
+        tokens += cost
+        keys.append(queue.popleft())
+    return keys
+
+
+def generate_messages(leads, tone=None, custom_instruction=None, cache=None, max_workers=4,
+                      tokens_per_minute=None, max_retries=3, stats=None, pack_size=1):
+    # leads is a sequence of (first_name, position, company). Leads sharing a
+    # (position, company) share one prompt written for a literal {first_name}
+    # placeholder, which is then filled in per lead. Yields (indices, messages)
+    # for each distinct prompt as soon as its message is available.
+    # With pack_size > 1, up to that many prompts go into one request (see
+    # PackSizer); prompts missing from a reply are asked for again, up to
+    # max_retries times each, before falling back.
+    stats = stats if stats is not None else BatchStats()
+    groups = {}
+    for index, (first_name, position, company) in enumerate(leads):
+        groups.setdefault((position, company), []).append((index, first_name))
+    stats.leads += sum(len(group) for group in groups.values())
+    stats.unique_prompts += len(groups)
+
+    def personalize(template, group):
+        return [index for index, _ in group], [template.replace("{first_name}", first_name or "") for _, first_name in group]
+
+    def finish(key, message):
+        position, company, group = pending[key]
+        if message is None:
+            METRICS.inc("ai_fallbacks_total")
+            with stats.lock:
+                stats.failures += 1
+            message = FALLBACK_MESSAGE.format(first_name="{first_name}", position=position, company=company)
+        elif cache is not None:
+            cache.set(key, message)
+        return personalize(message, group)
+
+    pending = {}
+    for (position, company), group in groups.items():
+        key = make_key("ai-message", "{first_name}", position, company, tone, custom_instruction or "")
+        cached = cache.get(key) if cache is not None else None
+        if cached is not None:
+            stats.cached += len(group)
+            yield personalize(cached, group)
+        else:
+            pending[key] = (position, company, group)
+    if not pending:
+        return
+
+    limiter = None
+    if tokens_per_minute:
+        limiter = RateLimiter(tokens_per_minute / 60, burst=max(tokens_per_minute / 6, MAX_TOKENS * 4))
+    executor = ThreadPoolExecutor(max_workers=max_workers)
+    try:
+        if pack_size > 1 and len(pending) > 1:
+            yield from _generate_packed(
+                pending, finish, executor, max_workers, limiter, stats, max_retries, pack_size, tone,
+                custom_instruction,
+            )
+            return
+        futures = {}
+        for key, (position, company, _) in pending.items():
+            prompt = build_prompt("{first_name}", position, company, tone, custom_instruction)
+            futures[executor.submit(
+                _request_with_retries, partial(request_ai_message, prompt), _estimate_tokens(prompt),
+                limiter, stats, max_retries,
+            )] = key
+        for future in as_completed(futures):
+            yield finish(futures[future], future.result())
+    finally:
+        executor.shutdown(wait=False, cancel_futures=True)
+
+
+def _generate_packed(pending, finish, executor, max_workers, limiter, stats, max_retries, pack_size, tone,
+                     custom_instruction):
+    # At most max_workers packed requests are in flight; each new one takes
+    # the sizer's current size, so the size adapts while the queue drains.
+    sizer = PackSizer(pack_size)
+    lines = {key: json.dumps([position, company], ensure_ascii=False) for key, (position, company, _) in pending.items()}
+    queue = deque(pending)
+    misses = dict.fromkeys(pending, 0)
+    running = {}
+    while queue or running:
+        while queue and len(running) < max_workers:
+            keys = _take_pack(queue, sizer.size, lines)
+            prompt = build_packed_prompt([pending[key][:2] for key in keys], tone, custom_instruction)
+            running[executor.submit(
+                _request_with_retries, partial(_request_pack, prompt, len(keys), sizer),
+                _estimate_tokens(prompt, len(keys)), limiter, stats, max_retries,
+            )] = keys
+        done, _ = wait(running, return_when=FIRST_COMPLETED)
+        for future in done:
+            keys = running.pop(future)
+            messages = future.result()
+            for index, key in enumerate(keys):
+                if messages is None or index in messages:
+                    yield finish(key, None if messages is None else messages[index])
+                elif misses[key] < max_retries:
+                    misses[key] += 1
+                    with stats.lock:
+                        stats.requeued += 1
+                    METRICS.inc("ai_requeued_total")
+                    queue.append(key)
+                else:
+                    yield finish(key, None)
@@ -1,22 +1,54 @@
 # === IMPORTS ===
 import streamlit as st
 import pandas as pd
-import requests
 import time
-from io import BytesIO
-import zipfile
+from functools import partial
 import os
-import openai
+from io import BytesIO
 from translations import TEXTS
-from jobpositions import JOB_KEYWORDS
+from hunter import HunterKeyPool, fetch_domains, hunter_keys, verify_emails
+from cache import SQLiteCache, make_key
+from ingest import ingest_file, normalize_domain
+from ai_messages import FALLBACK_MESSAGE, MessageCache, generate_ai_message, generate_messages, set_api_key
+from jobs import JobRegistry, QualificationJob
+from metrics import METRICS
+from leadview import PAGE_SIZES, apply_edits, matching_index, page_of
+from template import LINKEDIN_NOTE_LIMIT, MessageTemplate, message_issues, templatize
+from leads import build_salesflow_frame
+from leadstore import LeadStore, incremental_fetch
+from verify import MIN_CONFIDENCE
+from zapier import lead_payloads, make_session, send_leads
+from exports import (
+    CSV_NAME, HAS_XLSXWRITER, SUGARCRM_NAME, XLSX_NAME, ZIP_NAME,
+    build_csv, build_sugarcrm_csv, build_xlsx, build_zip, frame_hash, use_fast_xlsx,
+)
 
 # === STREAMLIT CONFIG ===
 st.set_page_config(page_title=" FC Lead Qualifier", layout="wide")
 
+# === STATIC ASSETS ===
+# Built once per process instead of on every rerun. The logos are shrunk to
+# their displayed width here; given the 1024px original, st.image would
+# decode and resize it again on each rerun.
+@st.cache_resource
+def load_logo(path, width):
+    from PIL import Image
+
+    image = Image.open(path)
+    if image.width > width:
+        image = image.resize((width, int(image.height * width / image.width)), resample=Image.BILINEAR)
+    buffer = BytesIO()
+    image.save(buffer, format="PNG")
+    return buffer.getvalue()
+
+@st.cache_resource
+def language_options():
+    return list(TEXTS.keys())
+
 # === LANGUAGE SELECTION ===
-st.sidebar.image("ecr_logo_resized.png", width=120)
-st.sidebar.image("ecr_logo_resized1.png", width=120)
-language = st.sidebar.selectbox("Choose your language:", list(TEXTS.keys()))
+st.sidebar.image(load_logo("ecr_logo_resized.png", 120), width=120)
+st.sidebar.image(load_logo("ecr_logo_resized1.png", 120), width=120)
+language = st.sidebar.selectbox("Choose your language:", language_options())
 TEXT = TEXTS[language]
 
 # === SESSION STATE SETUP ===
@@ -44,100 +76,140 @@ with st.expander("About this tool"):
     """)
 
 # === API CONFIG ===
-HUNTER_API_KEY = st.secrets["HUNTER_API_KEY"]
-openai.api_key = st.secrets["OPENAI_API_KEY"]
-PUBLIC_DOMAINS = ["gmail.com", "yahoo.com", "hotmail.com", "outlook.com"]
+# Several keys can be listed under HUNTER_API_KEYS; searches are spread over them.
+HUNTER_API_KEYS = hunter_keys(st.secrets)
+HUNTER_REQUESTS_PER_SECOND = st.secrets.get("HUNTER_REQUESTS_PER_SECOND", 10)
+HUNTER_MAX_WORKERS = st.secrets.get("HUNTER_MAX_WORKERS", 8)
+HUNTER_PAGE_SIZE = st.secrets.get("HUNTER_PAGE_SIZE", 10)
+HUNTER_MAX_PAGES = st.secrets.get("HUNTER_MAX_PAGES", 5)
+HUNTER_CACHE_PATH = st.secrets.get("HUNTER_CACHE_PATH", ".cache/hunter.sqlite")
+HUNTER_CACHE_TTL_HOURS = st.secrets.get("HUNTER_CACHE_TTL_HOURS", 168)
+HUNTER_CACHE_MAX_ENTRIES = st.secrets.get("HUNTER_CACHE_MAX_ENTRIES", 50000)
+set_api_key(st.secrets["OPENAI_API_KEY"])
+AI_CACHE_MAX_ENTRIES = st.secrets.get("AI_CACHE_MAX_ENTRIES", 512)
+AI_CACHE_PATH = st.secrets.get("AI_CACHE_PATH", "")
+AI_CACHE_TTL_HOURS = st.secrets.get("AI_CACHE_TTL_HOURS", 720)
+ZAPIER_MAX_WORKERS = st.secrets.get("ZAPIER_MAX_WORKERS", 8)
+ZAPIER_TIMEOUT = st.secrets.get("ZAPIER_TIMEOUT", 10)
+ZAPIER_MAX_RETRIES = st.secrets.get("ZAPIER_MAX_RETRIES", 3)
+AI_MAX_WORKERS = st.secrets.get("AI_MAX_WORKERS", 4)
+AI_TOKENS_PER_MINUTE = st.secrets.get("AI_TOKENS_PER_MINUTE", 10000)
+# Up to this many distinct prompts per OpenAI request; 1 sends one request each.
+AI_PACK_SIZE = st.secrets.get("AI_PACK_SIZE", 1)
+JOB_POLL_SECONDS = st.secrets.get("JOB_POLL_SECONDS", 1.0)
+LEAD_STORE_PATH = st.secrets.get("LEAD_STORE_PATH", ".cache/leads.sqlite")
+LEAD_STORE_FRESH_DAYS = st.secrets.get("LEAD_STORE_FRESH_DAYS", 30)
+# Email verification spends Hunter verification credits, so it is off unless enabled here or per run.
+VERIFY_EMAILS = st.secrets.get("VERIFY_EMAILS", False)
+VERIFY_MIN_CONFIDENCE = st.secrets.get("VERIFY_MIN_CONFIDENCE", MIN_CONFIDENCE)
+VERIFY_MAX_WORKERS = st.secrets.get("VERIFY_MAX_WORKERS", 8)
+VERIFY_CACHE_PATH = st.secrets.get("VERIFY_CACHE_PATH", ".cache/verify.sqlite")
+VERIFY_CACHE_TTL_HOURS = st.secrets.get("VERIFY_CACHE_TTL_HOURS", 720)
 
 # === FUNCTIONS ===
-def is_public_email(email):
-    return email.split('@')[-1].lower() in PUBLIC_DOMAINS
-
-def job_matches(position):
-    if not position:
-        return False
-    position = position.lower()
-    return any(keyword.lower() in position for keyword in JOB_KEYWORDS)
-
-def get_leads_from_hunter(domain):
-    url = f"https://api.hunter.io/v2/domain-search?domain={domain}&api_key={HUNTER_API_KEY}&limit=10"
-    response = requests.get(url)
-    if response.status_code != 200:
-        try:
-            error_text = response.json().get("errors", [{}])[0].get("details", "Unknown error")
-        except:
-            error_text = response.text
-        return [], f"Error fetching domain {domain}: {response.status_code} – {error_text}"
-    data = response.json()
-    emails = data.get("data", {}).get("emails", [])
-    company = data.get("data", {}).get("organization")
-    for email in emails:
-        email["company"] = company
-    return emails, None
-
-def filter_leads(leads):
-    qualified = []
-    for lead in leads:
-        email = lead.get("value")
-        position = lead.get("position")
-        linkedin = lead.get("linkedin") or lead.get("linkedin_url")
-        company = lead.get("company", "N/A")
-        if not email or is_public_email(email):
-            continue
-        if job_matches(position):
-            qualified.append({
-                "Email": email,
-                "Full Name": (lead.get("first_name") or "") + " " + (lead.get("last_name") or ""),
-                "Position": position,
-                "LinkedIn": linkedin,
-                "Company": company,
-                "Company Domain": lead.get("domain")
-            })
-    return qualified
-
-def split_full_name(full_name):
-    parts = full_name.strip().split()
-    return (parts[0], " ".join(parts[1:])) if parts else ("", "")
-
-def generate_ai_message(first_name, position, company, tone=None, custom_instruction=None):
-    base_prompt = (
-        f"You're writing a LinkedIn connection request to {first_name}, "
-        f"who is a {position} at {company}."
-    )
-
-    tone_instructions = {
-        "Friendly": "Write in a warm, conversational tone.",
-        "Formal": "Use a professional and respectful tone.",
-        "Data-driven": "Use language that emphasizes insights and value.",
-        "Short & Punchy": "Be concise, bold, and impactful."
-    }
-
-    tone_text = tone_instructions.get(tone, "") if tone else ""
-    custom_text = custom_instruction if custom_instruction else ""
-
-    prompt = f"{base_prompt} {tone_text} {custom_text} Keep it under 250 characters."
-
-    try:
-        response = openai.ChatCompletion.create(
-            model="gpt-4",
-            messages=[
-                {"role": "system", "content": "You are a LinkedIn outreach assistant."},
-                {"role": "user", "content": prompt}
-            ],
-            temperature=0.9,
-            max_tokens=100
-        )
-        return response['choices'][0]['message']['content'].strip()
-    except:
-        return f"Hi {first_name}, I’d love to connect regarding insights relevant to {position} at {company}."
-
-def send_to_zapier(lead):
-    zapier_url = st.secrets["ZAPIER_WEBHOOK_URL"]
-    try:
-        response = requests.post(zapier_url, json=lead)
-        return response.status_code == 200
-    except Exception as e:
-        st.error(f"Error sending to Zapier: {e}")
-        return False
+@st.cache_resource
+def get_hunter_cache():
+    return SQLiteCache(HUNTER_CACHE_PATH, ttl=HUNTER_CACHE_TTL_HOURS * 3600, max_entries=HUNTER_CACHE_MAX_ENTRIES)
+
+@st.cache_resource
+def get_verify_cache():
+    return SQLiteCache(VERIFY_CACHE_PATH, ttl=VERIFY_CACHE_TTL_HOURS * 3600)
+
+@st.cache_resource
+def get_message_cache():
+    disk = SQLiteCache(AI_CACHE_PATH, ttl=AI_CACHE_TTL_HOURS * 3600) if AI_CACHE_PATH else None
+    return MessageCache(max_entries=AI_CACHE_MAX_ENTRIES, disk=disk)
+
+# Parsed once per uploaded file and column instead of on every rerun.
+@st.cache_data(max_entries=4, show_spinner="Reading domains...")
+def ingest_upload(file_id, column, _file):
+    _file.seek(0)
+    return ingest_file(_file, column, _file.name)
+
+# Export builders are cached by a hash of the selected rows; the frame itself
+# is passed with a leading underscore so Streamlit does not hash it again.
+@st.cache_data(max_entries=16, show_spinner=False)
+def export_xlsx(rows_hash, fast, _df):
+    return build_xlsx(_df, fast=fast)
+
+@st.cache_data(max_entries=16, show_spinner=False)
+def export_csv(rows_hash, _df):
+    return build_csv(_df)
+
+@st.cache_data(max_entries=16, show_spinner=False)
+def export_zip(rows_hash, fast, _df):
+    return build_zip(export_xlsx(rows_hash, fast, _df), export_csv(rows_hash, _df))
+
+@st.cache_data(max_entries=16, show_spinner=False)
+def export_sugarcrm_csv(rows_hash, _df):
+    return build_sugarcrm_csv(_df)
+
+@st.cache_resource
+def get_lead_store():
+    return LeadStore(LEAD_STORE_PATH)
+
+@st.cache_resource
+def get_job_registry():
+    return JobRegistry()
+
+@st.cache_resource
+def get_zapier_session():
+    return make_session(ZAPIER_MAX_WORKERS)
+
+# === HUNTER CACHE ===
+hunter_cache_stats = get_hunter_cache().stats()
+st.sidebar.markdown("**Hunter cache**")
+st.sidebar.caption(
+    f"{hunter_cache_stats['entries']} cached searches · {hunter_cache_stats['hits']} hits / "
+    f"{hunter_cache_stats['misses']} misses ({hunter_cache_stats['hit_rate']:.0%} hit rate)"
+)
+if st.sidebar.button("Clear Hunter cache"):
+    get_hunter_cache().clear()
+    st.rerun()
+if "hunter_pool" in st.session_state:
+    st.sidebar.markdown("**Hunter keys**")
+    for key in st.session_state.hunter_pool.summary():
+        if key["dropped"]:
+            st.sidebar.caption(f"{key['key']}: dropped – {key['dropped']}")
+        else:
+            remaining = "unknown" if key["remaining"] is None else key["remaining"]
+            st.sidebar.caption(f"{key['key']}: {remaining} searches left · {key['used']} used this run")
+            if key["verified"]:
+                verifications = "unknown" if key["verifications"] is None else key["verifications"]
+                st.sidebar.caption(f"{key['key']}: {verifications} verifications left · {key['verified']} used this run")
+
+# === PERFORMANCE ===
+# Counters and latency histograms from every stage in this process (all sessions).
+with st.sidebar.expander("⏱ Performance"):
+    metrics_snapshot = METRICS.snapshot()
+    if metrics_snapshot["histograms"]:
+        st.dataframe(pd.DataFrame([
+            {
+                "stage": histogram["name"].removesuffix("_seconds"),
+                "labels": ", ".join(f"{name}={value}" for name, value in histogram["labels"].items()),
+                "count": histogram["count"], "mean s": histogram["mean_s"],
+                "p50 ≤ s": histogram["p50_s"], "p95 ≤ s": histogram["p95_s"],
+            }
+            for histogram in metrics_snapshot["histograms"]
+        ]), hide_index=True)
+    for cache_name, hit_rate in metrics_snapshot["cache_hit_rates"].items():
+        st.caption(f"{cache_name} cache hit rate: {hit_rate:.0%}")
+    if metrics_snapshot["counters"]:
+        st.dataframe(pd.DataFrame([
+            {
+                "counter": counter["name"],
+                "labels": ", ".join(f"{name}={value}" for name, value in counter["labels"].items()),
+                "value": counter["value"],
+            }
+            for counter in metrics_snapshot["counters"]
+        ]), hide_index=True)
+    else:
+        st.caption("No activity recorded yet.")
+    st.download_button("Export JSON", METRICS.to_json, file_name="metrics.json", mime="application/json")
+    st.download_button("Export Prometheus", METRICS.to_prometheus, file_name="metrics.prom", mime="text/plain")
+    if st.button("Reset metrics"):
+        METRICS.reset()
+        st.rerun()
 
 # === PAGE LAYOUT ===
 st.markdown(TEXT["step_1"])
@@ -148,13 +220,25 @@ if option == TEXT['manual_entry']:
     st.markdown(f"**{TEXT['enter_domain']}**")
     domain_input = st.text_input("e.g. ing.com")
     if domain_input:
-        domains.append(domain_input.strip())
+        domain = normalize_domain(domain_input)
+        if domain:
+            domains.append(domain)
+        else:
+            st.warning(f"'{domain_input.strip()}' does not look like a domain.")
 elif option == TEXT['upload_file']:
-    uploaded_file = st.file_uploader(TEXT['upload_instruction'], type="xlsx")
+    uploaded_file = st.file_uploader(TEXT['upload_instruction'], type=["xlsx", "csv"])
+    domain_column = st.text_input("Domain column (letter, header name or zero-based index)", value="B")
     if uploaded_file:
-        df_uploaded = pd.read_excel(uploaded_file)
-        domains = df_uploaded.iloc[:, 1].dropna().unique().tolist()
-        st.success(TEXT['uploaded_success'].format(n=len(domains)))
+        try:
+            domains, ingest_stats = ingest_upload(uploaded_file.file_id, domain_column, uploaded_file)
+        except ValueError as e:
+            st.error(str(e))
+        else:
+            st.success(TEXT['uploaded_success'].format(n=len(domains)))
+            st.caption(
+                f"{ingest_stats['rows']} rows read · {ingest_stats['duplicates']} duplicates collapsed · "
+                f"{ingest_stats['invalid']} invalid · {ingest_stats['empty']} empty"
+            )
 
 # === AI MESSAGE GENERATION ===
 if "ai_template" not in st.session_state:
@@ -170,8 +254,16 @@ with col2:
     tone = st.radio(TEXT["message_tone"], ["Friendly", "Formal", "Data-driven", "Short & Punchy"])
     custom_instruction = st.text_input(TEXT["custom_instruction"], placeholder="e.g. Mention we are macro research providers")
 
-if st.button(TEXT["generate_message"]):
-    ai_msg = generate_ai_message(test_first_name, test_position, test_company, tone, custom_instruction)
+col_generate, col_regenerate = st.columns(2)
+with col_generate:
+    generate_clicked = st.button(TEXT["generate_message"])
+with col_regenerate:
+    regenerate_clicked = st.button("🔄 Regenerate")
+if generate_clicked or regenerate_clicked:
+    ai_msg = generate_ai_message(
+        test_first_name, test_position, test_company, tone, custom_instruction,
+        cache=get_message_cache(), refresh=regenerate_clicked
+    )
     st.session_state.ai_template = ai_msg
     st.success(TEXT["ai_result"])
     st.info(ai_msg)
@@ -184,136 +276,287 @@ first_name = test_first_name
 position = test_position
 company = test_company
 
-preview_message = st.session_state.ai_template or generate_ai_message(first_name, position, company, tone, custom_instruction)
-default_template = preview_message.replace(first_name, "{first_name}").replace(position, "{position}").replace(company, "{company}")
+# Only the Generate button above calls the API; until then start from the static fallback.
+preview_message = st.session_state.ai_template or FALLBACK_MESSAGE.format(
+    first_name=first_name, position=position, company=company
+)
+default_template = templatize(preview_message, first_name, position, company)
 final_template = st.text_area("Custom message template", value=default_template)
+message_template = MessageTemplate(final_template)
+if message_template.unknown:
+    st.warning(
+        "These placeholders are not filled in and will be sent as written: "
+        + ", ".join("{" + name + "}" for name in message_template.unknown)
+        + ". Use {first_name}, {position} or {company}."
+    )
+sample_message = message_template.render_one(first_name=first_name, position=position, company=company)
+st.caption(f"Preview ({len(sample_message)}/{LINKEDIN_NOTE_LIMIT} characters): {sample_message}")
 
 # === RUN QUALIFICATION ===
 st.markdown(TEXT["step_4"])
+col_pages, col_cap = st.columns(2)
+with col_pages:
+    max_pages = st.number_input("Max Hunter pages per domain (0 = all)", min_value=0, value=HUNTER_MAX_PAGES, step=1)
+with col_cap:
+    max_qualified = st.number_input("Max qualified leads per domain (0 = no limit)", min_value=0, value=0, step=1)
+col_fresh, col_new = st.columns(2)
+with col_fresh:
+    fresh_days = st.number_input(
+        "Reuse stored results for domains checked in the last N days (0 = always query Hunter)",
+        min_value=0, value=LEAD_STORE_FRESH_DAYS, step=1,
+    )
+with col_new:
+    skip_known = st.checkbox("Only new leads", help="Leave out people already in the lead store from earlier runs.")
+col_verify, col_confidence = st.columns(2)
+with col_verify:
+    verify_each = st.checkbox(
+        "Verify emails before messages and export", value=VERIFY_EMAILS,
+        help="Checks addresses with Hunter's email verifier and drops invalid and disposable ones. "
+             "Uses one verification credit per address; verdicts are cached.",
+    )
+with col_confidence:
+    min_confidence = st.number_input(
+        "Skip verification from Hunter confidence", min_value=0, max_value=100,
+        value=VERIFY_MIN_CONFIDENCE, step=1, disabled=not verify_each,
+        help="Addresses Hunter's search scored at least this high are trusted without a verification.",
+    )
+personalize_each = st.checkbox(TEXT["use_ai"], help="Generates one AI message per qualified lead instead of using the template above.")
+
+# The run happens on a background thread owned by a process-wide registry,
+# so reruns from other widgets (template edits, exports) do not stop it. The
+# session only remembers the job id and polls it from a fragment.
+job_registry = get_job_registry()
 if st.button(TEXT["run_button"]) and domains:
-    all_qualified = []
-    with st.spinner(TEXT['processing']):
-        for idx, domain in enumerate(domains):
-            st.write(f"[{idx+1}/{len(domains)}] Processing domain: {domain}")
-            leads, error = get_leads_from_hunter(domain)
-            if error:
-                st.error(error)
-                continue
-            qualified = filter_leads(leads)
-            st.success(TEXT["qualified_count"].format(domain=domain, count=len(qualified)))
-            all_qualified.extend(qualified)
-            time.sleep(1.5)
-
-    if all_qualified:
-        df_qualified = pd.DataFrame(all_qualified)
-        st.session_state.df_qualified = df_qualified
-        records = []
-        for lead in all_qualified:
-            first_name, last_name = split_full_name(lead["Full Name"])
-            company = lead["Company"]
-            position = lead["Position"]
-            message = final_template.format(
-                first_name=first_name,
-                position=position,
-                company=company
+    current_job = job_registry.get(st.session_state.get("job_id"))
+    if current_job is not None and current_job.running:
+        st.warning("A qualification run is already in progress. Cancel it first to start a new one.")
+    else:
+        # Remaining searches are checked per key before every run.
+        with st.spinner("Checking Hunter API keys..."):
+            hunter_pool = HunterKeyPool(HUNTER_API_KEYS, HUNTER_REQUESTS_PER_SECOND).refresh()
+        st.session_state.hunter_pool = hunter_pool
+        if not hunter_pool.live:
+            st.error("None of the Hunter API keys can be used (invalid or out of searches).")
+        else:
+            if hunter_pool.remaining is not None and hunter_pool.remaining < len(domains):
+                st.warning(f"Only {hunter_pool.remaining} Hunter searches left for {len(domains)} domains.")
+            fetch = partial(
+                fetch_domains, api_key=hunter_pool, requests_per_second=HUNTER_REQUESTS_PER_SECOND,
+                max_workers=HUNTER_MAX_WORKERS, cache=get_hunter_cache(), page_size=HUNTER_PAGE_SIZE,
+                max_pages=max_pages or None, max_qualified=max_qualified or None,
+            )
+            fetch = partial(
+                incremental_fetch, fetch, get_lead_store(), max_age=fresh_days * 86400, skip_known=skip_known
             )
-            records.append({
-                "First Name": first_name,
-                "Last Name": last_name,
-                "LinkedIn URL": lead["LinkedIn"],
-                "Company": company,
-                "Job Title": position,
-                "Email": lead["Email"],
-                "Company Domain": lead["Company Domain"],
-                "Personalized Message": message
-            })
-
-        df_salesflow = pd.DataFrame(records)
-        df_salesflow["Select"] = pd.Series([False] * len(df_salesflow), dtype=bool)
-        st.session_state.df_salesflow = df_salesflow
+            personalize = None
+            if personalize_each:
+                personalize = partial(
+                    generate_messages, tone=tone, custom_instruction=custom_instruction, cache=get_message_cache(),
+                    max_workers=AI_MAX_WORKERS, tokens_per_minute=AI_TOKENS_PER_MINUTE, pack_size=AI_PACK_SIZE,
+                )
+            verify = None
+            if verify_each:
+                verify = partial(
+                    verify_emails, api_key=hunter_pool, requests_per_second=HUNTER_REQUESTS_PER_SECOND,
+                    max_workers=VERIFY_MAX_WORKERS, cache=get_verify_cache(),
+                )
+            new_job = job_registry.add(QualificationJob(
+                domains, fetch, message_template, personalize, verify=verify, min_confidence=min_confidence,
+            ).start())
+            st.session_state.job_id = new_job.id
+
+def show_job(job):
+    if job.running:
+        if job.stage == "hunter":
+            st.progress(job.done / max(job.total, 1), text=f"{TEXT['processing']} {job.done}/{job.total} domains")
+        elif job.stage == "verify":
+            st.progress(
+                job.verify_done / max(job.verify_total, 1),
+                text=f"Verified {job.verify_done}/{job.verify_total} email addresses",
+            )
+        else:
+            st.progress(
+                job.messages_done / max(job.messages_total, 1),
+                text=f"Personalized {job.messages_done}/{job.messages_total} messages",
+            )
+        if st.button("⏹ Cancel run", disabled=job.cancelled):
+            job.cancel()
+        if job.cancelled:
+            st.caption("Cancelling... leads qualified so far will be kept.")
+    for domain, count, error in job.recent:
+        if error:
+            st.error(error)
+        else:
+            st.write(f"Processed domain: {domain} – {TEXT['qualified_count'].format(domain=domain, count=count)}")
+    if job.errors:
+        st.caption(f"{len(job.errors)} domain(s) failed so far.")
+    if job.running and job.qualified_count:
+        st.dataframe(job.partial_qualified(), use_container_width=True)
+    if job.status == "failed":
+        st.error(f"Qualification run failed: {job.error}")
+        if job.df_salesflow is not None:
+            st.caption(f"{len(job.df_salesflow)} lead(s) qualified before the failure are kept below.")
+    elif not job.running:
+        elapsed = (job.finished or time.time()) - job.started
+        st.caption(f"Run {job.status}: {job.done}/{job.total} domains, {job.qualified_count} qualified leads in {elapsed:.0f}s")
+        if job.verify_stats is not None:
+            verify_stats = job.verify_stats
+            st.caption(
+                f"Email verification: {verify_stats['verified']} checked, {verify_stats['unchecked']} kept unchecked "
+                f"(high confidence or not reached), {verify_stats['rejected']} invalid or disposable removed, "
+                f"{verify_stats['errors']} errors"
+            )
+        if job.ai_stats is not None:
+            summary = job.ai_stats.summary()
+            st.caption(
+                f"AI messages: {summary['unique_prompts']} distinct prompts for {summary['leads']} leads · "
+                f"{summary['requests']} API calls, {summary['cached']} cached, {summary['retries']} retries, "
+                f"{summary['requeued']} re-queued, "
+                f"{summary['failures']} fallbacks · p50 latency {summary['p50_latency_s']}s · "
+                f"~${summary['cost_usd']:.2f}"
+            )
+    # Hand the results to the rest of the page once, then rerun the whole app
+    # so the export step picks them up.
+    if not job.running and st.session_state.get("job_collected") != job.id:
+        st.session_state.job_collected = job.id
+        if job.verdicts:
+            get_lead_store().record_verification(job.verdicts)
+        if job.df_salesflow is not None:
+            st.session_state.df_qualified = job.df_qualified
+            st.session_state.df_salesflow = job.df_salesflow
+            st.session_state.selected_leads = set()
+        st.rerun()
+
+current_job = job_registry.get(st.session_state.get("job_id"))
+if current_job is not None:
+    st.fragment(show_job, run_every=JOB_POLL_SECONDS if current_job.running else None)(current_job)
+
+# === LEAD STORE ===
+with st.expander("📚 Lead store"):
+    store_stats = get_lead_store().stats()
+    st.caption(
+        f"{store_stats['leads']} leads from {store_stats['domains']} searched domains, kept across sessions. "
+        "Addresses the email verifier found invalid or disposable are not listed."
+    )
+    col_company, col_title = st.columns(2)
+    with col_company:
+        store_company = st.text_input("Company or domain contains")
+    with col_title:
+        store_title = st.text_input("Job title contains")
+    stored_leads = get_lead_store().search(company=store_company, title=store_title)
+    st.dataframe(stored_leads, use_container_width=True)
+    if not stored_leads.empty and st.button("Use these leads for export"):
+        st.session_state.df_qualified = stored_leads
+        st.session_state.df_salesflow = build_salesflow_frame(stored_leads, message_template)
+        st.session_state.selected_leads = set()
+        st.rerun()
 
 # === EXPORT UI + ZAPIER ===
 if "df_salesflow" in st.session_state and not st.session_state.df_salesflow.empty:
     st.markdown(TEXT["step_5"])
-    st.markdown("✅ Use the checkboxes below to select leads to export or send via Zapier.")
-
-    # 👇 Work with a clean local copy
-    df_export = st.session_state.df_salesflow.copy()
-
-    # Ensure Select column is bool type
-    if "Select" not in df_export.columns:
-        df_export["Select"] = False
-    df_export["Select"] = df_export["Select"].astype(bool)
-
-    # ✅ Move Select to first column
-    cols = df_export.columns.tolist()
-    if "Select" in cols:
-        cols.insert(0, cols.pop(cols.index("Select")))
-        df_export = df_export[cols]
-
-    # Render editable table
-    edited_df = st.data_editor(
-        df_export,
+    st.markdown("✅ Filter the leads and use the checkboxes to select the ones to export or send via Zapier.")
+
+    # Only the current page is sent to the browser. The selection is a set of
+    # row labels in session state, so a rerun costs one filter pass and one
+    # page, whatever the lead count.
+    df_salesflow = st.session_state.df_salesflow
+    selected = st.session_state.setdefault("selected_leads", set())
+    # Checked once per result set rather than on every rerun.
+    if st.session_state.get("issues_for") is not df_salesflow:
+        st.session_state.issues_for = df_salesflow
+        st.session_state.lead_issues = message_issues(df_salesflow["Personalized Message"], df_salesflow["First Name"])
+    lead_issues = st.session_state.lead_issues
+    issue_count = int((lead_issues != "").sum())
+    if issue_count:
+        st.warning(
+            f"⚠️ {issue_count} message(s) need attention (missing first name or over LinkedIn's "
+            f"{LINKEDIN_NOTE_LIMIT}-character limit). They are still included; see the Issues column."
+        )
+    col_company, col_title, col_search = st.columns(3)
+    with col_company:
+        filter_companies = st.multiselect(
+            "Company", sorted(df_salesflow["Company"].dropna().unique()), key="lead_filter_companies"
+        )
+    with col_title:
+        filter_title = st.text_input("Job title contains", key="lead_filter_title")
+    with col_search:
+        filter_search = st.text_input("Search name, email, company or title", key="lead_filter_search")
+    matching = matching_index(df_salesflow, filter_companies, filter_title, filter_search)
+
+    col_all, col_none, col_clear, col_size = st.columns(4)
+    with col_all:
+        if st.button(f"Select all matching ({len(matching)})"):
+            selected.update(matching)
+            st.session_state.editor_version = st.session_state.get("editor_version", 0) + 1
+    with col_none:
+        if st.button("Deselect matching"):
+            selected.difference_update(matching)
+            st.session_state.editor_version = st.session_state.get("editor_version", 0) + 1
+    with col_clear:
+        if st.button("Clear selection"):
+            selected.clear()
+            st.session_state.editor_version = st.session_state.get("editor_version", 0) + 1
+    with col_size:
+        page_size = st.selectbox("Rows per page", PAGE_SIZES, index=1, key="lead_page_size")
+    page_count = page_of(matching, 1, page_size)[1]
+    page = st.number_input(
+        f"Page (of {page_count})", min_value=1, max_value=page_count, value=1, step=1, key="lead_page"
+    )
+    page_labels, _ = page_of(matching, page, page_size)
+
+    page_df = df_salesflow.loc[page_labels]
+    page_df.insert(0, "Select", page_labels.isin(list(selected)))
+    page_df.insert(1, "Issues", lead_issues.loc[page_labels])
+    # A fresh key per page, filter and bulk action, so old checkbox edits
+    # never get replayed onto different rows.
+    editor_key = "lead_editor_" + make_key(
+        page, page_size, filter_companies, filter_title, filter_search, st.session_state.get("editor_version", 0)
+    )
+    st.data_editor(
+        page_df,
         use_container_width=True,
-        key="lead_export_editor",
-        column_config={
-            "Select": st.column_config.CheckboxColumn(label="Select", default=False)
-        }
+        hide_index=True,
+        key=editor_key,
+        disabled=[column for column in page_df.columns if column != "Select"],
+        column_config={"Select": st.column_config.CheckboxColumn(label="Select", default=False)},
+        on_change=lambda: apply_edits(selected, page_labels, st.session_state[editor_key]["edited_rows"]),
     )
 
-    # Filter selected rows
-    selected_leads_df = edited_df[edited_df["Select"]]
-
-    st.caption(f"✅ You selected {len(selected_leads_df)} lead(s).")
+    st.caption(
+        f"✅ You selected {len(selected)} lead(s) · {len(matching)} of {len(df_salesflow)} match the filters · "
+        f"showing {len(page_labels)}."
+    )
 
     # Only show buttons if something is selected
-    if not selected_leads_df.empty:
+    if selected:
         # === EXPORT LOGIC ===
-        buffer_xlsx = BytesIO()
-        selected_leads_df.drop(columns=["Select"]).to_excel(buffer_xlsx, index=False)
-
-        buffer_csv = BytesIO()
-        selected_leads_df.drop(columns=["Select"]).to_csv(buffer_csv, index=False, encoding="utf-8-sig")
-
-        zip_buffer = BytesIO()
-        with zipfile.ZipFile(zip_buffer, "w") as zipf:
-            zipf.writestr("salesflow_leads_selected.xlsx", buffer_xlsx.getvalue())
-            zipf.writestr("salesflow_leads_selected.csv", buffer_csv.getvalue())
-
-        df_sugarcrm = selected_leads_df.rename(columns={
-            "First Name": "first_name",
-            "Last Name": "last_name",
-            "Job Title": "title",
-            "Company": "account_name",
-            "LinkedIn URL": "linkedin_c",
-            "Personalized Message": "description"
-        }).drop(columns=["Select"])
-
-        buffer_sugar_csv = BytesIO()
-        df_sugarcrm.to_csv(buffer_sugar_csv, index=False, encoding="utf-8-sig")
-
-        st.download_button("⬇️ Download Excel", data=buffer_xlsx.getvalue(), file_name="qualified_leads_selected.xlsx")
-        st.download_button("⬇️ Download CSV", data=buffer_csv.getvalue(), file_name="salesflow_leads_selected.csv")
-        st.download_button("⬇️ Download ZIP", data=zip_buffer.getvalue(), file_name="lead_outputs_selected.zip")
-        st.download_button("⬇️ Download SugarCRM CSV", data=buffer_sugar_csv.getvalue(), file_name="sugarcrm_leads_selected.csv")
+        # Files are only built when a download button is clicked, and cached
+        # per selection so repeated downloads of the same rows are instant.
+        export_df = df_salesflow[df_salesflow.index.isin(list(selected))]
+        export_hash = frame_hash(export_df)
+        fast_xlsx = st.checkbox(
+            "Fast Excel writer", value=use_fast_xlsx(len(export_df)), disabled=not HAS_XLSXWRITER,
+            help="Writes the .xlsx with xlsxwriter, which is much quicker for large selections."
+        )
+
+        st.download_button("⬇️ Download Excel", data=partial(export_xlsx, export_hash, fast_xlsx, export_df), file_name=XLSX_NAME)
+        st.download_button("⬇️ Download CSV", data=partial(export_csv, export_hash, export_df), file_name=CSV_NAME)
+        st.download_button("⬇️ Download ZIP", data=partial(export_zip, export_hash, fast_xlsx, export_df), file_name=ZIP_NAME)
+        st.download_button("⬇️ Download SugarCRM CSV", data=partial(export_sugarcrm_csv, export_hash, export_df), file_name=SUGARCRM_NAME)
 
         # === ZAPIER BUTTON ===
         if st.button("📤 Send Selected Leads to SugarCRM via Zapier"):
-            zap_success = 0
-            for _, row in selected_leads_df.iterrows():
-                zapier_payload = {
-                    "first_name": row["First Name"],
-                    "last_name": row["Last Name"],
-                    "email": row["Email"],
-                    "job_title": row["Job Title"],
-                    "company": row["Company"],
-                    "linkedin_url": row["LinkedIn URL"],
-                    "message": row["Personalized Message"],
-                    "domain": row["Company Domain"]
-                }
-                if send_to_zapier(zapier_payload):
-                    zap_success += 1
-            st.success(f"✅ {zap_success}/{len(selected_leads_df)} selected leads sent to SugarCRM.")
+            with st.spinner("Sending leads to Zapier..."):
+                reports = send_leads(
+                    st.secrets["ZAPIER_WEBHOOK_URL"], lead_payloads(export_df), max_workers=ZAPIER_MAX_WORKERS,
+                    timeout=ZAPIER_TIMEOUT, max_retries=ZAPIER_MAX_RETRIES, session=get_zapier_session()
+                )
+            zap_success = sum(report["success"] for report in reports)
+            st.success(f"✅ {zap_success}/{len(export_df)} selected leads sent to SugarCRM.")
+            if zap_success < len(reports):
+                st.error(f"{len(reports) - zap_success} lead(s) could not be delivered; see the report below.")
+            with st.expander("Delivery report"):
+                st.dataframe(pd.DataFrame(reports), use_container_width=True)
     else:
         st.info("⚠️ No leads selected yet. Select at least one to show download and Zapier options.")
 
@@ -0,0 +1,97 @@
+# Compares the compiled job-title matcher against the old per-call substring
+# scan over a synthetic, labelled title corpus.
+#
+#     python -m benchmarks.job_matcher --titles 200000
+import argparse
+import random
+import time
+from collections import Counter
+
+from jobpositions import JOB_KEYWORDS, match_job_title
+
+SENIORITY = ["", "Senior ", "Junior ", "Lead ", "Deputy ", "Interim ", "Associate "]
+SUFFIXES = ["", " EMEA", " - Benelux", " (Retail)", " at Group Level", ", Corporate Banking"]
+# Relevant titles written the way they show up in Dutch profiles.
+COMPOUNDS = [
+    "Treasurymanager", "Portfoliomanager", "Assetmanager", "Hoofd Treasury", "Multi-assetstrateeg",
+    "Senior Treasuryanalist", "Portfoliobeheerder", "Assetmanagement Specialist",
+]
+UNRELATED = [
+    "Software Engineer", "Equipment Specialist", "Fashion Designer", "Farm Manager", "Platform Engineer",
+    "Customer Support Agent", "Office Manager", "HR Business Partner", "Warehouse Operative", "Nurse",
+    "Firmware Developer", "UX Researcher", "Safety Inspector", "Pharmacist", "Marketing Coordinator",
+    "Storm Water Engineer", "Facilities Coordinator", "Chef", "Graphic Designer", "Recruiter",
+]
+
+
+def legacy_job_matches(position):
+    if not position:
+        return False
+    position = position.lower()
+    return any(keyword.lower() in position for keyword in JOB_KEYWORDS)
+
+
+def legacy_keyword(position):
+    position = position.lower()
+    return next(keyword for keyword in JOB_KEYWORDS if keyword.lower() in position)
+
+
+def make_corpus(size, seed=42):
+    # Returns (title, relevant) pairs.
+    rng = random.Random(seed)
+    corpus = []
+    for _ in range(size):
+        draw = rng.random()
+        if draw < 0.35:
+            title, relevant = rng.choice(JOB_KEYWORDS), True
+        elif draw < 0.45:
+            title, relevant = rng.choice(COMPOUNDS), True
+        else:
+            title, relevant = rng.choice(UNRELATED), False
+        corpus.append((rng.choice(SENIORITY) + title + rng.choice(SUFFIXES), relevant))
+    return corpus
+
+
+def timed(fn, titles):
+    start = time.perf_counter()
+    results = [bool(fn(title)) for title in titles]
+    return time.perf_counter() - start, results
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--titles", type=int, default=200000)
+    parser.add_argument("--examples", type=int, default=10)
+    args = parser.parse_args()
+
+    corpus = make_corpus(args.titles)
+    titles = [title for title, _ in corpus]
+    legacy_time, legacy = timed(legacy_job_matches, titles)
+    compiled_time, compiled = timed(match_job_title, titles)
+
+    rows = list(zip(corpus, legacy, compiled))
+    removed_false = [title for (title, relevant), old, new in rows if old and not new and not relevant]
+    lost_true = [title for (title, relevant), old, new in rows if old and not new and relevant]
+    gained_true = [title for (title, relevant), old, new in rows if new and not old and relevant]
+    added_false = [title for (title, relevant), old, new in rows if new and not old and not relevant]
+    missed_by_both = [title for (title, relevant), old, new in rows if relevant and not old and not new]
+
+    print(f"titles:                 {len(titles):,} ({sum(relevant for _, relevant in corpus):,} relevant)")
+    print(f"legacy substring scan   {legacy_time:8.3f}s  ({len(titles) / legacy_time:,.0f} titles/s)")
+    print(f"compiled matcher        {compiled_time:8.3f}s  ({len(titles) / compiled_time:,.0f} titles/s)")
+    print(f"speedup                 {legacy_time / compiled_time:8.1f}x")
+    print(f"false positives removed {len(removed_false):8,}")
+    print(f"true matches lost       {len(lost_true):8,}")
+    print(f"true matches gained     {len(gained_true):8,}")
+    print(f"false positives added   {len(added_false):8,}")
+    print(f"relevant, missed by both{len(missed_by_both):8,}")
+    culprits = Counter(legacy_keyword(title) for title in removed_false)
+    for keyword, count in culprits.most_common(args.examples):
+        example = next(title for title in removed_false if legacy_keyword(title) == keyword)
+        print(f"  removed {keyword!r:10} {count:7,}  e.g. {example!r}")
+    for title, count in Counter(lost_true).most_common(args.examples):
+        print(f"  lost    {count:7,}  {title!r}")
+
+
+if __name__ == "__main__":
+    main()
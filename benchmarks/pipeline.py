@@ -0,0 +1,197 @@
+# End-to-end throughput of the lead pipeline against the local stubs in
+# benchmarks.stubs, so no API credits are spent:
+#
+#     python -m benchmarks.pipeline --sizes 10 1000 50000 --latency 0.05 --hunter-429-rate 0.01
+#
+# Each size runs Hunter fetch + filter, email verification, message
+# rendering, per-lead AI messages and the Zapier send (the last three capped
+# at --stage-limit leads), and the xlsx/csv exports. Peak memory is the process's peak RSS (which only
+# grows, so sizes run smallest first); --tracemalloc reports the Python
+# allocation peak per size instead but slows everything down several times,
+# so only compare runs made with the same flags. With --processes N the
+# Hunter stage runs sharded over N worker processes (pipeline.run_sharded);
+# per-domain latencies are then measured inside the workers and not
+# reported.
+import argparse
+import os
+import resource
+import statistics
+import tempfile
+import time
+import tracemalloc
+from functools import partial, wraps
+
+import openai
+import pandas as pd
+
+import hunter
+from ai_messages import BatchStats, FALLBACK_MESSAGE, generate_messages
+from benchmarks.stubs import start_stub_process
+from exports import build_csv, build_xlsx, use_fast_xlsx
+from leads import build_salesflow_frame, qualified_frame
+from pipeline import Checkpoint, run_sharded
+from verify import MIN_CONFIDENCE, verify_leads
+from zapier import lead_payloads, send_leads
+
+
+def percentile(values, q):
+    if not values:
+        return 0.0
+    values = sorted(values)
+    return values[min(len(values) - 1, int(q * len(values)))]
+
+
+def timed_qualify_domain(latencies):
+    # fetch_domains looks qualify_domain up at call time, so wrapping the
+    # module attribute gives exact per-domain latencies.
+    original = hunter.qualify_domain
+
+    @wraps(original)
+    def qualify_domain(*args, **kwargs):
+        start = time.perf_counter()
+        try:
+            return original(*args, **kwargs)
+        finally:
+            latencies.append(time.perf_counter() - start)
+    return original, qualify_domain
+
+
+def run_size(size, args, zapier_url):
+    domains = [f"company{i}.example" for i in range(size)]
+    latencies = []
+    stages = {}
+    original, hunter.qualify_domain = timed_qualify_domain(latencies)
+    if args.tracemalloc:
+        tracemalloc.start()
+    start = time.perf_counter()
+    try:
+        if args.processes > 1:
+            with tempfile.TemporaryDirectory() as directory:
+                checkpoint = Checkpoint(os.path.join(directory, "checkpoint.jsonl"))
+                try:
+                    qualified, shard_errors = run_sharded(
+                        domains, ["stub-key"], checkpoint, args.processes,
+                        requests_per_second=args.requests_per_second, max_workers=args.workers,
+                        page_size=args.page_size, max_pages=args.max_pages, api_base=hunter.HUNTER_API_BASE,
+                    )
+                finally:
+                    checkpoint.close()
+            errors = len(shard_errors)
+        else:
+            leads = []
+            errors = 0
+            for _, qualified, error in hunter.fetch_domains(
+                domains, "stub-key", args.requests_per_second, args.workers,
+                page_size=args.page_size, max_pages=args.max_pages,
+            ):
+                errors += bool(error)
+                leads.extend(qualified)
+            qualified = qualified_frame(leads)
+        stages["hunter"] = time.perf_counter() - start
+
+        mark = time.perf_counter()
+        verify = partial(
+            hunter.verify_emails, api_key="stub-key", requests_per_second=args.requests_per_second,
+            max_workers=args.workers,
+        )
+        verified, verify_stats = verify_leads(qualified.head(args.stage_limit), verify, args.min_confidence)
+        qualified = pd.concat([verified, qualified.iloc[args.stage_limit:]], ignore_index=True)
+        stages["verify"] = time.perf_counter() - mark
+
+        mark = time.perf_counter()
+        df_salesflow = build_salesflow_frame(qualified, FALLBACK_MESSAGE)
+        stages["render"] = time.perf_counter() - mark
+
+        sample = df_salesflow.head(args.stage_limit)
+        mark = time.perf_counter()
+        ai_stats = BatchStats()
+        leads = list(zip(sample["First Name"], sample["Job Title"], sample["Company"]))
+        for _ in generate_messages(leads, max_workers=args.ai_workers, stats=ai_stats, pack_size=args.ai_pack_size):
+            pass
+        stages["ai"] = time.perf_counter() - mark
+
+        mark = time.perf_counter()
+        xlsx = build_xlsx(df_salesflow, fast=use_fast_xlsx(len(df_salesflow)))
+        csv = build_csv(df_salesflow)
+        stages["export"] = time.perf_counter() - mark
+
+        mark = time.perf_counter()
+        reports = send_leads(zapier_url, lead_payloads(sample), max_workers=args.zapier_workers)
+        stages["zapier"] = time.perf_counter() - mark
+        elapsed = time.perf_counter() - start
+        if args.tracemalloc:
+            peak = tracemalloc.get_traced_memory()[1]
+        else:
+            peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024  # kB on Linux
+    finally:
+        tracemalloc.stop()
+        hunter.qualify_domain = original
+
+    return {
+        "domains": size,
+        "leads": len(df_salesflow),
+        "errors": errors,
+        "elapsed": elapsed,
+        "domains_per_s": size / stages["hunter"],
+        "leads_per_s": len(df_salesflow) / elapsed,
+        "p50_ms": percentile(latencies, 0.5) * 1000,
+        "p99_ms": percentile(latencies, 0.99) * 1000,
+        "mean_ms": statistics.fmean(latencies) * 1000 if latencies else 0.0,
+        "peak_mb": peak / 2 ** 20,
+        "export_mb": (len(xlsx) + len(csv)) / 2 ** 20,
+        "verified": verify_stats["verified"],
+        "rejected": verify_stats["rejected"],
+        "ai_requests": ai_stats.requests,
+        "zapier_sent": sum(report["success"] for report in reports),
+        "stages": stages,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10, 1000, 50000])
+    parser.add_argument("--latency", type=float, default=0.02, help="seconds each stub waits per request")
+    parser.add_argument("--hunter-429-rate", type=float, default=0.0)
+    parser.add_argument("--openai-429-rate", type=float, default=0.0)
+    parser.add_argument("--zapier-failure-rate", type=float, default=0.0)
+    parser.add_argument("--max-emails", type=int, default=25, help="people per stub domain (uniform 0..N)")
+    parser.add_argument("--page-size", type=int, default=hunter.PAGE_SIZE)
+    parser.add_argument("--max-pages", type=int, default=5)
+    parser.add_argument("--requests-per-second", type=float, default=2000)
+    parser.add_argument("--workers", type=int, default=32, help="Hunter threads (per process with --processes)")
+    parser.add_argument("--processes", type=int, default=1, help="shard the Hunter stage over this many processes")
+    parser.add_argument("--ai-workers", type=int, default=8)
+    parser.add_argument("--ai-pack-size", type=int, default=1, help="distinct prompts per OpenAI request")
+    parser.add_argument("--zapier-workers", type=int, default=16)
+    parser.add_argument("--min-confidence", type=int, default=MIN_CONFIDENCE)
+    parser.add_argument("--tracemalloc", action="store_true", help="measure the Python allocation peak per size")
+    parser.add_argument("--stage-limit", type=int, default=2000, help="leads sent through the AI and Zapier stages")
+    args = parser.parse_args()
+
+    hunter_stub, hunter_url = start_stub_process(
+        "hunter", latency=args.latency, failure_rate=args.hunter_429_rate, seed=1, max_emails=args.max_emails
+    )
+    openai_stub, openai_url = start_stub_process(
+        "openai", latency=args.latency, failure_rate=args.openai_429_rate, seed=2
+    )
+    zapier_stub, zapier_url = start_stub_process(
+        "zapier", latency=args.latency, failure_rate=args.zapier_failure_rate, seed=3
+    )
+    hunter.HUNTER_API_BASE = f"{hunter_url}/v2"
+    openai.api_base = f"{openai_url}/v1"
+    openai.api_key = "stub-key"
+
+    print(f"{'domains':>8} {'leads':>8} {'errors':>6} {'total s':>8} {'dom/s':>8} {'leads/s':>8} "
+          f"{'p50 ms':>7} {'p99 ms':>7} {'peak MB':>8}  stages (s)")
+    for size in args.sizes:
+        result = run_size(size, args, f"{zapier_url}/hooks/catch")
+        stages = " ".join(f"{name}={seconds:.2f}" for name, seconds in result["stages"].items())
+        print(f"{result['domains']:>8,} {result['leads']:>8,} {result['errors']:>6} {result['elapsed']:>8.2f} "
+              f"{result['domains_per_s']:>8.1f} {result['leads_per_s']:>8.1f} {result['p50_ms']:>7.1f} "
+              f"{result['p99_ms']:>7.1f} {result['peak_mb']:>8.1f}  {stages}")
+    for stub in (hunter_stub, openai_stub, zapier_stub):
+        stub.terminate()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,88 @@
+# Time to first render of the Streamlit app and of a plain rerun, measured
+# with streamlit's AppTest. Every sample runs in a fresh interpreter so the
+# first render pays for the app's imports like a cold server would:
+#
+#     python -m benchmarks.startup --samples 5
+#
+# Streamlit itself is imported, and AppTest warmed up on an empty script,
+# before the clock starts, since the server has done both before any
+# session exists. The caches and the lead store
+# live in a temporary directory and the API keys are dummies; nothing
+# talks to the network until a button is pressed.
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+# Imported only when their feature is used; listed so a regression shows.
+HEAVY_MODULES = ["openai", "openpyxl", "aiohttp", "xlsxwriter"]
+
+
+def measure(reruns=3):
+    # One sample in this process: seconds for the first run and each rerun,
+    # plus which of HEAVY_MODULES the app loaded.
+    from streamlit.testing.v1 import AppTest
+
+    AppTest.from_string("import streamlit as st", default_timeout=60).run()
+    preloaded = {name for name in HEAVY_MODULES if name in sys.modules}
+    with tempfile.TemporaryDirectory() as directory:
+        app = AppTest.from_file(os.path.join(ROOT, "app.py"), default_timeout=60)
+        app.secrets.update({
+            "OPENAI_API_KEY": "startup-benchmark",
+            "HUNTER_API_KEY": "startup-benchmark",
+            "HUNTER_CACHE_PATH": os.path.join(directory, "hunter.sqlite"),
+            "LEAD_STORE_PATH": os.path.join(directory, "leads.sqlite"),
+        })
+        start = time.perf_counter()
+        app.run()
+        first = time.perf_counter() - start
+        timings = []
+        for _ in range(reruns):
+            start = time.perf_counter()
+            app.run()
+            timings.append(time.perf_counter() - start)
+        exceptions = [exception.value for exception in app.exception]
+    return {
+        "first_run": first,
+        "reruns": timings,
+        "loaded": [name for name in HEAVY_MODULES if name in sys.modules and name not in preloaded],
+        "exceptions": exceptions,
+    }
+
+
+def measure_fresh(reruns=3):
+    # measure() in a new interpreter, so imports are not already cached.
+    output = subprocess.run(
+        [sys.executable, "-m", "benchmarks.startup", "--child", "--reruns", str(reruns)],
+        cwd=ROOT, capture_output=True, text=True, check=True,
+    ).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--samples", type=int, default=5)
+    parser.add_argument("--reruns", type=int, default=3)
+    parser.add_argument("--child", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    if args.child:
+        print(json.dumps(measure(args.reruns)))
+        return
+
+    samples = [measure_fresh(args.reruns) for _ in range(args.samples)]
+    first = [sample["first_run"] * 1000 for sample in samples]
+    reruns = [timing * 1000 for sample in samples for timing in sample["reruns"]]
+    print(f"first render  median {statistics.median(first):7.1f} ms  min {min(first):7.1f} ms")
+    print(f"rerun         median {statistics.median(reruns):7.1f} ms  min {min(reruns):7.1f} ms")
+    print(f"heavy modules loaded at startup: {', '.join(samples[-1]['loaded']) or 'none'}")
+    for exception in samples[-1]["exceptions"]:
+        print(f"app raised: {exception}")
+
+
+if __name__ == "__main__":
+    main()
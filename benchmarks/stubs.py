@@ -0,0 +1,207 @@
+# Local stand-ins for the external services, for offline testing.
+#
+#     python -m benchmarks.stubs zapier --port 8765 --failure-rate 0.1
+#
+# then point ZAPIER_WEBHOOK_URL at http://127.0.0.1:8765/hooks/catch. The
+# hunter stub serves http://127.0.0.1:<port>/v2 (hunter.HUNTER_API_BASE) and
+# the openai stub http://127.0.0.1:<port>/v1 (openai.api_base). For those two
+# the failure rate is the share of requests answered with a 429.
+import argparse
+import hashlib
+import json
+import multiprocessing
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+
+# Verifier statuses the fake Hunter hands out, spread evenly per address.
+STUB_STATUSES = ["valid", "valid", "valid", "valid", "accept_all", "unknown", "invalid", "disposable"]
+# Titles the fake Hunter people get; roughly half are relevant.
+STUB_POSITIONS = [
+    "CFO", "Treasury Manager", "Senior Portfolio Manager", "Head of Risk", "Financial Controller",
+    "Software Engineer", "Office Manager", "Recruiter", "Marketing Coordinator", "Chef",
+]
+
+
+class StubServer(ThreadingHTTPServer):
+    daemon_threads = True
+    request_queue_size = 256  # the default listen backlog of 5 drops connections under load
+
+    def __init__(self, handler, port=0, latency=0.0, failure_rate=0.0, seed=None):
+        super().__init__(("127.0.0.1", port), handler)
+        self.latency = latency
+        self.failure_rate = failure_rate
+        self.random = random.Random(seed)
+        self.received = []
+        self.requests = 0
+        self.lock = threading.Lock()
+
+    @property
+    def url(self):
+        return f"http://127.0.0.1:{self.server_port}"
+
+    def start(self):
+        threading.Thread(target=self.serve_forever, daemon=True).start()
+        return self
+
+    def should_fail(self):
+        with self.lock:
+            self.requests += 1
+            return self.random.random() < self.failure_rate
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    def log_message(self, format, *args):
+        pass
+
+    def send_json(self, status, body, headers=None):
+        payload = json.dumps(body).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(payload)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def read_json(self):
+        length = int(self.headers.get("Content-Length") or 0)
+        return json.loads(self.rfile.read(length) or b"{}")
+
+
+class ZapierHandler(StubHandler):
+    # Accepts any POST like a Zapier catch hook; failures answer 503.
+    def do_POST(self):
+        payload = self.read_json()
+        if self.server.latency:
+            time.sleep(self.server.latency)
+        if self.server.should_fail():
+            self.send_json(503, {"status": "error"})
+            return
+        with self.server.lock:
+            self.server.received.append(payload)
+        self.send_json(200, {"status": "success", "attempt": len(self.server.received)})
+
+
+class HunterHandler(StubHandler):
+    # /v2/domain-search pages through a fixed, per-domain set of people, so
+    # repeated runs see the same data; /v2/email-verifier gives each address
+    # a fixed status; /v2/account reports a large quota.
+    def do_GET(self):
+        url = urlsplit(self.path)
+        params = {name: values[0] for name, values in parse_qs(url.query).items()}
+        if self.server.latency:
+            time.sleep(self.server.latency)
+        if url.path.endswith("/account"):
+            self.send_json(200, {"data": {"requests": {
+                "searches": {"used": 0, "available": 10 ** 9}, "verifications": {"used": 0, "available": 10 ** 9},
+            }}})
+            return
+        if self.server.should_fail():
+            self.send_json(429, {"errors": [{"id": "too_many_requests", "details": "Slow down"}]}, {"Retry-After": "0"})
+            return
+        if url.path.endswith("/email-verifier"):
+            email = params.get("email", "")
+            seed = int(hashlib.md5(email.encode("utf-8")).hexdigest()[:8], 16)
+            self.send_json(200, {"data": {"email": email, "status": STUB_STATUSES[seed % len(STUB_STATUSES)]}})
+            return
+        domain = params.get("domain", "")
+        limit, offset = int(params.get("limit", 10)), int(params.get("offset", 0))
+        seed = int(hashlib.md5(domain.encode("utf-8")).hexdigest()[:8], 16)
+        total = seed % (self.server.max_emails + 1)
+        emails = [
+            {
+                "value": f"person{i}@{domain}", "first_name": f"Person{i}", "last_name": "Stub",
+                "position": STUB_POSITIONS[(seed + i) % len(STUB_POSITIONS)],
+                "linkedin": f"https://www.linkedin.com/in/{domain}-{i}" if i % 2 else None,
+                "confidence": (seed + 7 * i) % 101,
+            }
+            for i in range(offset, min(offset + limit, total))
+        ]
+        self.send_json(200, {
+            "data": {"domain": domain, "organization": domain.split(".")[0].title(), "emails": emails},
+            "meta": {"results": total, "limit": limit, "offset": offset},
+        })
+
+
+class OpenAIHandler(StubHandler):
+    # /v1/chat/completions answering with a short canned message and usage,
+    # or for a packed prompt (ai_messages.build_packed_prompt) a JSON array
+    # with one message per person listed.
+    def do_POST(self):
+        payload = self.read_json()
+        if self.server.latency:
+            time.sleep(self.server.latency)
+        if self.server.should_fail():
+            self.send_json(429, {"error": {"message": "Rate limit reached", "type": "requests"}})
+            return
+        prompt = payload["messages"][-1]["content"]
+        with self.server.lock:
+            self.server.received.append(prompt)
+        people = [json.loads(line)["id"] for line in prompt.splitlines() if line.startswith('{"id"')]
+        content = "Hi {first_name}, great to connect!"
+        if people:
+            content = json.dumps([{"id": index, "message": content} for index in people])
+        completion_tokens = 12 * max(1, len(people))
+        self.send_json(200, {
+            "id": "chatcmpl-stub", "object": "chat.completion", "model": payload.get("model"),
+            "choices": [{
+                "index": 0, "finish_reason": "stop",
+                "message": {"role": "assistant", "content": content},
+            }],
+            "usage": {"prompt_tokens": len(prompt) // 4, "completion_tokens": completion_tokens,
+                      "total_tokens": len(prompt) // 4 + completion_tokens},
+        })
+
+
+def start_zapier_stub(port=0, latency=0.0, failure_rate=0.0, seed=None):
+    return StubServer(ZapierHandler, port, latency, failure_rate, seed).start()
+
+
+def start_hunter_stub(port=0, latency=0.0, failure_rate=0.0, seed=None, max_emails=25):
+    server = StubServer(HunterHandler, port, latency, failure_rate, seed)
+    server.max_emails = max_emails
+    return server.start()
+
+
+def start_openai_stub(port=0, latency=0.0, failure_rate=0.0, seed=None):
+    return StubServer(OpenAIHandler, port, latency, failure_rate, seed).start()
+
+
+STUBS = {"hunter": start_hunter_stub, "openai": start_openai_stub, "zapier": start_zapier_stub}
+
+
+def _serve(service, options, urls):
+    urls.put(STUBS[service](**options).url)
+    threading.Event().wait()
+
+
+def start_stub_process(service, **options):
+    # Runs a stub in its own process so it does not compete with the code
+    # under test for the GIL. Returns (process, base_url).
+    urls = multiprocessing.Queue()
+    process = multiprocessing.Process(target=_serve, args=(service, options, urls), daemon=True)
+    process.start()
+    return process, urls.get(timeout=10)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("service", choices=sorted(STUBS))
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--latency", type=float, default=0.0)
+    parser.add_argument("--failure-rate", type=float, default=0.0)
+    args = parser.parse_args()
+    server = STUBS[args.service](args.port, args.latency, args.failure_rate)
+    print(f"{args.service} stub listening on {server.url}")
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
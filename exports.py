@@ -0,0 +1,71 @@
+import hashlib
+import zipfile
+from importlib.util import find_spec
+from io import BytesIO
+
+import pandas as pd
+
+from metrics import METRICS
+
+SUGARCRM_COLUMNS = {
+    "First Name": "first_name",
+    "Last Name": "last_name",
+    "Job Title": "title",
+    "Company": "account_name",
+    "LinkedIn URL": "linkedin_c",
+    "Personalized Message": "description"
+}
+XLSX_NAME = "qualified_leads_selected.xlsx"
+CSV_NAME = "salesflow_leads_selected.csv"
+ZIP_NAME = "lead_outputs_selected.zip"
+SUGARCRM_NAME = "sugarcrm_leads_selected.csv"
+# Above this many rows the xlsx is written with xlsxwriter (when installed)
+# in constant-memory mode, which is several times faster than openpyxl.
+FAST_XLSX_THRESHOLD = 2000
+HAS_XLSXWRITER = find_spec("xlsxwriter") is not None
+
+
+def frame_hash(df):
+    digest = hashlib.sha256(pd.util.hash_pandas_object(df, index=False).values.tobytes())
+    digest.update(repr(list(df.columns)).encode("utf-8"))
+    return digest.hexdigest()
+
+
+def use_fast_xlsx(row_count):
+    return HAS_XLSXWRITER and row_count > FAST_XLSX_THRESHOLD
+
+
+def build_xlsx(df, fast=False):
+    buffer = BytesIO()
+    with METRICS.timer("export_build_seconds", format="xlsx_fast" if fast and HAS_XLSXWRITER else "xlsx"):
+        if fast and HAS_XLSXWRITER:
+            df.to_excel(buffer, index=False, engine="xlsxwriter", engine_kwargs={"options": {"constant_memory": True}})
+        else:
+            df.to_excel(buffer, index=False)
+    return buffer.getvalue()
+
+
+def _write_csv(df):
+    buffer = BytesIO()
+    df.to_csv(buffer, index=False, encoding="utf-8-sig")
+    return buffer.getvalue()
+
+
+def build_csv(df):
+    with METRICS.timer("export_build_seconds", format="csv"):
+        return _write_csv(df)
+
+
+def build_sugarcrm_csv(df):
+    with METRICS.timer("export_build_seconds", format="sugarcrm_csv"):
+        return _write_csv(df.rename(columns=SUGARCRM_COLUMNS))
+
+
+def build_zip(xlsx_bytes, csv_bytes):
+    # Packs the already-built xlsx and csv instead of rendering them again.
+    buffer = BytesIO()
+    with METRICS.timer("export_build_seconds", format="zip"):
+        with zipfile.ZipFile(buffer, "w", compression=zipfile.ZIP_DEFLATED) as zipf:
+            zipf.writestr("salesflow_leads_selected.xlsx", xlsx_bytes)
+            zipf.writestr("salesflow_leads_selected.csv", csv_bytes)
+    return buffer.getvalue()
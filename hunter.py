@@ -0,0 +1,426 @@
+import random
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from cache import make_key
+from leads import filter_leads
+from metrics import METRICS
+from ratelimit import RateLimiter
+from zapier import make_session
+
+HUNTER_API_BASE = "https://api.hunter.io/v2"
+MAX_RETRIES = 5
+REQUEST_TIMEOUT = 30
+PAGE_SIZE = 10
+# One keep-alive connection pool shared by every Hunter request;
+# fetch_domains and verify_emails grow it to their worker count.
+SESSION = make_session()
+_session_size = 8
+_session_lock = threading.Lock()
+
+
+class HunterError(Exception):
+    def __init__(self, message, status=None):
+        super().__init__(message)
+        self.status = status
+
+
+def _retry_delay(response, attempt):
+    retry_after = response.headers.get("Retry-After")
+    try:
+        return max(float(retry_after), 0.5)
+    except (TypeError, ValueError):
+        return min(2 ** attempt, 30) + random.uniform(0, 0.5)
+
+
+def _size_session(pool_size):
+    global _session_size
+    with _session_lock:
+        if pool_size > _session_size:
+            adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+            SESSION.mount("http://", adapter)
+            SESSION.mount("https://", adapter)
+            _session_size = pool_size
+
+
+def _json(response, what):
+    # A 200 with a body that is not JSON (an HTML error page from a proxy,
+    # say) fails this one request instead of the whole run.
+    try:
+        return response.json()
+    except ValueError:
+        raise HunterError(f"Error {what}: response is not valid JSON", response.status_code)
+
+
+def _error_text(response):
+    try:
+        return response.json().get("errors", [{}])[0].get("details", "Unknown error")
+    except Exception:
+        return response.text
+
+
+def _key_unusable(response):
+    # An invalid key, or one whose monthly searches are used up. Plain rate
+    # limiting (429 without a usage-limit message) is retried instead.
+    if response.status_code == 401:
+        return True
+    if response.status_code in (403, 429):
+        return "usage limit" in _error_text(response).lower()
+    return False
+
+
+def account_info(api_key):
+    # Hunter's /account payload; raises HunterError. Does not use any credits.
+    try:
+        with METRICS.timer("hunter_request_seconds", endpoint="account"):
+            response = SESSION.get(f"{HUNTER_API_BASE}/account", params={"api_key": api_key}, timeout=REQUEST_TIMEOUT)
+    except requests.RequestException as e:
+        raise HunterError(f"Error checking Hunter account: {e}")
+    if response.status_code != 200:
+        raise HunterError(
+            f"Error checking Hunter account: {response.status_code} – {_error_text(response)}", response.status_code
+        )
+    return _json(response, "checking Hunter account").get("data", {})
+
+
+# Monthly Hunter budget -> the HunterKey attribute holding what is left of it.
+BUDGETS = {"searches": "remaining", "verifications": "verifications"}
+NO_SEARCHES_LEFT = "no searches left this month"
+
+
+class HunterKey:
+    def __init__(self, api_key, requests_per_second):
+        self.api_key = api_key
+        self.limiter = RateLimiter(requests_per_second)
+        self.remaining = None  # searches left this month; None when unknown
+        self.verifications = None  # email verifications left this month; None when unknown
+        self.used = 0
+        self.verified = 0
+        self.dropped = None  # reason the key was taken out of rotation
+
+    @property
+    def label(self):
+        return f"{self.api_key[:4]}…{self.api_key[-4:]}" if len(self.api_key) > 8 else "…"
+
+
+def hunter_keys(secrets):
+    # Hunter keys from a secrets mapping, st.secrets or the CLI's.
+    # HUNTER_API_KEYS is a list or a comma-separated string (as set through
+    # an environment variable); HUNTER_API_KEY alone still works.
+    keys = secrets.get("HUNTER_API_KEYS") or [secrets["HUNTER_API_KEY"]]
+    if isinstance(keys, str):
+        keys = keys.split(",")
+    return [key.strip() for key in keys if key.strip()]
+
+
+class HunterKeyPool:
+    # Spreads searches over several Hunter keys, each with its own rate
+    # limiter and monthly budget. checkout() hands out the live key that can
+    # send soonest, preferring the one with the most searches left; keys that
+    # are invalid or out of quota are dropped and the run carries on with
+    # the rest. Email verifications have a budget of their own: a key out of
+    # verifications still searches, and one out of searches still verifies.
+    def __init__(self, api_keys, requests_per_second):
+        self.keys = [HunterKey(api_key, requests_per_second) for api_key in dict.fromkeys(api_keys) if api_key]
+        self.lock = threading.Lock()
+
+    def refresh(self):
+        # Reads every key's remaining searches and verifications from the account endpoint.
+        for key in self.keys:
+            try:
+                requests_left = account_info(key.api_key).get("requests", {})
+            except HunterError as e:
+                if e.status == 401:
+                    self.drop(key, str(e))
+                continue  # budget stays unknown; the key is still tried
+            searches = requests_left.get("searches", {})
+            verifications = requests_left.get("verifications", {})
+            with self.lock:
+                if "available" in verifications:
+                    key.verifications = max(verifications["available"] - verifications.get("used", 0), 0)
+                if "available" in searches:
+                    key.remaining = max(searches["available"] - searches.get("used", 0), 0)
+                    if key.remaining == 0:
+                        key.dropped = NO_SEARCHES_LEFT
+        return self
+
+    @property
+    def live(self):
+        return [key for key in self.keys if key.dropped is None]
+
+    @property
+    def remaining(self):
+        # Total searches left over live keys, None if any key's budget is unknown.
+        budgets = [key.remaining for key in self.live]
+        return None if None in budgets else sum(budgets)
+
+    def checkout(self, kind="searches"):
+        # Reserves one search (or verification) on the best live key; raises
+        # HunterError when none are left.
+        budget = BUDGETS[kind]
+        with self.lock:
+            if kind == "searches":
+                live = self.live
+            else:
+                live = [key for key in self.keys if key.dropped in (None, NO_SEARCHES_LEFT)]
+            live = [key for key in live if getattr(key, budget) != 0]
+            if not live:
+                raise HunterError(f"All Hunter API keys are exhausted or invalid ({kind})")
+            key = min(live, key=lambda key: (
+                key.limiter.delay(), -(getattr(key, budget) if getattr(key, budget) is not None else float("inf"))
+            ))
+            if getattr(key, budget) is not None:
+                setattr(key, budget, getattr(key, budget) - 1)
+                if key.remaining == 0:
+                    key.dropped = NO_SEARCHES_LEFT
+            if kind == "searches":
+                key.used += 1
+            else:
+                key.verified += 1
+            return key
+
+    def refund(self, key, kind="searches"):
+        # The reserved request was not spent (e.g. it was rate limited).
+        budget = BUDGETS[kind]
+        with self.lock:
+            if kind == "searches":
+                key.used -= 1
+            else:
+                key.verified -= 1
+            if getattr(key, budget) is not None:
+                setattr(key, budget, getattr(key, budget) + 1)
+                if key.dropped == NO_SEARCHES_LEFT and key.remaining:
+                    key.dropped = None
+
+    def drop(self, key, reason):
+        METRICS.inc("hunter_keys_dropped_total")
+        with self.lock:
+            key.dropped = reason
+            key.remaining = 0
+
+    def exhaust(self, key, kind, reason):
+        # The key ran out of this budget mid-run; for searches that drops it.
+        if kind == "searches":
+            self.drop(key, reason)
+            return
+        with self.lock:
+            setattr(key, BUDGETS[kind], 0)
+
+    def summary(self):
+        return [
+            {"key": key.label, "remaining": key.remaining, "used": key.used, "dropped": key.dropped,
+             "verifications": key.verifications, "verified": key.verified}
+            for key in self.keys
+        ]
+
+
+def _leads_from_payload(data):
+    emails = data.get("emails", [])
+    company = data.get("organization")
+    domain = data.get("domain")
+    for email in emails:
+        email["company"] = company
+        email.setdefault("domain", domain)
+        if email.get("verification"):
+            email["verification_status"] = email["verification"].get("status")
+    return emails
+
+
+def _get(endpoint, params, api_key, limiter, what, kind="searches"):
+    # One GET against a Hunter endpoint as the decoded JSON body; raises
+    # HunterError mentioning `what`. api_key is a single key or a
+    # HunterKeyPool; with a pool each attempt runs on a key checked out for
+    # `kind` and its own limiter, and unusable keys are dropped and the
+    # request retried on another key. 429s are retried with backoff; 202s
+    # (a verification still in progress) are polled again after a pause.
+    pool = api_key if isinstance(api_key, HunterKeyPool) else None
+    params = dict(params)
+    key = None
+    attempt = 0
+    while True:
+        if pool is not None:
+            key = pool.checkout(kind)
+            params["api_key"], limiter = key.api_key, key.limiter
+        else:
+            params["api_key"] = api_key
+        if limiter:
+            limiter.acquire()
+        try:
+            with METRICS.timer("hunter_request_seconds", endpoint=endpoint):
+                response = SESSION.get(f"{HUNTER_API_BASE}/{endpoint}", params=params, timeout=REQUEST_TIMEOUT)
+        except requests.RequestException as e:
+            METRICS.inc("hunter_requests_total", endpoint=endpoint, status="error")
+            if key is not None:
+                pool.refund(key, kind)
+            raise HunterError(f"Error {what}: {e}")
+        METRICS.inc("hunter_requests_total", endpoint=endpoint, status=response.status_code)
+        if key is not None and _key_unusable(response):
+            if response.status_code == 401:
+                pool.drop(key, _error_text(response))
+            else:
+                pool.exhaust(key, kind, _error_text(response))
+            continue
+        if response.status_code in (202, 429) and attempt < MAX_RETRIES:
+            METRICS.inc("hunter_retries_total")
+            if key is not None:
+                pool.refund(key, kind)
+            if limiter and response.status_code == 429:
+                limiter.backoff(_retry_delay(response, attempt))
+            else:
+                time.sleep(_retry_delay(response, attempt))
+            attempt += 1
+            continue
+        break
+    if response.status_code != 200:
+        raise HunterError(f"Error {what}: {response.status_code} – {_error_text(response)}", response.status_code)
+    if limiter:
+        limiter.success()
+    METRICS.inc("hunter_credits_used_total" if kind == "searches" else "hunter_verifications_used_total")
+    return _json(response, what)
+
+
+def domain_search(domain, api_key, limit=PAGE_SIZE, offset=0, limiter=None, cache=None):
+    # One domain-search page as the decoded JSON body; raises HunterError.
+    # api_key is a single key or a HunterKeyPool (see _get).
+    params = {"domain": domain, "limit": limit, "offset": offset}
+    cache_key = make_key("domain-search", **params)
+    if cache is not None:
+        cached = cache.get(cache_key)
+        METRICS.inc("cache_lookups_total", cache="hunter", result="miss" if cached is None else "hit")
+        if cached is not None:
+            return cached
+    body = _get("domain-search", params, api_key, limiter, f"fetching domain {domain}")
+    if cache is not None:
+        cache.set(cache_key, body)
+    return body
+
+
+def email_verifier(email, api_key, limiter=None, cache=None):
+    # Hunter's verdict for one address, the "data" object of /email-verifier
+    # (status is valid, invalid, accept_all, webmail, disposable or unknown);
+    # raises HunterError. Verdicts other than "unknown" are cached per address.
+    cache_key = make_key("email-verifier", email.lower())
+    if cache is not None:
+        cached = cache.get(cache_key)
+        METRICS.inc("cache_lookups_total", cache="verifier", result="miss" if cached is None else "hit")
+        if cached is not None:
+            return cached
+    data = _get("email-verifier", {"email": email}, api_key, limiter, f"verifying {email}", "verifications")
+    data = data.get("data", {})
+    if cache is not None and data.get("status") not in (None, "unknown"):
+        cache.set(cache_key, data)
+    return data
+
+
+def iter_hunter_pages(domain, api_key, page_size=PAGE_SIZE, max_pages=None, limiter=None, cache=None):
+    # Walks the offset pages lazily; stop iterating to stop fetching.
+    offset = 0
+    pages = 0
+    while True:
+        body = domain_search(domain, api_key, page_size, offset, limiter, cache)
+        emails = _leads_from_payload(body.get("data", {}))
+        pages += 1
+        offset += page_size
+        if emails:
+            yield emails
+        total = body.get("meta", {}).get("results")
+        if len(emails) < page_size or (total is not None and offset >= total):
+            return
+        if max_pages and pages >= max_pages:
+            return
+
+
+def qualify_domain(domain, api_key, limiter=None, cache=None, page_size=PAGE_SIZE, max_pages=None, max_qualified=None):
+    # Returns (qualified_rows, error), rows as built by leads.filter_leads.
+    # Each page is filtered as it arrives and paging stops once
+    # max_qualified leads are kept. Leads from pages fetched before an error
+    # are kept.
+    qualified = []
+    error = None
+    seen = 0
+    filtering = 0.0
+    start = time.perf_counter()
+    try:
+        for page in iter_hunter_pages(domain, api_key, page_size, max_pages, limiter, cache):
+            seen += len(page)
+            mark = time.perf_counter()
+            qualified.extend(filter_leads(page))
+            filtering += time.perf_counter() - mark
+            if max_qualified and len(qualified) >= max_qualified:
+                qualified = qualified[:max_qualified]
+                break
+    except HunterError as e:
+        error = str(e)
+        METRICS.inc("hunter_domain_errors_total")
+    # Recorded once per domain, on what the domain actually yields.
+    METRICS.observe("filter_leads_seconds", filtering)
+    METRICS.inc("leads_seen_total", seen)
+    METRICS.inc("leads_qualified_total", len(qualified))
+    METRICS.observe("hunter_domain_seconds", time.perf_counter() - start)
+    return qualified, error
+
+
+def _map_in_order(function, items, max_workers):
+    # Yields function(item) in input order while up to max_workers calls are
+    # in flight. Only a bounded window of futures is queued so closing the
+    # generator early does not keep hammering the API.
+    executor = ThreadPoolExecutor(max_workers=max_workers)
+    pending = deque()
+    items = iter(items)
+    try:
+        while True:
+            while len(pending) < max_workers * 2:
+                item = next(items, None)
+                if item is None:
+                    break
+                pending.append(executor.submit(function, item))
+            if not pending:
+                return
+            yield pending.popleft().result()
+    finally:
+        executor.shutdown(wait=False, cancel_futures=True)
+
+
+def fetch_domains(domains, api_key, requests_per_second, max_workers=8, cache=None,
+                  page_size=PAGE_SIZE, max_pages=None, max_qualified=None):
+    # Yields (domain, qualified_rows, error) in input order while up to
+    # max_workers domains are in flight. With a HunterKeyPool each key brings
+    # its own rate limit, so the worker count scales with the number of live
+    # keys.
+    if isinstance(api_key, HunterKeyPool):
+        limiter = None
+        max_workers *= max(len(api_key.live), 1)
+    else:
+        limiter = RateLimiter(requests_per_second)
+    _size_session(max_workers)
+
+    def qualify(domain):
+        return (domain, *qualify_domain(domain, api_key, limiter, cache, page_size, max_pages, max_qualified))
+
+    yield from _map_in_order(qualify, domains, max_workers)
+
+
+def verify_emails(emails, api_key, requests_per_second, max_workers=8, cache=None):
+    # Yields (email, verdict, error) in input order, verdict being the
+    # email_verifier data (None on error). Same concurrency and key handling
+    # as fetch_domains.
+    if isinstance(api_key, HunterKeyPool):
+        limiter = None
+        max_workers *= max(len(api_key.live), 1)
+    else:
+        limiter = RateLimiter(requests_per_second)
+    _size_session(max_workers)
+
+    def verify(email):
+        try:
+            return email, email_verifier(email, api_key, limiter, cache), None
+        except HunterError as e:
+            METRICS.inc("hunter_verification_errors_total")
+            return email, None, str(e)
+
+    yield from _map_in_order(verify, emails, max_workers)
@@ -0,0 +1,115 @@
+import csv
+import io
+from urllib.parse import urlsplit
+
+
+def normalize_domain(value):
+    # "https://www.ING.com/nl", "ing.com." and "jan@ing.com" all become
+    # "ing.com"; internationalised names are returned in punycode. Returns
+    # None for values that are not a usable domain.
+    if value is None:
+        return None
+    text = str(value).strip()
+    if not text:
+        return None
+    if "@" in text and "://" not in text:
+        text = text.rsplit("@", 1)[1]
+    if "://" not in text:
+        text = "//" + text
+    try:
+        host = urlsplit(text).hostname
+    except ValueError:
+        return None
+    if not host:
+        return None
+    host = host.rstrip(".")
+    if host.startswith("www."):
+        host = host[4:]
+    try:
+        host = host.encode("idna").decode("ascii")
+    except UnicodeError:
+        return None
+    if "." not in host or " " in host:
+        return None
+    return host
+
+
+def _column_index(header, column):
+    # column is a zero-based index, a letter such as "B", or a header name.
+    if isinstance(column, int):
+        return column
+    text = str(column).strip()
+    if text.isdigit():
+        return int(text)
+    names = [str(name).strip().lower() if name is not None else "" for name in header]
+    if text.lower() in names:
+        return names.index(text.lower())
+    if text.isascii() and text.isalpha() and len(text) <= 3:
+        index = 0
+        for letter in text.upper():
+            index = index * 26 + ord(letter) - ord("A") + 1
+        return index - 1
+    raise ValueError(f"Column {column!r} not found in the header row")
+
+
+def _iter_xlsx_rows(file):
+    # Imported here: openpyxl is slow to load and CSV uploads never need it.
+    import openpyxl
+
+    workbook = openpyxl.load_workbook(file, read_only=True, data_only=True)
+    try:
+        yield from workbook.active.iter_rows(values_only=True)
+    finally:
+        workbook.close()
+
+
+def _iter_csv_rows(file):
+    if isinstance(file, (str, bytes)) or hasattr(file, "__fspath__"):
+        with open(file, encoding="utf-8-sig", newline="") as f:
+            yield from csv.reader(f)
+        return
+    text = io.TextIOWrapper(file, encoding="utf-8-sig", newline="")
+    try:
+        yield from csv.reader(text)
+    finally:
+        text.detach()  # leave the caller's file open
+
+
+def iter_column_values(file, column=1, file_name=None):
+    # Streams one column of an .xlsx or .csv file row by row, skipping the
+    # header row, without loading the whole sheet.
+    name = file_name or getattr(file, "name", None) or str(file)
+    rows = _iter_csv_rows(file) if name.lower().endswith(".csv") else _iter_xlsx_rows(file)
+    header = next(rows, None)
+    if header is None:
+        return
+    index = _column_index(header, column)
+    for row in rows:
+        yield row[index] if index < len(row) else None
+
+
+def ingest_domains(values):
+    # Normalises and de-duplicates raw values with a set index, keeping the
+    # first-seen order. Returns (domains, stats).
+    seen = set()
+    domains = []
+    stats = {"rows": 0, "empty": 0, "invalid": 0, "duplicates": 0}
+    for value in values:
+        stats["rows"] += 1
+        if value is None or not str(value).strip():
+            stats["empty"] += 1
+            continue
+        domain = normalize_domain(value)
+        if domain is None:
+            stats["invalid"] += 1
+        elif domain in seen:
+            stats["duplicates"] += 1
+        else:
+            seen.add(domain)
+            domains.append(domain)
+    stats["domains"] = len(domains)
+    return domains, stats
+
+
+def ingest_file(file, column=1, file_name=None):
+    return ingest_domains(iter_column_values(file, column, file_name))
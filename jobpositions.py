@@ -1,3 +1,5 @@
+import re
+
 JOB_KEYWORDS = [
     "Chief Executive Officer", "CEO", "Chief Financial Officer", "CFO", "Chief Operating Officer", "COO",
     "Chief Investment Officer", "CIO", "Chief Risk Officer", "CRO", "Chief Compliance Officer", "CCO",
@@ -30,3 +32,51 @@ JOB_KEYWORDS = [
     "Executive Director Investment Risk", "Chief Of Investment Execution", "Head Of M&A",
     "Liquidity Management & Financing", "Treasury", "Portfolio", "Asset", "Multi-asset", "Multi Asset"
 ]
+
+
+def _trie_pattern(keywords):
+    # Folds the keywords into a character trie so the regex engine walks one
+    # branch per title position instead of trying every alternative.
+    trie = {}
+    for keyword in keywords:
+        node = trie
+        for char in keyword:
+            node = node.setdefault(char, {})
+        node[""] = True
+
+    def build(node):
+        branches = [
+            (r"\s+" if char == " " else re.escape(char)) + build(child)
+            for char, child in sorted(node.items()) if char
+        ]
+        if not branches:
+            return ""
+        body = branches[0] if len(branches) == 1 else "(?:" + "|".join(branches) + ")"
+        return f"(?:{body})?" if "" in node else body
+
+    return build(trie)
+
+
+# Built once at import. Short keywords (acronyms like "PM", "RM", "FA")
+# only match as whole words, optionally plural, so they no longer hit
+# "Equipment" or "Fashion". Longer keywords keep the old substring behaviour
+# so Dutch compounds such as "Treasurymanager" still qualify. The greedy
+# trie prefers the longest keyword at a position.
+SHORT_KEYWORD_LENGTH = 4
+_KEYWORD_LOOKUP = {" ".join(keyword.lower().split()): keyword for keyword in JOB_KEYWORDS}
+_SHORT_KEYWORDS = [keyword for keyword in _KEYWORD_LOOKUP if len(keyword) <= SHORT_KEYWORD_LENGTH]
+_LONG_KEYWORDS = [keyword for keyword in _KEYWORD_LOOKUP if len(keyword) > SHORT_KEYWORD_LENGTH]
+JOB_TITLE_PATTERN = re.compile(
+    r"(" + _trie_pattern(_LONG_KEYWORDS) + r")"
+    r"|(?<![0-9a-z])(" + _trie_pattern(_SHORT_KEYWORDS) + r")s?(?![0-9a-z])",
+    re.IGNORECASE,
+)
+
+
+def match_job_title(position):
+    if not position:
+        return None
+    match = JOB_TITLE_PATTERN.search(position)
+    if match is None:
+        return None
+    return _KEYWORD_LOOKUP[" ".join((match.group(1) or match.group(2)).lower().split())]
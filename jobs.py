@@ -0,0 +1,197 @@
+import threading
+import time
+import uuid
+from collections import OrderedDict
+
+from ai_messages import BatchStats
+from leads import build_salesflow_frame, qualified_frame
+from metrics import METRICS
+from verify import MIN_CONFIDENCE, verify_leads
+
+
+class QualificationJob:
+    # Runs the Hunter loop, and optionally per-lead message generation, on a
+    # daemon thread so it outlives the script run that started it. The UI
+    # only reads the progress fields and calls cancel(); everything else is
+    # owned by the worker thread.
+    #
+    # fetch(domains) yields (domain, qualified_rows, error), e.g. a partial
+    # of hunter.fetch_domains. verify(emails) yields (email, verdict, error),
+    # e.g. a partial of hunter.verify_emails, and runs before any message is
+    # built. personalize(leads, stats) yields (indices, messages), e.g. a
+    # partial of ai_messages.generate_messages.
+    def __init__(self, domains, fetch, template, personalize=None, verify=None, min_confidence=MIN_CONFIDENCE):
+        self.id = uuid.uuid4().hex
+        self.domains = list(domains)
+        self.fetch = fetch
+        self.template = template
+        self.personalize = personalize
+        self.verify = verify
+        self.min_confidence = min_confidence
+        self.status = "pending"
+        self.stage = "hunter"
+        self.total = len(self.domains)
+        self.done = 0
+        self.qualified_count = 0
+        self.errors = []
+        self.recent = []
+        self.verify_done = 0
+        self.verify_total = 0
+        self.verify_stats = None
+        self.verdicts = {}  # email -> verifier status, rejected leads included
+        self.messages_done = 0
+        self.messages_total = 0
+        self.ai_stats = BatchStats() if personalize else None
+        self.df_qualified = None
+        self.df_salesflow = None
+        self.error = None
+        self.started = None
+        self.finished = None
+        self.cancel_event = threading.Event()
+        self.lock = threading.Lock()
+        self.leads = []
+        self.thread = threading.Thread(target=self._run, name=f"qualification-{self.id[:8]}", daemon=True)
+
+    def start(self):
+        self.status = "running"
+        self.started = time.time()
+        self.thread.start()
+        return self
+
+    def cancel(self):
+        self.cancel_event.set()
+
+    @property
+    def running(self):
+        return self.status == "running"
+
+    @property
+    def cancelled(self):
+        return self.cancel_event.is_set()
+
+    def partial_qualified(self):
+        # Leads qualified so far as one frame; safe to call while the job runs.
+        with self.lock:
+            leads = list(self.leads)
+        return qualified_frame(leads)
+
+    def _run(self):
+        try:
+            with METRICS.timer("stage_seconds", stage="hunter"):
+                self._qualify()
+            self.df_qualified = self.partial_qualified()
+            if self.verify and not self.df_qualified.empty and not self.cancelled:
+                with METRICS.timer("stage_seconds", stage="verify"):
+                    self._verify()
+            if self.df_qualified.empty:
+                self.df_salesflow = None
+            else:
+                self.df_salesflow = build_salesflow_frame(self.df_qualified, self.template)
+                if self.personalize and not self.cancelled:
+                    with METRICS.timer("stage_seconds", stage="messages"):
+                        self._personalize()
+            self.status = "cancelled" if self.cancelled else "done"
+            METRICS.inc("jobs_total", status=self.status)
+        except Exception as e:
+            METRICS.inc("jobs_total", status="failed")
+            self.error = str(e)
+            self._keep_partial()
+            self.status = "failed"
+        finally:
+            self.finished = time.time()
+
+    def _keep_partial(self):
+        # Like a cancel, a failure keeps the leads qualified before it. If
+        # building the frames is what failed, there is nothing to keep.
+        try:
+            if self.df_qualified is None:
+                self.df_qualified = self.partial_qualified()
+            if self.df_salesflow is None and not self.df_qualified.empty:
+                self.df_salesflow = build_salesflow_frame(self.df_qualified, self.template)
+        except Exception:
+            pass
+
+    def _qualify(self):
+        results = self.fetch(self.domains)
+        try:
+            for domain, qualified, error in results:
+                with self.lock:
+                    self.leads.extend(qualified)
+                    self.qualified_count += len(qualified)
+                    if error:
+                        self.errors.append(error)
+                    self.recent = (self.recent + [(domain, len(qualified), error)])[-10:]
+                    self.done += 1
+                if self.cancelled:
+                    break
+        finally:
+            # Closing the generator cancels domains that were queued but not started.
+            close = getattr(results, "close", None)
+            if close:
+                close()
+
+    def _verify(self):
+        # Cancelling keeps the verdicts so far; unchecked leads are kept.
+        self.stage = "verify"
+
+        def verify(emails):
+            self.verify_total = len(emails)
+            results = self.verify(emails)
+            try:
+                for email, verdict, error in results:
+                    yield email, verdict, error
+                    if not error:
+                        self.verdicts[email] = verdict.get("status")
+                    self.verify_done += 1
+                    if self.cancelled:
+                        break
+            finally:
+                close = getattr(results, "close", None)
+                if close:
+                    close()
+
+        self.df_qualified, self.verify_stats = verify_leads(self.df_qualified, verify, self.min_confidence)
+
+    def _personalize(self):
+        self.stage = "messages"
+        df = self.df_salesflow
+        self.messages_total = len(df)
+        leads = list(zip(df["First Name"], df["Job Title"], df["Company"]))
+        results = self.personalize(leads, stats=self.ai_stats)
+        try:
+            for indices, messages in results:
+                df.loc[indices, "Personalized Message"] = messages
+                self.messages_done += len(indices)
+                if self.cancelled:
+                    break
+        finally:
+            close = getattr(results, "close", None)
+            if close:
+                close()
+
+
+class JobRegistry:
+    # Process-wide map of job id -> job. Sessions keep only the id, so a job
+    # is found again after a rerun or a reconnect. Only the newest
+    # max_jobs are kept; running jobs are never dropped.
+    def __init__(self, max_jobs=20):
+        self.max_jobs = max_jobs
+        self.jobs = OrderedDict()
+        self.lock = threading.Lock()
+
+    def add(self, job):
+        with self.lock:
+            self.jobs[job.id] = job
+            for job_id in [job_id for job_id, old in self.jobs.items() if not old.running]:
+                if len(self.jobs) <= self.max_jobs:
+                    break
+                del self.jobs[job_id]
+        return job
+
+    def get(self, job_id):
+        with self.lock:
+            return self.jobs.get(job_id)
+
+    def running(self):
+        with self.lock:
+            return [job for job in self.jobs.values() if job.running]
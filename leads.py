@@ -0,0 +1,80 @@
+import pandas as pd
+
+from jobpositions import match_job_title
+from template import MessageTemplate
+
+PUBLIC_DOMAINS = ["gmail.com", "yahoo.com", "hotmail.com", "outlook.com"]
+# Confidence is Hunter's 0-100 score from the domain search; Verification is
+# the latest email-verifier status (see verify.py), None if never checked.
+QUALIFIED_COLUMNS = [
+    "Email", "Full Name", "Position", "LinkedIn", "Company", "Company Domain", "Matched Keyword",
+    "Confidence", "Verification",
+]
+SALESFLOW_COLUMNS = [
+    "First Name", "Last Name", "LinkedIn URL", "Company", "Job Title", "Email", "Company Domain", "Personalized Message"
+]
+
+
+def is_public_email(email):
+    return email.split("@")[-1].lower() in PUBLIC_DOMAINS
+
+
+def filter_leads(leads):
+    # Qualified rows (dicts keyed by QUALIFIED_COLUMNS) for a list of raw
+    # Hunter email dicts. This runs per domain on a page or two of leads,
+    # where plain dicts cost far less than building a DataFrame; the frame
+    # is built once per batch by qualified_frame.
+    qualified = []
+    for lead in leads:
+        email = lead.get("value")
+        if not email or is_public_email(email):
+            continue
+        position = lead.get("position")
+        keyword = match_job_title(position)
+        if keyword:
+            qualified.append({
+                "Email": email,
+                "Full Name": (lead.get("first_name") or "") + " " + (lead.get("last_name") or ""),
+                "Position": position,
+                "LinkedIn": lead.get("linkedin") or lead.get("linkedin_url"),
+                "Company": lead.get("company", "N/A"),
+                "Company Domain": lead.get("domain"),
+                "Matched Keyword": keyword,
+                "Confidence": lead.get("confidence"),
+                "Verification": lead.get("verification_status"),
+            })
+    return qualified
+
+
+def qualified_frame(rows):
+    # One object-typed frame for a whole batch of filter_leads rows (dicts,
+    # or tuples in QUALIFIED_COLUMNS order), keeping None for missing values
+    # instead of NaN.
+    return pd.DataFrame(list(rows), columns=QUALIFIED_COLUMNS, dtype=object)
+
+
+def split_full_name_frame(full_names):
+    parts = full_names.fillna("").astype(str).str.split()
+    return parts.str[0].fillna(""), parts.str[1:].str.join(" ").fillna("")
+
+
+def build_salesflow_frame(qualified, template):
+    # template is a str or a template.MessageTemplate; rendering never raises
+    # on stray braces.
+    if not isinstance(template, MessageTemplate):
+        template = MessageTemplate(template)
+    first_name, last_name = split_full_name_frame(qualified["Full Name"])
+    messages = template.render(
+        {"first_name": first_name, "position": qualified["Position"], "company": qualified["Company"]}
+    )
+    df_salesflow = pd.DataFrame({
+        "First Name": first_name,
+        "Last Name": last_name,
+        "LinkedIn URL": qualified["LinkedIn"],
+        "Company": qualified["Company"],
+        "Job Title": qualified["Position"],
+        "Email": qualified["Email"],
+        "Company Domain": qualified["Company Domain"],
+        "Personalized Message": messages,
+    }, columns=SALESFLOW_COLUMNS)
+    return df_salesflow
@@ -0,0 +1,158 @@
+import json
+import os
+import sqlite3
+import threading
+import time
+
+from leads import qualified_frame
+from verify import REJECTED_STATUSES
+
+# Qualified-lead column -> SQLite column.
+STORE_COLUMNS = {
+    "Email": "email", "Full Name": "full_name", "Position": "position", "LinkedIn": "linkedin",
+    "Company": "company", "Company Domain": "company_domain", "Matched Keyword": "matched_keyword",
+    "Confidence": "confidence", "Verification": "verification",
+}
+# Columns added after the first release; older databases gain them on open.
+ADDED_COLUMNS = {"confidence": "INTEGER", "verification": "TEXT"}
+
+
+class LeadStore:
+    # Every qualified lead ever found, one row per email, plus when each
+    # searched domain was last checked. Lets a run reuse recent results and
+    # answers company/title lookups without calling Hunter.
+    def __init__(self, path):
+        self.path = path
+        self.lock = threading.Lock()
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        # The timeout lets several pipeline worker processes share the file.
+        self.conn = sqlite3.connect(path, timeout=30, check_same_thread=False)
+        self.conn.executescript(
+            "CREATE TABLE IF NOT EXISTS leads ("
+            "email TEXT PRIMARY KEY, full_name TEXT, position TEXT, linkedin TEXT, company TEXT,"
+            " company_domain TEXT, matched_keyword TEXT, confidence INTEGER, verification TEXT,"
+            " source_domain TEXT NOT NULL, first_seen REAL NOT NULL, last_seen REAL NOT NULL);"
+            "CREATE INDEX IF NOT EXISTS leads_company_domain ON leads (company_domain);"
+            "CREATE INDEX IF NOT EXISTS leads_source_domain ON leads (source_domain);"
+            "CREATE TABLE IF NOT EXISTS domains (domain TEXT PRIMARY KEY, checked REAL NOT NULL, leads INTEGER NOT NULL);"
+        )
+        existing = {row[1] for row in self.conn.execute("PRAGMA table_info(leads)")}
+        for column, kind in ADDED_COLUMNS.items():
+            if column not in existing:
+                self.conn.execute(f"ALTER TABLE leads ADD COLUMN {column} {kind}")
+        self.conn.commit()
+
+    def upsert(self, domain, qualified):
+        # Stores one searched domain's qualified leads (leads.filter_leads
+        # rows), refreshing rows that already exist. Returns how many of them
+        # were new.
+        now = time.time()
+        rows = [tuple(lead.get(column) for column in STORE_COLUMNS) + (domain, now, now) for lead in qualified]
+        with self.lock:
+            before = self.conn.execute("SELECT COUNT(*) FROM leads").fetchone()[0]
+            self.conn.executemany(
+                "INSERT INTO leads (email, full_name, position, linkedin, company, company_domain, matched_keyword,"
+                " confidence, verification, source_domain, first_seen, last_seen)"
+                " VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)"
+                " ON CONFLICT(email) DO UPDATE SET full_name = excluded.full_name, position = excluded.position,"
+                " linkedin = excluded.linkedin, company = excluded.company, company_domain = excluded.company_domain,"
+                " matched_keyword = excluded.matched_keyword, confidence = excluded.confidence,"
+                " verification = COALESCE(excluded.verification, leads.verification),"
+                " source_domain = excluded.source_domain, last_seen = excluded.last_seen",
+                rows,
+            )
+            added = self.conn.execute("SELECT COUNT(*) FROM leads").fetchone()[0] - before
+            self.conn.execute(
+                "INSERT OR REPLACE INTO domains (domain, checked, leads) VALUES (?, ?, ?)",
+                (domain, now, len(qualified)),
+            )
+            self.conn.commit()
+        return added
+
+    def record_verification(self, statuses):
+        # statuses maps email -> email-verifier status for leads already stored.
+        with self.lock:
+            self.conn.executemany(
+                "UPDATE leads SET verification = ? WHERE email = ?",
+                [(status, email) for email, status in statuses.items()],
+            )
+            self.conn.commit()
+
+    def fresh_domains(self, domains, max_age):
+        # Domains checked within the last max_age seconds.
+        cutoff = time.time() - max_age
+        with self.lock:
+            rows = self.conn.execute(
+                "SELECT domain FROM domains WHERE checked >= ? AND domain IN (SELECT value FROM json_each(?))",
+                (cutoff, json.dumps(list(domains))),
+            ).fetchall()
+        return {row[0] for row in rows}
+
+    def known_emails(self, emails, max_age=None):
+        # The emails already stored; with max_age, only those seen within
+        # the last max_age seconds, the same window as fresh_domains.
+        cutoff = time.time() - max_age if max_age else float("-inf")
+        with self.lock:
+            rows = self.conn.execute(
+                "SELECT email FROM leads WHERE last_seen >= ? AND email IN (SELECT value FROM json_each(?))",
+                (cutoff, json.dumps([email for email in emails if email])),
+            ).fetchall()
+        return {row[0] for row in rows}
+
+    def _query(self, where, params, limit=None):
+        sql = f"SELECT {', '.join(STORE_COLUMNS.values())} FROM leads WHERE {where} ORDER BY company, email"
+        if limit:
+            sql += f" LIMIT {int(limit)}"
+        with self.lock:
+            return self.conn.execute(sql, params).fetchall()
+
+    def leads_for_domain(self, domain):
+        # The domain's stored leads as filter_leads-style rows.
+        return [dict(zip(STORE_COLUMNS, row)) for row in self._query("source_domain = ?", (domain,))]
+
+    def search(self, company=None, title=None, limit=1000, include_rejected=False):
+        # Case-insensitive substring match on company name/domain and job
+        # title. Leads the email verifier rejected are left out unless asked
+        # for, so stored results never send a bounced address to an export.
+        where, params = ["1"], []
+        if not include_rejected:
+            where.append(f"(verification IS NULL OR verification NOT IN ({', '.join('?' * len(REJECTED_STATUSES))}))")
+            params += REJECTED_STATUSES
+        if company:
+            where.append("(company LIKE ? OR company_domain LIKE ?)")
+            params += [f"%{company}%"] * 2
+        if title:
+            where.append("position LIKE ?")
+            params.append(f"%{title}%")
+        return qualified_frame(self._query(" AND ".join(where), params, limit))
+
+    def stats(self):
+        with self.lock:
+            leads = self.conn.execute("SELECT COUNT(*) FROM leads").fetchone()[0]
+            domains = self.conn.execute("SELECT COUNT(*) FROM domains").fetchone()[0]
+        return {"leads": leads, "domains": domains}
+
+
+def incremental_fetch(fetch, store, domains, max_age=None, skip_known=False):
+    # Wraps a fetch_domains-style generator. Domains checked within max_age
+    # seconds are answered from the store; everything else is fetched and
+    # upserted. With skip_known, leads already stored within max_age seconds
+    # (ever, without max_age) are left out of the results. Yields
+    # (domain, qualified, error).
+    domains = list(domains)
+    fresh = store.fresh_domains(domains, max_age) if max_age else set()
+    for domain in domains:
+        if domain in fresh:
+            yield domain, [] if skip_known else store.leads_for_domain(domain), None
+    results = fetch([domain for domain in domains if domain not in fresh])
+    try:
+        for domain, qualified, error in results:
+            if not error:
+                known = store.known_emails([lead["Email"] for lead in qualified], max_age) if skip_known else ()
+                store.upsert(domain, qualified)
+                if known:
+                    qualified = [lead for lead in qualified if lead["Email"] not in known]
+            yield domain, qualified, error
+    finally:
+        results.close()
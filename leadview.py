@@ -0,0 +1,48 @@
+import math
+
+# Columns the free-text search looks at.
+SEARCH_COLUMNS = ["First Name", "Last Name", "Email", "Company", "Job Title"]
+PAGE_SIZES = [25, 50, 100, 250]
+
+
+def matching_index(df, companies=None, title=None, search=None):
+    # Index labels of the rows that pass every filter that is set, in frame
+    # order. Filters are case-insensitive substring matches except companies,
+    # which is an exact list.
+    mask = None
+
+    def narrow(condition):
+        nonlocal mask
+        mask = condition if mask is None else mask & condition
+
+    if companies:
+        narrow(df["Company"].isin(companies))
+    if title:
+        narrow(df["Job Title"].fillna("").str.contains(title, case=False, regex=False))
+    if search:
+        found = None
+        for column in SEARCH_COLUMNS:
+            hit = df[column].fillna("").astype(str).str.contains(search, case=False, regex=False)
+            found = hit if found is None else found | hit
+        narrow(found)
+    return df.index if mask is None else df.index[mask.to_numpy()]
+
+
+def page_of(index, page, page_size):
+    # (labels on the page, number of pages); page is 1-based and clamped.
+    pages = max(1, math.ceil(len(index) / page_size))
+    page = min(max(page, 1), pages)
+    return index[(page - 1) * page_size:page * page_size], pages
+
+
+def apply_edits(selected, row_labels, edited_rows, column="Select"):
+    # Applies a data_editor's edited_rows ({position: {column: value}}) for
+    # the rows shown, given as row_labels, to the selected label set.
+    for position, change in edited_rows.items():
+        if column in change:
+            label = row_labels[int(position)]
+            if change[column]:
+                selected.add(label)
+            else:
+                selected.discard(label)
+    return selected
@@ -0,0 +1,352 @@
+# Headless Hunter -> filter -> message -> export pipeline.
+#
+#     python pipeline.py domains.xlsx --output-dir out/
+#
+# Progress is appended to a checkpoint file after every domain, so running
+# the same command again after an interruption skips completed domains.
+#
+# With --processes N the domain list is split into shards that N worker
+# processes fetch and filter side by side, each recording its domains in a
+# checkpoint file of its own under <checkpoint>.shards/; the parent merges
+# those into one lead list before verifying, rendering and exporting.
+import argparse
+import glob
+import json
+import math
+import os
+import sys
+import tomllib
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from functools import partial
+
+from ai_messages import FALLBACK_MESSAGE
+from cache import SQLiteCache
+from exports import (
+    CSV_NAME, SUGARCRM_NAME, XLSX_NAME, ZIP_NAME,
+    build_csv, build_sugarcrm_csv, build_xlsx, build_zip, use_fast_xlsx,
+)
+import hunter
+from hunter import PAGE_SIZE, HunterKeyPool, fetch_domains, hunter_keys, verify_emails
+from ingest import ingest_file
+from leads import build_salesflow_frame, qualified_frame
+from leadstore import LeadStore, incremental_fetch
+from template import message_issues
+from verify import MIN_CONFIDENCE, verify_leads
+
+SECRETS_PATH = os.path.join(".streamlit", "secrets.toml")
+
+
+def load_secrets(path=SECRETS_PATH):
+    # Same keys as st.secrets; environment variables win over the file.
+    secrets = {}
+    if os.path.exists(path):
+        with open(path, "rb") as f:
+            secrets.update(tomllib.load(f))
+    secrets.update({key: value for key, value in os.environ.items() if key.isupper()})
+    return secrets
+
+
+class Checkpoint:
+    # Append-only JSON lines, one per finished domain. Domains that ended in
+    # an error are not recorded, so a resumed run queries them again.
+    def __init__(self, path):
+        self.path = path
+        self.done, complete_last_line = self.load(path)
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        self.file = open(path, "a", encoding="utf-8")
+        if not complete_last_line:
+            self.file.write("\n")
+
+    @staticmethod
+    def load(path):
+        # (domain -> leads, whether the file ends with a complete line).
+        done = {}
+        complete_last_line = True
+        if os.path.exists(path):
+            with open(path, encoding="utf-8") as f:
+                for line in f:
+                    complete_last_line = line.endswith("\n")
+                    try:
+                        entry = json.loads(line)
+                    except json.JSONDecodeError:
+                        continue  # a line cut short by a crash
+                    done[entry["domain"]] = entry["leads"]
+        return done, complete_last_line
+
+    def record(self, domain, qualified):
+        self.file.write(json.dumps({"domain": domain, "leads": qualified}) + "\n")
+        self.file.flush()
+        self.done[domain] = qualified
+
+    def close(self):
+        self.file.close()
+
+
+def run_pipeline(domains, api_key, checkpoint=None, requests_per_second=10, max_workers=8, cache=None,
+                 page_size=PAGE_SIZE, max_pages=None, max_qualified=None, on_domain=None,
+                 store=None, max_age=None, skip_known=False):
+    # Returns (qualified_frame, errors) for all domains, reusing checkpointed
+    # results. on_domain(domain, qualified, error) is called as each new
+    # domain finishes. With a LeadStore, results are upserted into it and
+    # domains checked within max_age seconds are read back from it.
+    done = checkpoint.done if checkpoint is not None else {}
+    todo = [domain for domain in domains if domain not in done]
+    errors = {}
+    leads = [lead for domain in domains if domain in done for lead in done[domain]]
+    fetch = partial(
+        fetch_domains, api_key=api_key, requests_per_second=requests_per_second, max_workers=max_workers,
+        cache=cache, page_size=page_size, max_pages=max_pages, max_qualified=max_qualified,
+    )
+    if store is not None:
+        fetch = partial(incremental_fetch, fetch, store, max_age=max_age, skip_known=skip_known)
+    results = fetch(todo)
+    for domain, qualified, error in results:
+        if error:
+            errors[domain] = error
+        elif checkpoint is not None:
+            checkpoint.record(domain, qualified)
+        leads.extend(qualified)
+        if on_domain:
+            on_domain(domain, qualified, error)
+    return qualified_frame(leads), errors
+
+
+def shard_paths(checkpoint_path):
+    return sorted(glob.glob(os.path.join(os.path.splitext(checkpoint_path)[0] + ".shards", "shard-*.jsonl")))
+
+
+def run_shard(path, domains, api_keys, requests_per_second, options):
+    # Worker process entry point: fetches and filters one shard, recording
+    # each finished domain in the shard's own checkpoint file, which is what
+    # the parent merges. Returns {domain: error} for the domains that failed.
+    cache_path = options.pop("cache_path", None)
+    cache_options = options.pop("cache_options", {})
+    store_path = options.pop("store_path", None)
+    # Spawned workers (macOS, forkserver) re-import hunter, so a base URL set
+    # in the parent has to be handed over.
+    hunter.HUNTER_API_BASE = options.pop("api_base", hunter.HUNTER_API_BASE)
+    checkpoint = Checkpoint(path)
+    try:
+        _, errors = run_pipeline(
+            domains, HunterKeyPool(api_keys, requests_per_second), checkpoint,
+            requests_per_second=requests_per_second,
+            cache=SQLiteCache(cache_path, **cache_options) if cache_path else None,
+            store=LeadStore(store_path) if store_path else None, **options,
+        )
+    finally:
+        checkpoint.close()
+    return errors
+
+
+def run_sharded(domains, api_keys, checkpoint, processes, shard_size=None, requests_per_second=10,
+                on_shard=None, **options):
+    # Like run_pipeline, with the domains not yet done split into shards run
+    # by `processes` worker processes. Shards are small (by default about
+    # four per process) so a slow or failing one ties up one worker while
+    # the others carry on through the queue. A shard that raises, or whose
+    # process dies, only marks its own unfinished domains as failed; the
+    # domains it finished are in its file and are kept. Each process gets
+    # an equal share of the per-key request rate. on_shard(done, total,
+    # domains, errors) is called as each shard finishes. Leads are merged in
+    # input order with duplicate emails dropped. Workers use the parent's
+    # hunter.HUNTER_API_BASE unless options name an api_base.
+    shard_dir = os.path.splitext(checkpoint.path)[0] + ".shards"
+    os.makedirs(shard_dir, exist_ok=True)
+    done = dict(checkpoint.done)
+    for path in shard_paths(checkpoint.path):
+        done.update(Checkpoint.load(path)[0])
+    todo = [domain for domain in domains if domain not in done]
+    shard_size = shard_size or max(1, math.ceil(len(todo) / (processes * 4)))
+    shards = [todo[start:start + shard_size] for start in range(0, len(todo), shard_size)]
+    first = len(shard_paths(checkpoint.path))
+    errors = {}
+    options.setdefault("api_base", hunter.HUNTER_API_BASE)
+    with ProcessPoolExecutor(max_workers=processes) as executor:
+        futures = {
+            executor.submit(
+                run_shard, os.path.join(shard_dir, f"shard-{first + index:05d}.jsonl"), shard, api_keys,
+                requests_per_second / processes, dict(options),
+            ): shard
+            for index, shard in enumerate(shards)
+        }
+        for finished, future in enumerate(as_completed(futures), 1):
+            shard = futures[future]
+            try:
+                shard_errors = future.result()
+            except Exception as e:
+                shard_errors = {domain: f"Shard failed: {e!r}" for domain in shard}
+            errors.update(shard_errors)
+            if on_shard:
+                on_shard(finished, len(shards), shard, shard_errors)
+    for path in shard_paths(checkpoint.path):
+        done.update(Checkpoint.load(path)[0])
+    errors = {domain: error for domain, error in errors.items() if domain not in done}
+    qualified = qualified_frame(lead for domain in domains if domain in done for lead in done[domain])
+    return qualified.drop_duplicates("Email").reset_index(drop=True), errors
+
+
+def write_outputs(df_salesflow, output_dir):
+    os.makedirs(output_dir, exist_ok=True)
+    xlsx = build_xlsx(df_salesflow, fast=use_fast_xlsx(len(df_salesflow)))
+    csv = build_csv(df_salesflow)
+    files = {
+        XLSX_NAME: xlsx,
+        CSV_NAME: csv,
+        ZIP_NAME: build_zip(xlsx, csv),
+        SUGARCRM_NAME: build_sugarcrm_csv(df_salesflow),
+    }
+    for name, data in files.items():
+        with open(os.path.join(output_dir, name), "wb") as f:
+            f.write(data)
+    return [os.path.join(output_dir, name) for name in files]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Run the lead qualification pipeline without the UI.")
+    parser.add_argument("input", help=".xlsx or .csv file with one domain per row")
+    parser.add_argument("--output-dir", default="output")
+    parser.add_argument("--column", default="1", help="domain column: zero-based index, letter or header name (default: 1, column B)")
+    parser.add_argument("--template", default=FALLBACK_MESSAGE, help="message template with {first_name}, {position}, {company}")
+    parser.add_argument("--template-file", help="read the message template from this file instead")
+    parser.add_argument("--checkpoint", help="checkpoint file (default: <output-dir>/checkpoint.jsonl)")
+    parser.add_argument("--max-pages", type=int, default=5, help="Hunter pages per domain, 0 for all")
+    parser.add_argument("--max-qualified", type=int, default=0, help="qualified leads per domain, 0 for no limit")
+    parser.add_argument("--no-cache", action="store_true", help="skip the on-disk Hunter cache")
+    parser.add_argument("--store", help="lead store database (default: LEAD_STORE_PATH or .cache/leads.sqlite)")
+    parser.add_argument("--no-store", action="store_true", help="do not read from or write to the lead store")
+    parser.add_argument("--fresh-days", type=int, help="reuse stored results for domains checked in the last N days")
+    parser.add_argument("--new-only", action="store_true", help="leave out leads already in the lead store")
+    parser.add_argument("--verify", action="store_true", help="check emails with Hunter's verifier and drop invalid ones")
+    parser.add_argument("--min-confidence", type=int, help=f"trust Hunter confidence from this score without verifying (default: {MIN_CONFIDENCE})")
+    parser.add_argument("--processes", type=int, default=1, help="worker processes for Hunter fetching (default: 1)")
+    parser.add_argument("--shard-size", type=int, help="domains per shard with --processes (default: about 4 shards per process)")
+    parser.add_argument("--secrets", default=SECRETS_PATH)
+    args = parser.parse_args(argv)
+
+    secrets = load_secrets(args.secrets)
+    template = args.template
+    if args.template_file:
+        with open(args.template_file, encoding="utf-8") as f:
+            template = f.read()
+    domains, ingest_stats = ingest_file(args.input, args.column)
+    print(
+        f"{ingest_stats['rows']} row(s): {ingest_stats['duplicates']} duplicate(s) collapsed, "
+        f"{ingest_stats['invalid']} invalid, {ingest_stats['empty']} empty",
+        file=sys.stderr,
+    )
+    checkpoint = Checkpoint(args.checkpoint or os.path.join(args.output_dir, "checkpoint.jsonl"))
+    # Domains finished by an earlier sharded run count as done either way.
+    for path in shard_paths(checkpoint.path):
+        checkpoint.done.update(Checkpoint.load(path)[0])
+    cache = None
+    if not args.no_cache:
+        cache = SQLiteCache(
+            secrets.get("HUNTER_CACHE_PATH", ".cache/hunter.sqlite"),
+            ttl=int(secrets.get("HUNTER_CACHE_TTL_HOURS", 168)) * 3600,
+            max_entries=int(secrets.get("HUNTER_CACHE_MAX_ENTRIES", 50000)),
+        )
+    store = None
+    if not args.no_store:
+        store = LeadStore(args.store or secrets.get("LEAD_STORE_PATH", ".cache/leads.sqlite"))
+    fresh_days = args.fresh_days if args.fresh_days is not None else int(secrets.get("LEAD_STORE_FRESH_DAYS", 30))
+    skipped = sum(domain in checkpoint.done for domain in domains)
+    print(f"{len(domains)} domain(s), {skipped} already done in {checkpoint.path}", file=sys.stderr)
+
+    progress = {"done": skipped}
+
+    def report(domain, qualified, error):
+        progress["done"] += 1
+        status = f"error: {error}" if error else f"{len(qualified)} qualified"
+        print(f"[{progress['done']}/{len(domains)}] {domain}: {status}", file=sys.stderr)
+
+    requests_per_second = float(secrets.get("HUNTER_REQUESTS_PER_SECOND", 10))
+    pool = HunterKeyPool(hunter_keys(secrets), requests_per_second).refresh()
+    for key in pool.summary():
+        if key["dropped"]:
+            print(f"Hunter key {key['key']}: dropped ({key['dropped']})", file=sys.stderr)
+        else:
+            remaining = "unknown" if key["remaining"] is None else key["remaining"]
+            print(f"Hunter key {key['key']}: {remaining} searches left", file=sys.stderr)
+    if not pool.live:
+        print("No usable Hunter API key.", file=sys.stderr)
+        checkpoint.close()
+        return 2
+
+    options = dict(
+        max_workers=int(secrets.get("HUNTER_MAX_WORKERS", 8)), page_size=int(secrets.get("HUNTER_PAGE_SIZE", PAGE_SIZE)),
+        max_pages=args.max_pages or None, max_qualified=args.max_qualified or None,
+        max_age=fresh_days * 86400, skip_known=args.new_only,
+    )
+    try:
+        if args.processes > 1:
+            def report_shard(finished, total, shard, errors):
+                progress["done"] += len(shard)
+                print(
+                    f"[shard {finished}/{total}] {len(shard)} domain(s), {len(errors)} failed "
+                    f"({progress['done']}/{len(domains)} domains)",
+                    file=sys.stderr,
+                )
+
+            qualified, errors = run_sharded(
+                domains, [key.api_key for key in pool.live], checkpoint, args.processes, args.shard_size,
+                requests_per_second=requests_per_second, on_shard=report_shard,
+                cache_path=cache.path if cache is not None else None,
+                cache_options={"ttl": cache.ttl, "max_entries": cache.max_entries} if cache is not None else {},
+                store_path=store.path if store is not None else None, **options,
+            )
+        else:
+            qualified, errors = run_pipeline(
+                domains, pool, checkpoint, requests_per_second=requests_per_second, cache=cache,
+                on_domain=report, store=store, **options,
+            )
+    finally:
+        checkpoint.close()
+
+    verify_each = args.verify or str(secrets.get("VERIFY_EMAILS", "")).lower() in ("1", "true")
+    if verify_each and not qualified.empty:
+        verify_cache = None
+        if not args.no_cache:
+            verify_cache = SQLiteCache(
+                secrets.get("VERIFY_CACHE_PATH", ".cache/verify.sqlite"),
+                ttl=int(secrets.get("VERIFY_CACHE_TTL_HOURS", 720)) * 3600,
+            )
+        verify = partial(
+            verify_emails, api_key=pool, requests_per_second=requests_per_second,
+            max_workers=int(secrets.get("VERIFY_MAX_WORKERS", 8)), cache=verify_cache,
+        )
+        verdicts = {}
+
+        def record(email, status, error):
+            if not error:
+                verdicts[email] = status
+
+        min_confidence = args.min_confidence
+        if min_confidence is None:
+            min_confidence = int(secrets.get("VERIFY_MIN_CONFIDENCE", MIN_CONFIDENCE))
+        qualified, verify_stats = verify_leads(qualified, verify, min_confidence, on_result=record)
+        if store is not None:
+            store.record_verification(verdicts)
+        print(
+            f"Email verification: {verify_stats['verified']} checked, {verify_stats['unchecked']} kept unchecked, "
+            f"{verify_stats['rejected']} removed, {verify_stats['errors']} error(s)",
+            file=sys.stderr,
+        )
+
+    df_salesflow = build_salesflow_frame(qualified, template)
+    issues = message_issues(df_salesflow["Personalized Message"], df_salesflow["First Name"])
+    if (issues != "").any():
+        print(f"{int((issues != '').sum())} message(s) need attention:", file=sys.stderr)
+        for email, issue in zip(df_salesflow["Email"][issues != ""].head(20), issues[issues != ""].head(20)):
+            print(f"  {email}: {issue}", file=sys.stderr)
+    for path in write_outputs(df_salesflow, args.output_dir):
+        print(path)
+    print(f"{len(df_salesflow)} qualified lead(s), {len(errors)} domain(s) failed", file=sys.stderr)
+    for key in pool.summary():
+        if key["dropped"]:
+            print(f"Hunter key {key['key']} was dropped: {key['dropped']}", file=sys.stderr)
+    return 1 if errors else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,84 @@
+import re
+
+import pandas as pd
+
+# Placeholder -> the salesflow column it is filled from.
+PLACEHOLDERS = {"first_name": "First Name", "position": "Job Title", "company": "Company"}
+# LinkedIn rejects connection notes longer than this.
+LINKEDIN_NOTE_LIMIT = 300
+_PLACEHOLDER_PATTERN = re.compile(r"\{(" + "|".join(PLACEHOLDERS) + r")\}")
+_UNKNOWN_PATTERN = re.compile(r"\{([A-Za-z_][A-Za-z0-9_]*)\}")
+
+
+class MessageTemplate:
+    # A message template parsed once into literal text and known
+    # placeholders. Anything else, including stray or unknown braces, is
+    # kept as literal text instead of raising like str.format would.
+    def __init__(self, text):
+        self.text = text or ""
+        self.parts = []
+        position = 0
+        for match in _PLACEHOLDER_PATTERN.finditer(self.text):
+            if match.start() > position:
+                self.parts.append((False, self.text[position:match.start()]))
+            self.parts.append((True, match.group(1)))
+            position = match.end()
+        if position < len(self.text):
+            self.parts.append((False, self.text[position:]))
+        self.placeholders = {value for is_placeholder, value in self.parts if is_placeholder}
+        # Names that look like placeholders but will be sent as written.
+        self.unknown = sorted(set(_UNKNOWN_PATTERN.findall(self.text)) - set(PLACEHOLDERS))
+
+    def render(self, values):
+        # values maps placeholder -> Series (or list) of equal length; returns
+        # a Series of messages built column-wise, one concatenation per part.
+        size = len(next(iter(values.values()))) if values else 0
+        index = next((series.index for series in values.values() if isinstance(series, pd.Series)), None)
+        result = pd.Series([""] * size, index=index, dtype=str)
+        for is_placeholder, value in self.parts:
+            if is_placeholder:
+                column = pd.Series(values[value], index=index, dtype=object)
+                result = result + column.where(column.notna(), "").astype(str)
+            else:
+                result = result + value
+        return result
+
+    def render_one(self, **values):
+        return "".join(
+            str(values.get(value) or "") if is_placeholder else value for is_placeholder, value in self.parts
+        )
+
+    def render_frame(self, df):
+        # Renders from the salesflow columns (First Name, Job Title, Company).
+        return self.render({name: df[column] for name, column in PLACEHOLDERS.items()})
+
+
+def message_issues(messages, first_names, limit=LINKEDIN_NOTE_LIMIT):
+    # Per-row problems as a Series of "; "-joined text, "" when the row is fine.
+    first_missing = pd.Series(first_names, dtype=object).fillna("").astype(str).str.strip() == ""
+    lengths = pd.Series(messages, dtype=object).fillna("").astype(str).str.len()
+    issues = pd.Series([""] * len(lengths), index=lengths.index, dtype=object)
+    issues = issues.where(~first_missing.to_numpy(), "missing first name")
+    too_long = (lengths > limit).to_numpy()
+    note = "over " + str(limit) + " characters (" + lengths.astype(str) + ")"
+    prefix = issues.where(issues == "", issues + "; ")
+    return issues.where(~too_long, prefix + note)
+
+
+def templatize(message, first_name=None, position=None, company=None):
+    # Turns a message written for one sample lead back into a template by
+    # replacing the sample values with their placeholders. Only whole-word
+    # occurrences are replaced, all in one pass and longest value first, so
+    # "Ann" inside "Annual" or a company name containing the first name are
+    # left alone.
+    samples = {
+        value: "{" + name + "}"
+        for name, value in (("company", company), ("position", position), ("first_name", first_name))
+        if value and value.strip() and value != "{" + name + "}"
+    }
+    if not samples:
+        return message
+    pattern = re.compile(
+        r"(?<!\w)(" + "|".join(re.escape(value) for value in sorted(samples, key=len, reverse=True)) + r")(?!\w)"
+    )
+    return pattern.sub(lambda match: samples[match.group(1)], message)
@@ -0,0 +1,176 @@
+import json
+
+import openai
+import pytest
+
+import ai_messages
+from ai_messages import FALLBACK_MESSAGE, MessageCache, generate_ai_message
+from cache import SQLiteCache
+
+
+@pytest.fixture
+def api(monkeypatch):
+    prompts = []
+
+    def fake_request(prompt, stats=None):
+        prompts.append(prompt)
+        return f"message {len(prompts)}"
+    monkeypatch.setattr(ai_messages, "request_ai_message", fake_request)
+    return prompts
+
+
+def test_same_inputs_are_served_from_cache(api):
+    cache = MessageCache()
+    first = generate_ai_message("Ann", "CFO", "ING", "Formal", cache=cache)
+    second = generate_ai_message("Ann", "CFO", "ING", "Formal", cache=cache)
+    assert first == second == "message 1"
+    assert len(api) == 1
+    assert generate_ai_message("Ann", "CFO", "ING", "Friendly", cache=cache) == "message 2"
+
+
+def test_refresh_bypasses_and_overwrites_the_cache(api):
+    cache = MessageCache()
+    generate_ai_message("Ann", "CFO", "ING", cache=cache)
+    assert generate_ai_message("Ann", "CFO", "ING", cache=cache, refresh=True) == "message 2"
+    assert generate_ai_message("Ann", "CFO", "ING", cache=cache) == "message 2"
+
+
+def test_fallback_is_not_cached(monkeypatch):
+    def failing(prompt, stats=None):
+        raise RuntimeError("down")
+    monkeypatch.setattr(ai_messages, "request_ai_message", failing)
+    cache = MessageCache()
+    message = generate_ai_message("Ann", "CFO", "ING", cache=cache)
+    assert message == FALLBACK_MESSAGE.format(first_name="Ann", position="CFO", company="ING")
+    assert cache.stats()["entries"] == 0
+
+
+def test_lru_evicts_oldest_and_disk_tier_refills(tmp_path):
+    disk = SQLiteCache(str(tmp_path / "ai.sqlite"))
+    cache = MessageCache(max_entries=2, disk=disk)
+    for key in "abc":
+        cache.set(key, key.upper())
+    assert list(cache.entries) == ["b", "c"]
+    assert cache.get("a") == "A"
+    assert MessageCache(disk=disk).get("c") == "C"
+
+
+def test_generate_messages_deduplicates_prompts_and_fills_first_names(monkeypatch):
+    prompts = []
+
+    def fake_request(prompt, stats=None):
+        prompts.append(prompt)
+        if stats is not None:
+            stats.record_usage({"prompt_tokens": 50, "completion_tokens": 20})
+        return "Hi {first_name}, great work at ING."
+    monkeypatch.setattr(ai_messages, "request_ai_message", fake_request)
+    leads = [("Ann", "CFO", "ING"), ("Bob", "CFO", "ING"), ("Cat", "Treasurer", "ING")]
+    stats = ai_messages.BatchStats()
+    messages = {}
+    for indices, batch in ai_messages.generate_messages(leads, tone="Formal", stats=stats):
+        messages.update(zip(indices, batch))
+    assert len(prompts) == 2
+    assert messages == {0: "Hi Ann, great work at ING.", 1: "Hi Bob, great work at ING.", 2: "Hi Cat, great work at ING."}
+    summary = stats.summary()
+    assert (summary["leads"], summary["unique_prompts"], summary["requests"]) == (3, 2, 2)
+    assert summary["cost_usd"] > 0
+
+
+def test_generate_messages_retries_transient_errors_then_falls_back(monkeypatch):
+    monkeypatch.setattr(ai_messages.time, "sleep", lambda seconds: None)
+    attempts = []
+
+    def flaky(prompt, stats=None):
+        attempts.append(prompt)
+        raise openai.error.RateLimitError("slow down")
+    monkeypatch.setattr(ai_messages, "request_ai_message", flaky)
+    stats = ai_messages.BatchStats()
+    [(indices, batch)] = list(ai_messages.generate_messages([("Ann", "CFO", "ING")], max_retries=2, stats=stats))
+    assert len(attempts) == 3
+    assert stats.failures == 1 and stats.retries == 2
+    assert batch == [FALLBACK_MESSAGE.format(first_name="Ann", position="CFO", company="ING")]
+
+
+def test_generate_messages_uses_cache(api):
+    cache = MessageCache()
+    list(ai_messages.generate_messages([("Ann", "CFO", "ING")], cache=cache))
+    stats = ai_messages.BatchStats()
+    [(_, batch)] = list(ai_messages.generate_messages([("Bob", "CFO", "ING")], cache=cache, stats=stats))
+    assert batch == ["message 1"]
+    assert len(api) == 1 and stats.cached == 1
+
+
+def test_parse_packed_messages_keeps_only_well_formed_entries():
+    reply = '```json\n[{"id": 0, "message": " Hi {first_name} "}, {"id": 0, "message": "dup"}, {"id": 1, "message": ""},' \
+            ' {"id": 5, "message": "out of range"}, {"id": "2", "message": "string id"}, "junk", {"id": 2, "message": "ok"}]\n```'
+    assert ai_messages.parse_packed_messages(reply, 3) == {0: "Hi {first_name}", 2: "ok"}
+    assert ai_messages.parse_packed_messages('[{"id": 0, "message": "cut', 1) == {}
+    assert ai_messages.parse_packed_messages("Sorry, I can't help.", 1) == {}
+
+
+def test_pack_sizer_doubles_then_backs_off_and_grows_by_one():
+    sizer = ai_messages.PackSizer(10, latency_target=5, start=2)
+    sizer.record(2, 1, True)
+    sizer.record(4, 1, True)
+    assert sizer.size == 8
+    sizer.record(8, 9, True)
+    assert sizer.size == 4
+    sizer.record(4, 1, True)
+    sizer.record(2, 1, True)
+    assert sizer.size == 5
+    sizer.record(5, 1, False)
+    assert sizer.size == 2
+
+
+def test_take_pack_stays_within_the_context_window(monkeypatch):
+    monkeypatch.setattr(ai_messages, "CONTEXT_TOKENS", 1000)
+    queue = ai_messages.deque(range(20))
+    lines = dict.fromkeys(range(20), "x" * 400)
+    assert ai_messages._take_pack(queue, 20, lines) == [0, 1, 2, 3]
+    assert len(queue) == 16
+
+
+@pytest.fixture
+def packed_api(monkeypatch):
+    # Answers every packed request, except that the lead at id 1 of the first
+    # request is left out of the reply.
+    requests = []
+
+    def fake_packed(prompt, size, stats=None):
+        people = [json.loads(line) for line in prompt.splitlines() if line.startswith('{"id"')]
+        assert len(people) == size
+        requests.append(people)
+        items = [
+            {"id": person["id"], "message": f"Hi {{first_name}}, {person['position']} at {person['company']}"}
+            for person in people if not (len(requests) == 1 and person["id"] == 1)
+        ]
+        return json.dumps(items), True
+    monkeypatch.setattr(ai_messages, "request_packed_messages", fake_packed)
+    return requests
+
+
+def test_generate_messages_packs_prompts_and_requeues_missing_ones(packed_api):
+    leads = [(f"P{i}", f"Role {i % 12}", "ING") for i in range(30)]
+    stats = ai_messages.BatchStats()
+    messages = {}
+    for indices, batch in ai_messages.generate_messages(leads, max_workers=1, stats=stats, pack_size=8):
+        messages.update(zip(indices, batch))
+    assert messages == {i: f"Hi P{i}, Role {i % 12} at ING" for i in range(30)}
+    # The incomplete first reply halves the size, which then grows by one;
+    # the lead left out comes back last.
+    assert [len(people) for people in packed_api] == [2, 1, 2, 3, 4, 1]
+    assert stats.requeued == 1 and stats.requests == 6 and stats.failures == 0
+
+
+def test_generate_messages_falls_back_for_prompts_missing_from_every_reply(monkeypatch):
+    def skip_cto(prompt, size, stats=None):
+        people = [json.loads(line) for line in prompt.splitlines() if line.startswith('{"id"')]
+        return json.dumps([{"id": p["id"], "message": "Hi {first_name}"} for p in people if p["position"] != "CTO"]), True
+    monkeypatch.setattr(ai_messages, "request_packed_messages", skip_cto)
+    leads = [("Ann", "CFO", "ING"), ("Bob", "CTO", "ING")]
+    stats = ai_messages.BatchStats()
+    messages = {}
+    for indices, batch in ai_messages.generate_messages(leads, max_workers=1, max_retries=2, stats=stats, pack_size=4):
+        messages.update(zip(indices, batch))
+    assert messages == {0: "Hi Ann", 1: FALLBACK_MESSAGE.format(first_name="Bob", position="CTO", company="ING")}
+    assert stats.requeued == 2 and stats.failures == 1
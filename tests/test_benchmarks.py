@@ -0,0 +1,90 @@
+import argparse
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+
+import openai
+import pytest
+
+import hunter
+import pipeline
+from ai_messages import BatchStats, generate_messages
+from benchmarks import pipeline as bench
+from benchmarks.stubs import start_hunter_stub, start_openai_stub, start_zapier_stub
+
+
+@pytest.fixture(scope="module")
+def stubs():
+    servers = {
+        "hunter": start_hunter_stub(failure_rate=0.1, seed=4, max_emails=12),
+        "openai": start_openai_stub(failure_rate=0.05, seed=5),
+        "zapier": start_zapier_stub(),
+    }
+    with pytest.MonkeyPatch.context() as monkeypatch:
+        monkeypatch.setattr(hunter, "HUNTER_API_BASE", servers["hunter"].url + "/v2")
+        monkeypatch.setattr(openai, "api_base", servers["openai"].url + "/v1")
+        monkeypatch.setattr(openai, "api_key", "stub-key")
+        yield servers
+    for server in servers.values():
+        server.shutdown()
+
+
+def test_hunter_stub_pages_deterministically_and_throttles(stubs):
+    domains = [f"company{i}.example" for i in range(8)]
+    first = {domain: [lead["Email"] for lead in leads] for domain, leads, _ in hunter.fetch_domains(domains, "k", 1000, 4)}
+    second = {domain: [lead["Email"] for lead in leads] for domain, leads, _ in hunter.fetch_domains(domains, "k", 1000, 4)}
+    assert first == second
+    assert sum(map(len, first.values())) > 0
+    assert hunter.account_info("k")["requests"]["searches"]["available"] > 0
+
+
+def test_openai_stub_answers_chat_completions(stubs):
+    stats = BatchStats()
+    leads = [("Ann", "CFO", "Acme"), ("Bob", "CFO", "Acme"), ("Cas", "Trader", "Beta")]
+    results = dict(
+        (tuple(indices), messages) for indices, messages in generate_messages(leads, max_retries=10, stats=stats)
+    )
+    assert results[(0, 1)] == ["Hi Ann, great to connect!", "Hi Bob, great to connect!"]
+    assert stats.requests == 2 and stats.failures == 0
+    assert stats.completion_tokens == 24
+
+
+def test_openai_stub_answers_packed_prompts(stubs):
+    stats = BatchStats()
+    leads = [(f"P{i}", f"Role {i}", "Acme") for i in range(10)]
+    messages = {}
+    for indices, batch in generate_messages(leads, max_workers=1, max_retries=10, stats=stats, pack_size=8):
+        messages.update(zip(indices, batch))
+    assert messages == {i: f"Hi P{i}, great to connect!" for i in range(10)}
+    assert stats.requests < 10 and stats.requeued == 0
+
+
+def test_run_size_reports_throughput(stubs):
+    args = argparse.Namespace(
+        requests_per_second=1000, workers=4, page_size=10, max_pages=5, stage_limit=20,
+        ai_workers=2, zapier_workers=2, tracemalloc=True, min_confidence=90, processes=1,
+        ai_pack_size=1,
+    )
+    result = bench.run_size(5, args, stubs["zapier"].url + "/hooks/catch")
+    assert result["domains"] == 5
+    assert result["leads"] > 0
+    assert result["p99_ms"] >= result["p50_ms"] > 0
+    assert result["peak_mb"] > 0
+    assert result["zapier_sent"] == min(result["leads"], 20)
+    assert result["verified"] > 0
+    assert set(result["stages"]) == {"hunter", "verify", "render", "ai", "export", "zapier"}
+
+
+def test_sharded_hunter_stage_reaches_the_stub_from_spawned_workers(stubs, monkeypatch):
+    # Spawned workers re-import hunter, so they only find the stub if the
+    # base URL is handed to them.
+    spawn = partial(ProcessPoolExecutor, mp_context=multiprocessing.get_context("spawn"))
+    monkeypatch.setattr(pipeline, "ProcessPoolExecutor", spawn)
+    args = argparse.Namespace(
+        requests_per_second=1000, workers=4, page_size=10, max_pages=5, stage_limit=5,
+        ai_workers=2, zapier_workers=2, tracemalloc=False, min_confidence=90, processes=2,
+        ai_pack_size=1,
+    )
+    result = bench.run_size(6, args, stubs["zapier"].url + "/hooks/catch")
+    assert result["errors"] == 0
+    assert result["leads"] > 0
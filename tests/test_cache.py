@@ -0,0 +1,63 @@
+import pytest
+
+import cache as cache_module
+from cache import SQLiteCache, make_key
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(cache_module.time, "time", lambda: now[0])
+    return now
+
+
+def test_make_key_is_stable_and_order_independent():
+    assert make_key("domain-search", domain="ing.com", limit=10) == make_key("domain-search", limit=10, domain="ing.com")
+    assert make_key("domain-search", domain="ing.com") != make_key("domain-search", domain="abn.com")
+
+
+def test_get_and_set_round_trip_json(tmp_path):
+    cache = SQLiteCache(str(tmp_path / "c.sqlite"))
+    cache.set("k", {"emails": [{"value": "a@b.com"}]})
+    assert cache.get("k") == {"emails": [{"value": "a@b.com"}]}
+    assert cache.get("missing") is None
+    assert cache.stats()["hits"] == 1
+    assert cache.stats()["misses"] == 1
+
+
+def test_entries_expire_after_ttl(tmp_path, clock):
+    cache = SQLiteCache(str(tmp_path / "c.sqlite"), ttl=60)
+    cache.set("k", 1)
+    clock[0] += 59
+    assert cache.get("k") == 1
+    clock[0] += 2
+    assert cache.get("k") is None
+    assert len(cache) == 0
+
+
+def test_evicts_least_recently_used(tmp_path, clock):
+    cache = SQLiteCache(str(tmp_path / "c.sqlite"), max_entries=3)
+    for key in "abc":
+        clock[0] += 1
+        cache.set(key, key)
+    clock[0] += 1
+    cache.get("a")
+    clock[0] += 1
+    cache.set("d", "d")
+    assert len(cache) == 3
+    assert cache.get("b") is None
+    assert cache.get("a") == "a"
+
+
+def test_persists_across_instances(tmp_path):
+    path = str(tmp_path / "c.sqlite")
+    SQLiteCache(path).set("k", [1, 2])
+    assert SQLiteCache(path).get("k") == [1, 2]
+
+
+def test_clear_resets_entries_and_counters(tmp_path):
+    cache = SQLiteCache(str(tmp_path / "c.sqlite"))
+    cache.set("k", 1)
+    cache.get("k")
+    cache.clear()
+    assert cache.stats() == {"hits": 0, "misses": 0, "hit_rate": 0.0, "entries": 0}
@@ -0,0 +1,36 @@
+import zipfile
+from io import BytesIO
+
+import pandas as pd
+
+from exports import build_csv, build_sugarcrm_csv, build_xlsx, build_zip, frame_hash
+
+LEADS = pd.DataFrame([
+    {"First Name": "Ann", "Last Name": "de Vries", "LinkedIn URL": None, "Company": "ING", "Job Title": "CFO",
+     "Email": "ann@ing.com", "Company Domain": "ing.com", "Personalized Message": "Hi Ann, {braces} stay"},
+])
+
+
+def test_frame_hash_tracks_content_and_columns():
+    assert frame_hash(LEADS) == frame_hash(LEADS.copy())
+    changed = LEADS.copy()
+    changed.loc[0, "Email"] = "other@ing.com"
+    assert frame_hash(changed) != frame_hash(LEADS)
+    assert frame_hash(LEADS.rename(columns={"Email": "email"})) != frame_hash(LEADS)
+
+
+def test_xlsx_round_trips():
+    assert pd.read_excel(BytesIO(build_xlsx(LEADS)))["Email"].tolist() == ["ann@ing.com"]
+
+
+def test_csv_has_bom_and_sugarcrm_renames_columns():
+    assert build_csv(LEADS).startswith(b"\xef\xbb\xbf")
+    header = build_sugarcrm_csv(LEADS).decode("utf-8-sig").splitlines()[0].split(",")
+    assert header == ["first_name", "last_name", "linkedin_c", "account_name", "title", "Email", "Company Domain",
+                      "description"]
+
+
+def test_zip_contains_the_given_buffers():
+    with zipfile.ZipFile(BytesIO(build_zip(b"xlsx-bytes", b"csv-bytes"))) as zipf:
+        assert zipf.read("salesflow_leads_selected.xlsx") == b"xlsx-bytes"
+        assert zipf.read("salesflow_leads_selected.csv") == b"csv-bytes"
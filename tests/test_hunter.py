@@ -0,0 +1,286 @@
+import pytest
+
+import hunter
+from ratelimit import RateLimiter
+
+
+class FakeResponse:
+    def __init__(self, status_code, body=None, headers=None):
+        self.status_code = status_code
+        self.body = body or {}
+        self.headers = headers or {}
+        self.text = str(self.body)
+
+    def json(self):
+        return self.body
+
+
+def page(domain, offset, limit, total, position="CFO"):
+    emails = [
+        {"value": f"p{i}@{domain}", "position": position, "first_name": "Ann", "last_name": "Smit"}
+        for i in range(offset, min(offset + limit, total))
+    ]
+    return {"data": {"organization": domain, "emails": emails}, "meta": {"results": total}}
+
+
+@pytest.fixture
+def calls(monkeypatch):
+    return []
+
+
+@pytest.fixture
+def sleeps(monkeypatch):
+    sleeps = []
+    monkeypatch.setattr(hunter.time, "sleep", sleeps.append)
+    return sleeps
+
+
+def serve(monkeypatch, calls, responder):
+    def fake_get(url, params=None, timeout=None):
+        calls.append(dict(params))
+        return responder(params)
+    monkeypatch.setattr(hunter.SESSION, "get", fake_get)
+
+
+def test_429_without_limiter_sleeps_before_retrying(monkeypatch, calls, sleeps):
+    responses = iter([FakeResponse(429, headers={"Retry-After": "2"}), FakeResponse(200, page("a.com", 0, 10, 1))])
+    serve(monkeypatch, calls, lambda params: next(responses))
+    body = hunter.domain_search("a.com", "key")
+    assert len(body["data"]["emails"]) == 1
+    assert sleeps == [2.0]
+
+
+def test_429_retries_are_bounded(monkeypatch, calls, sleeps):
+    serve(monkeypatch, calls, lambda params: FakeResponse(429, {"errors": [{"details": "slow down"}]}))
+    with pytest.raises(hunter.HunterError, match="slow down"):
+        hunter.domain_search("a.com", "key")
+    assert len(calls) == hunter.MAX_RETRIES + 1
+    assert len(sleeps) == hunter.MAX_RETRIES
+
+
+def test_429_with_limiter_backs_off(monkeypatch, calls):
+    responses = iter([FakeResponse(429, headers={"Retry-After": "0.5"}), FakeResponse(200, page("a.com", 0, 10, 1))])
+    serve(monkeypatch, calls, lambda params: next(responses))
+    limiter = RateLimiter(1000)
+    hunter.domain_search("a.com", "key", limiter=limiter)
+    assert len(calls) == 2
+    assert limiter.rate < 1000
+
+
+def test_fetch_domains_keeps_input_order(monkeypatch, calls):
+    serve(monkeypatch, calls, lambda params: FakeResponse(200, page(params["domain"], 0, 10, 1)))
+    domains = [f"d{i}.com" for i in range(40)]
+    results = list(hunter.fetch_domains(domains, "key", requests_per_second=1000, max_workers=8))
+    assert [domain for domain, _, _ in results] == domains
+    assert all(len(qualified) == 1 and error is None for _, qualified, error in results)
+
+
+def test_fetch_domains_reports_errors_per_domain(monkeypatch, calls):
+    def responder(params):
+        if params["domain"] == "bad.com":
+            return FakeResponse(401, {"errors": [{"details": "No user found"}]})
+        return FakeResponse(200, page(params["domain"], 0, 10, 1))
+    serve(monkeypatch, calls, responder)
+    results = list(hunter.fetch_domains(["a.com", "bad.com", "b.com"], "key", requests_per_second=1000))
+    assert [error is None for _, _, error in results] == [True, False, True]
+    assert "No user found" in results[1][2]
+
+
+def test_domain_search_is_served_from_cache(monkeypatch, calls, tmp_path):
+    from cache import SQLiteCache
+    serve(monkeypatch, calls, lambda params: FakeResponse(200, page(params["domain"], 0, 10, 1)))
+    cache = SQLiteCache(str(tmp_path / "hunter.sqlite"))
+    first = hunter.domain_search("a.com", "key", cache=cache)
+    second = hunter.domain_search("a.com", "other-key", cache=cache)
+    assert first == second
+    assert len(calls) == 1
+
+
+def test_iter_hunter_pages_walks_offsets_until_total(monkeypatch, calls):
+    serve(monkeypatch, calls, lambda params: FakeResponse(200, page("a.com", params["offset"], params["limit"], 25)))
+    pages = list(hunter.iter_hunter_pages("a.com", "key", page_size=10))
+    assert [len(p) for p in pages] == [10, 10, 5]
+    assert [c["offset"] for c in calls] == [0, 10, 20]
+    assert pages[0][0]["company"] == "a.com"
+
+
+def test_iter_hunter_pages_stops_at_max_pages(monkeypatch, calls):
+    serve(monkeypatch, calls, lambda params: FakeResponse(200, page("a.com", params["offset"], params["limit"], 100)))
+    assert len(list(hunter.iter_hunter_pages("a.com", "key", page_size=10, max_pages=2))) == 2
+    assert len(calls) == 2
+
+
+def test_qualify_domain_stops_fetching_at_max_qualified(monkeypatch, calls):
+    serve(monkeypatch, calls, lambda params: FakeResponse(200, page("a.com", params["offset"], params["limit"], 100)))
+    qualified, error = hunter.qualify_domain("a.com", "key", page_size=10, max_qualified=15)
+    assert error is None
+    assert len(qualified) == 15
+    assert len(calls) == 2
+
+
+def test_qualify_domain_keeps_leads_fetched_before_an_error(monkeypatch, calls):
+    def responder(params):
+        if params["offset"]:
+            return FakeResponse(500, {"errors": [{"details": "boom"}]})
+        return FakeResponse(200, page("a.com", 0, 10, 30))
+    serve(monkeypatch, calls, responder)
+    qualified, error = hunter.qualify_domain("a.com", "key", page_size=10)
+    assert len(qualified) == 10
+    assert "boom" in error
+
+
+class HtmlResponse(FakeResponse):
+    def json(self):
+        raise ValueError("Expecting value: line 1 column 1 (char 0)")
+
+
+def test_malformed_body_is_a_per_domain_error(monkeypatch, calls):
+    def responder(params):
+        if params["domain"] == "html.com":
+            return HtmlResponse(200)
+        return FakeResponse(200, page(params["domain"], 0, 10, 1))
+    serve(monkeypatch, calls, responder)
+    results = list(hunter.fetch_domains(["a.com", "html.com", "b.com"], "key", requests_per_second=1000))
+    assert [error is None for _, _, error in results] == [True, False, True]
+    assert "not valid JSON" in results[1][2]
+
+
+def test_fetch_domains_grows_the_shared_connection_pool(monkeypatch, calls):
+    serve(monkeypatch, calls, lambda params: FakeResponse(200, page(params["domain"], 0, 10, 1)))
+    monkeypatch.setattr(hunter, "_session_size", 8)
+    list(hunter.fetch_domains(["a.com"], "key", requests_per_second=1000, max_workers=32))
+    assert hunter.SESSION.get_adapter(hunter.HUNTER_API_BASE)._pool_maxsize == 32
+
+
+def account(available, used=0):
+    return FakeResponse(200, {"data": {"requests": {"searches": {"available": available, "used": used}}}})
+
+
+def serve_keys(monkeypatch, calls, accounts, responder):
+    def fake_get(url, params=None, timeout=None):
+        if url.endswith("/account"):
+            return accounts[params["api_key"]]
+        calls.append(dict(params))
+        return responder(params)
+    monkeypatch.setattr(hunter.SESSION, "get", fake_get)
+
+
+def test_pool_reads_budgets_and_drops_invalid_keys(monkeypatch, calls):
+    serve_keys(monkeypatch, calls, {
+        "key-a": account(50, 10), "key-b": account(25, 25), "key-c": FakeResponse(401, {"errors": [{"details": "bad key"}]}),
+        "key-d": FakeResponse(500, {}),
+    }, None)
+    pool = hunter.HunterKeyPool(["key-a", "key-b", "key-c", "key-d", "key-a"], 10).refresh()
+    assert [key.remaining for key in pool.keys] == [40, 0, 0, None]
+    assert [key.api_key for key in pool.live] == ["key-a", "key-d"]
+    assert pool.remaining is None
+
+
+def test_pool_spreads_searches_by_budget_and_skips_spent_keys(monkeypatch, calls):
+    serve_keys(monkeypatch, calls, {"key-a": account(3), "key-b": account(1)},
+               lambda params: FakeResponse(200, page(params["domain"], 0, 10, 1)))
+    pool = hunter.HunterKeyPool(["key-a", "key-b"], 1000).refresh()
+    for i in range(4):
+        hunter.domain_search(f"d{i}.com", pool)
+    assert sorted(params["api_key"] for params in calls) == ["key-a", "key-a", "key-a", "key-b"]
+    with pytest.raises(hunter.HunterError, match="exhausted"):
+        hunter.domain_search("d5.com", pool)
+
+
+def test_pool_drops_exhausted_key_and_retries_on_another(monkeypatch, calls):
+    def responder(params):
+        if params["api_key"] == "key-a":
+            return FakeResponse(429, {"errors": [{"details": "You have reached your usage limit."}]})
+        return FakeResponse(200, page(params["domain"], 0, 10, 1))
+    serve_keys(monkeypatch, calls, {"key-a": account(500), "key-b": account(10)}, responder)
+    pool = hunter.HunterKeyPool(["key-a", "key-b"], 1000).refresh()
+    body = hunter.domain_search("a.com", pool)
+    assert len(body["data"]["emails"]) == 1
+    assert [params["api_key"] for params in calls] == ["key-a", "key-b"]
+    assert pool.keys[0].dropped == "You have reached your usage limit."
+    assert [key["used"] for key in pool.summary()] == [1, 1]
+
+
+def test_fetch_domains_accepts_a_key_pool(monkeypatch, calls):
+    serve_keys(monkeypatch, calls, {"key-a": account(100), "key-b": account(100)},
+               lambda params: FakeResponse(200, page(params["domain"], 0, 10, 2)))
+    pool = hunter.HunterKeyPool(["key-a", "key-b"], 1000).refresh()
+    results = list(hunter.fetch_domains(["a.com", "b.com", "c.com"], pool, None, max_workers=2))
+    assert [(domain, len(qualified), error) for domain, qualified, error in results] == [
+        ("a.com", 2, None), ("b.com", 2, None), ("c.com", 2, None)
+    ]
+    assert {params["api_key"] for params in calls} == {"key-a", "key-b"}
+
+
+def test_leads_carry_the_searched_domain():
+    leads = hunter._leads_from_payload({"organization": "ING", "domain": "ing.com", "emails": [{"value": "a@ing.com"}]})
+    assert leads == [{"value": "a@ing.com", "company": "ING", "domain": "ing.com"}]
+
+
+def test_leads_carry_the_payload_verification_status():
+    leads = hunter._leads_from_payload({"emails": [{"value": "a@ing.com", "verification": {"status": "valid"}}]})
+    assert leads[0]["verification_status"] == "valid"
+
+
+def test_email_verifier_caches_settled_verdicts_only(monkeypatch, calls, tmp_path, sleeps):
+    from cache import SQLiteCache
+    statuses = {"ann@ing.com": "valid", "bob@ing.com": "unknown"}
+    serve(monkeypatch, calls, lambda params: FakeResponse(200, {"data": {"status": statuses[params["email"]]}}))
+    cache = SQLiteCache(str(tmp_path / "verify.sqlite"))
+    for _ in range(2):
+        assert hunter.email_verifier("ann@ing.com", "key", cache=cache)["status"] == "valid"
+        assert hunter.email_verifier("bob@ing.com", "key", cache=cache)["status"] == "unknown"
+    assert [params["email"] for params in calls] == ["ann@ing.com", "bob@ing.com", "bob@ing.com"]
+
+
+def test_email_verifier_polls_again_while_pending(monkeypatch, calls, sleeps):
+    responses = iter([FakeResponse(202, {"data": {"status": "unknown"}}), FakeResponse(200, {"data": {"status": "invalid"}})])
+    serve(monkeypatch, calls, lambda params: next(responses))
+    limiter = RateLimiter(1000)
+    assert hunter.email_verifier("ann@ing.com", "key", limiter=limiter)["status"] == "invalid"
+    assert len(calls) == 2 and len(sleeps) == 1
+    assert limiter.rate == 1000  # a pending verification is not a rate limit
+
+
+def test_pool_keeps_separate_search_and_verification_budgets(monkeypatch, calls):
+    def budgets(searches, verifications):
+        return FakeResponse(200, {"data": {"requests": {
+            "searches": {"available": searches}, "verifications": {"available": verifications},
+        }}})
+
+    def responder(params):
+        if "email" in params:
+            return FakeResponse(200, {"data": {"status": "valid"}})
+        return FakeResponse(200, page(params["domain"], 0, 10, 1))
+    serve_keys(monkeypatch, calls, {"key-a": budgets(10, 0), "key-b": budgets(0, 10)}, responder)
+    pool = hunter.HunterKeyPool(["key-a", "key-b"], 1000).refresh()
+    assert [key.api_key for key in pool.live] == ["key-a"]
+    hunter.domain_search("a.com", pool)
+    hunter.email_verifier("ann@a.com", pool)
+    assert [params["api_key"] for params in calls] == ["key-a", "key-b"]
+    assert [(key["used"], key["verified"]) for key in pool.summary()] == [(1, 0), (0, 1)]
+    pool.keys[1].verifications = 0
+    with pytest.raises(hunter.HunterError, match="verifications"):
+        hunter.email_verifier("bob@a.com", pool)
+
+
+def test_verify_emails_reports_errors_per_address(monkeypatch, calls):
+    def responder(params):
+        if params["email"] == "bad@x.com":
+            return FakeResponse(400, {"errors": [{"details": "Invalid email"}]})
+        return FakeResponse(200, {"data": {"status": "valid"}})
+    serve(monkeypatch, calls, responder)
+    results = list(hunter.verify_emails(["a@x.com", "bad@x.com", "b@x.com"], "key", requests_per_second=1000))
+    assert [(email, verdict and verdict["status"]) for email, verdict, _ in results] == [
+        ("a@x.com", "valid"), ("bad@x.com", None), ("b@x.com", "valid")
+    ]
+    assert "Invalid email" in results[1][2]
+
+
+@pytest.mark.parametrize("secrets", [
+    {"HUNTER_API_KEYS": "key-a, key-b,,"},
+    {"HUNTER_API_KEYS": ["key-a", " key-b"]},
+])
+def test_hunter_keys_accepts_lists_and_comma_separated_strings(secrets):
+    assert hunter.hunter_keys(secrets) == ["key-a", "key-b"]
+    assert hunter.hunter_keys({"HUNTER_API_KEYS": "", "HUNTER_API_KEY": "key-a"}) == ["key-a"]
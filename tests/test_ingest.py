@@ -0,0 +1,72 @@
+import io
+
+import openpyxl
+import pytest
+
+from ingest import ingest_domains, ingest_file, iter_column_values, normalize_domain
+
+
+@pytest.mark.parametrize("raw, expected", [
+    ("ing.com", "ing.com"),
+    ("https://www.ING.com/nl", "ing.com"),
+    ("http://ing.com:8080/path?q=1", "ing.com"),
+    ("  www.abnamro.nl.  ", "abnamro.nl"),
+    ("jan.jansen@Rabobank.com", "rabobank.com"),
+    ("münchen.de", "xn--mnchen-3ya.de"),
+    ("localhost", None),
+    ("not a domain", None),
+    ("", None),
+    (None, None),
+])
+def test_normalize_domain(raw, expected):
+    assert normalize_domain(raw) == expected
+
+
+def test_ingest_domains_dedupes_after_normalizing_and_keeps_order():
+    domains, stats = ingest_domains(["https://www.ING.com/nl", "abnamro.nl", None, "ing.com", "???", "ABNAMRO.NL"])
+    assert domains == ["ing.com", "abnamro.nl"]
+    assert stats == {"rows": 6, "empty": 1, "invalid": 1, "duplicates": 2, "domains": 2}
+
+
+def test_csv_column_by_index_letter_and_header(tmp_path):
+    path = tmp_path / "domains.csv"
+    path.write_text("Company,Website\nING,https://www.ing.com\nABN,abnamro.nl\nING,ing.com\n", encoding="utf-8-sig")
+    for column in (1, "1", "B", "website"):
+        assert ingest_file(str(path), column) == (
+            ["ing.com", "abnamro.nl"], {"rows": 3, "empty": 0, "invalid": 0, "duplicates": 1, "domains": 2}
+        )
+
+
+def test_wide_sheet_column_letters():
+    header = ",".join(f"c{i}" for i in range(28))
+    row = ",".join(["x"] * 26 + ["ing.com", "abnamro.nl"])
+    upload = io.BytesIO(f"{header}\n{row}\n".encode("utf-8"))
+    assert list(iter_column_values(upload, "AA", "wide.csv")) == ["ing.com"]
+    with pytest.raises(ValueError):
+        list(iter_column_values(io.BytesIO(b"Domain\ning.com\n"), "ÄB", "upload.csv"))
+
+
+def test_uploaded_csv_stays_open():
+    upload = io.BytesIO(b"Company,Domain\nING,ing.com\n")
+    assert list(iter_column_values(upload, "Domain", "upload.csv")) == ["ing.com"]
+    assert not upload.closed
+
+
+def test_xlsx_is_read_in_read_only_mode(tmp_path):
+    workbook = openpyxl.Workbook()
+    sheet = workbook.active
+    sheet.append(["Company", "Domain"])
+    sheet.append(["ING", "www.ing.com"])
+    sheet.append(["Short row"])
+    sheet.append(["Rabo", "rabobank.com"])
+    buffer = io.BytesIO()
+    workbook.save(buffer)
+    buffer.seek(0)
+    assert list(iter_column_values(buffer, "B", "domains.xlsx")) == ["www.ing.com", None, "rabobank.com"]
+
+
+def test_unknown_column_raises(tmp_path):
+    path = tmp_path / "domains.csv"
+    path.write_text("Company,Domain\nING,ing.com\n")
+    with pytest.raises(ValueError):
+        list(iter_column_values(str(path), "Website URL"))
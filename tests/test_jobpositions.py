@@ -0,0 +1,31 @@
+import pytest
+
+from jobpositions import JOB_KEYWORDS, match_job_title
+
+
+@pytest.mark.parametrize("title, keyword", [
+    ("Senior CFO", "CFO"),
+    ("cfo", "CFO"),
+    ("RMs team lead", "RM"),
+    ("FA - Accounts", "FA"),
+    ("Chief Financial Officer", "Chief Financial Officer"),
+    ("Head  of treasury", "Head of Treasury"),
+    ("Head of M&A", "Head Of M&A"),
+    ("Portfolio Managers", "Portfolio Manager"),
+    ("Treasurymanager", "Treasury"),
+    ("Portfoliomanager", "Portfolio"),
+    ("Assetmanager", "Asset"),
+])
+def test_matches_relevant_titles(title, keyword):
+    assert match_job_title(title) == keyword
+
+
+@pytest.mark.parametrize("title", [
+    "Equipment Specialist", "Fashion Designer", "Firmware Developer", "Marketing Coordinator", "Farmer", "", None,
+])
+def test_short_keywords_do_not_match_inside_words(title):
+    assert match_job_title(title) is None
+
+
+def test_every_keyword_matches_itself():
+    assert all(match_job_title(keyword) for keyword in JOB_KEYWORDS)
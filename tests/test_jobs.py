@@ -0,0 +1,120 @@
+import threading
+
+from jobs import JobRegistry, QualificationJob
+from leads import QUALIFIED_COLUMNS
+
+
+def qualified_rows(domain, count):
+    return [
+        dict(zip(QUALIFIED_COLUMNS, [f"lead{i}@{domain}", f"Ann{i} Smith", "CFO", None, "Acme", domain, "CFO", 95, None]))
+        for i in range(count)
+    ]
+
+
+def fake_fetch(gate=None, fail=()):
+    def fetch(domains):
+        for domain in domains:
+            if gate is not None:
+                gate.wait(5)
+            yield domain, qualified_rows(domain, 0 if domain in fail else 2), f"boom {domain}" if domain in fail else None
+    return fetch
+
+
+def test_job_runs_in_background_and_builds_salesflow():
+    job = QualificationJob(["a.com", "b.com", "c.com"], fake_fetch(fail={"b.com"}), "Hi {first_name} at {company}").start()
+    job.thread.join(5)
+    assert job.status == "done"
+    assert (job.done, job.total, job.qualified_count) == (3, 3, 4)
+    assert job.errors == ["boom b.com"]
+    assert job.df_salesflow["Personalized Message"].tolist()[0] == "Hi Ann0 at Acme"
+
+
+def test_cancel_stops_after_current_domain_and_keeps_partial_results():
+    gate = threading.Event()
+    closed = []
+
+    def fetch(domains):
+        try:
+            for index, domain in enumerate(domains):
+                if index:
+                    gate.wait(5)
+                yield domain, qualified_rows(domain, 2), None
+        finally:
+            closed.append(True)
+
+    job = QualificationJob(["a.com", "b.com", "c.com", "d.com"], fetch, "Hi {first_name}").start()
+    while job.done < 1:
+        job.thread.join(0.01)
+    job.cancel()
+    gate.set()
+    job.thread.join(5)
+    assert job.status == "cancelled"
+    assert closed == [True]
+    assert job.done == 2
+    assert job.df_salesflow["Company Domain"].tolist() == ["a.com", "a.com", "b.com", "b.com"]
+
+
+def test_personalize_stage_fills_messages():
+    def personalize(leads, stats):
+        stats.leads += len(leads)
+        yield list(range(len(leads))), [f"Custom for {first}" for first, _, _ in leads]
+
+    job = QualificationJob(["a.com"], fake_fetch(), "Hi {first_name}", personalize).start()
+    job.thread.join(5)
+    assert job.status == "done"
+    assert job.messages_done == job.messages_total == 2
+    assert job.df_salesflow["Personalized Message"].tolist() == ["Custom for Ann0", "Custom for Ann1"]
+    assert job.ai_stats.leads == 2
+
+
+def test_verify_stage_drops_rejected_leads_before_messages():
+    def verify(emails):
+        for email in emails:
+            yield email, {"status": "invalid" if email.startswith("lead0") else "valid"}, None
+
+    job = QualificationJob(["a.com", "b.com"], fake_fetch(), "Hi {first_name}", verify=verify, min_confidence=99).start()
+    job.thread.join(5)
+    assert job.status == "done"
+    assert job.verify_done == job.verify_total == 4
+    assert job.df_salesflow["Email"].tolist() == ["lead1@a.com", "lead1@b.com"]
+    assert job.verify_stats["rejected"] == 2
+    assert job.verdicts["lead0@a.com"] == "invalid"
+
+
+def test_failure_is_reported_not_raised():
+    def fetch(domains):
+        raise RuntimeError("no network")
+        yield
+
+    job = QualificationJob(["a.com"], fetch, "Hi").start()
+    job.thread.join(5)
+    assert job.status == "failed"
+    assert job.error == "no network"
+
+
+def test_failure_keeps_leads_qualified_before_it():
+    def fetch(domains):
+        yield "a.com", qualified_rows("a.com", 2), None
+        raise ValueError("Expecting value: line 1 column 1 (char 0)")
+
+    job = QualificationJob(["a.com", "b.com"], fetch, "Hi {first_name}").start()
+    job.thread.join(5)
+    assert job.status == "failed"
+    assert len(job.df_qualified) == 2
+    assert job.df_salesflow["Personalized Message"].tolist() == ["Hi Ann0", "Hi Ann1"]
+
+
+def test_registry_keeps_running_jobs_and_drops_oldest_finished():
+    gate = threading.Event()
+    registry = JobRegistry(max_jobs=2)
+    running = registry.add(QualificationJob(["a.com"], fake_fetch(gate), "Hi").start())
+    finished = []
+    for _ in range(3):
+        job = registry.add(QualificationJob([], fake_fetch(), "Hi").start())
+        job.thread.join(5)
+        finished.append(job)
+    assert registry.get(running.id) is running
+    assert registry.get(finished[0].id) is None
+    assert registry.running() == [running]
+    gate.set()
+    running.thread.join(5)
@@ -0,0 +1,80 @@
+import pandas as pd
+import pytest
+
+from jobpositions import match_job_title
+from leads import QUALIFIED_COLUMNS, SALESFLOW_COLUMNS, build_salesflow_frame, filter_leads, qualified_frame
+
+RAW_LEADS = [
+    {"value": "ann@ing.com", "first_name": "Ann", "last_name": "de Vries", "position": "CFO",
+     "linkedin": "https://linkedin.com/in/ann", "company": "ING", "domain": "ing.com"},
+    {"value": "bob@ing.com", "first_name": "Bob", "last_name": None, "position": "Treasurymanager",
+     "linkedin": "", "linkedin_url": "https://linkedin.com/in/bob", "company": "ING"},
+    {"value": "carl@gmail.com", "first_name": "Carl", "position": "Head of Treasury", "company": "ING"},
+    {"value": "dee@YAHOO.com", "position": "CFO", "company": "ING"},
+    {"value": None, "position": "CFO", "company": "ING"},
+    {"value": "", "position": "CFO", "company": "ING"},
+    {"value": "eve@ing.com", "first_name": None, "last_name": "Smit", "position": None, "company": "ING"},
+    {"value": "fay@ing.com", "first_name": "Fay", "position": "Equipment Specialist", "company": "ING"},
+    {"value": "gus@ing.com", "first_name": "Gus", "position": "Portfolio Manager", "company": None},
+    {"value": "hal@ing.com", "first_name": "Hal", "position": "RM"},
+    {"value": "ida@ing.com", "first_name": "Ida", "position": "Head of M&A", "linkedin": None, "company": "ING"},
+]
+
+
+def reference_filter_leads(leads):
+    # The original row-by-row filter from app.py, kept as the specification.
+    qualified = []
+    for lead in leads:
+        email = lead.get("value")
+        position = lead.get("position")
+        if not email or email.split('@')[-1].lower() in ["gmail.com", "yahoo.com", "hotmail.com", "outlook.com"]:
+            continue
+        keyword = match_job_title(position)
+        if keyword:
+            qualified.append({
+                "Email": email,
+                "Full Name": (lead.get("first_name") or "") + " " + (lead.get("last_name") or ""),
+                "Position": position,
+                "LinkedIn": lead.get("linkedin") or lead.get("linkedin_url"),
+                "Company": lead.get("company", "N/A"),
+                "Company Domain": lead.get("domain"),
+                "Matched Keyword": keyword,
+                "Confidence": lead.get("confidence"),
+                "Verification": lead.get("verification_status"),
+            })
+    return qualified
+
+
+def test_filter_leads_matches_row_semantics():
+    assert filter_leads(RAW_LEADS) == reference_filter_leads(RAW_LEADS)
+
+
+def test_qualified_frame_keeps_none_for_missing_fields():
+    row = qualified_frame(filter_leads([{"value": "a@x.com", "position": "CFO"}])).iloc[0]
+    assert row["LinkedIn"] is None
+    assert row["Company Domain"] is None
+    assert row["Company"] == "N/A"
+
+
+@pytest.mark.parametrize("leads", [[], [{"value": None, "position": None}]])
+def test_qualified_frame_handles_empty_input(leads):
+    qualified = qualified_frame(filter_leads(leads))
+    assert qualified.empty
+    assert list(qualified.columns) == QUALIFIED_COLUMNS
+
+
+def test_build_salesflow_frame_splits_names_and_renders_messages():
+    qualified = qualified_frame(filter_leads(RAW_LEADS))
+    salesflow = build_salesflow_frame(qualified, "Hi {first_name}, {position} at {company}")
+    first = salesflow.iloc[0]
+    assert (first["First Name"], first["Last Name"]) == ("Ann", "de Vries")
+    assert first["Personalized Message"] == "Hi Ann, CFO at ING"
+    assert salesflow.iloc[1]["Last Name"] == ""
+    assert salesflow.iloc[1]["LinkedIn URL"] == "https://linkedin.com/in/bob"
+    assert list(salesflow.columns) == SALESFLOW_COLUMNS
+
+
+def test_build_salesflow_frame_handles_blank_names():
+    qualified = pd.DataFrame([{**dict.fromkeys(QUALIFIED_COLUMNS), "Full Name": " ", "Position": "CFO", "Company": "X"}])
+    salesflow = build_salesflow_frame(qualified, "Hi {first_name}")
+    assert salesflow.iloc[0][["First Name", "Last Name", "Personalized Message"]].tolist() == ["", "", "Hi "]
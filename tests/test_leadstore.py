@@ -0,0 +1,114 @@
+import sqlite3
+
+from leads import QUALIFIED_COLUMNS
+from leadstore import LeadStore, incremental_fetch
+
+
+def qualified(domain, *emails, position="CFO"):
+    return [
+        dict(zip(QUALIFIED_COLUMNS, [email, "Ann Smit", position, None, domain.upper(), domain, "CFO", 80, None]))
+        for email in emails
+    ]
+
+
+def column(leads, name):
+    return [lead[name] for lead in leads]
+
+
+def test_upsert_dedupes_by_email_and_refreshes_rows(tmp_path):
+    store = LeadStore(str(tmp_path / "leads.sqlite"))
+    assert store.upsert("ing.com", qualified("ing.com", "a@ing.com", "b@ing.com")) == 2
+    assert store.upsert("ing.com", qualified("ing.com", "b@ing.com", "c@ing.com", position="Treasury Manager")) == 1
+    leads = store.leads_for_domain("ing.com")
+    assert column(leads, "Email") == ["a@ing.com", "b@ing.com", "c@ing.com"]
+    assert column(leads, "Position") == ["CFO", "Treasury Manager", "Treasury Manager"]
+    assert column(leads, "LinkedIn") == [None, None, None]
+    assert store.stats() == {"leads": 3, "domains": 1}
+
+
+def test_search_by_company_and_title(tmp_path):
+    store = LeadStore(str(tmp_path / "leads.sqlite"))
+    store.upsert("ing.com", qualified("ing.com", "a@ing.com"))
+    store.upsert("abnamro.nl", qualified("abnamro.nl", "a@abnamro.nl", position="Head of Treasury"))
+    assert store.search(company="ING")["Email"].tolist() == ["a@ing.com"]
+    assert store.search(title="treasury")["Email"].tolist() == ["a@abnamro.nl"]
+    assert len(store.search()) == 2
+
+
+def test_fresh_domains_respect_the_window(tmp_path):
+    store = LeadStore(str(tmp_path / "leads.sqlite"))
+    store.upsert("ing.com", qualified("ing.com"))
+    assert store.fresh_domains(["ing.com", "abnamro.nl"], 3600) == {"ing.com"}
+    assert store.fresh_domains(["ing.com"], -1) == set()
+
+
+def test_incremental_fetch_skips_fresh_domains_and_known_leads(tmp_path):
+    store = LeadStore(str(tmp_path / "leads.sqlite"))
+    store.upsert("ing.com", qualified("ing.com", "a@ing.com"))
+    store.upsert("rabobank.com", qualified("rabobank.com", "old@rabobank.com"))
+    fetched = []
+
+    def fetch(domains):
+        fetched.extend(domains)
+        for domain in domains:
+            if domain == "broken.com":
+                yield domain, qualified(domain), "boom"
+            else:
+                yield domain, qualified(domain, f"new@{domain}", "old@rabobank.com"), None
+
+    results = {
+        domain: (column(leads, "Email"), error)
+        for domain, leads, error in incremental_fetch(
+            fetch, store, ["ing.com", "rabobank.com", "broken.com"], max_age=3600
+        )
+    }
+    assert fetched == ["broken.com"]
+    assert results["rabobank.com"] == (["old@rabobank.com"], None)
+    assert results["ing.com"] == (["a@ing.com"], None)
+    assert results["broken.com"] == ([], "boom")
+    assert store.fresh_domains(["broken.com"], 3600) == set()
+
+    results = list(incremental_fetch(fetch, store, ["abnamro.nl"], skip_known=True))
+    assert column(results[0][1], "Email") == ["new@abnamro.nl"]
+
+
+def test_older_databases_gain_the_verification_columns(tmp_path):
+    path = str(tmp_path / "leads.sqlite")
+    conn = sqlite3.connect(path)
+    conn.execute(
+        "CREATE TABLE leads (email TEXT PRIMARY KEY, full_name TEXT, position TEXT, linkedin TEXT, company TEXT,"
+        " company_domain TEXT, matched_keyword TEXT, source_domain TEXT NOT NULL,"
+        " first_seen REAL NOT NULL, last_seen REAL NOT NULL)"
+    )
+    conn.execute("INSERT INTO leads VALUES ('a@ing.com', 'Ann', 'CFO', NULL, 'ING', 'ing.com', 'CFO', 'ing.com', 0, 0)")
+    conn.commit()
+    conn.close()
+    store = LeadStore(path)
+    store.record_verification({"a@ing.com": "valid"})
+    store.upsert("ing.com", qualified("ing.com", "a@ing.com"))
+    leads = store.leads_for_domain("ing.com")
+    assert [(lead["Confidence"], lead["Verification"]) for lead in leads] == [(80, "valid")]
+
+
+def test_skip_known_only_skips_leads_seen_within_the_window(tmp_path):
+    store = LeadStore(str(tmp_path / "leads.sqlite"))
+    store.upsert("old.com", qualified("old.com", "stale@ing.com"))
+    store.upsert("new.com", qualified("new.com", "recent@ing.com"))
+    store.conn.execute("UPDATE leads SET last_seen = last_seen - 7200 WHERE email = 'stale@ing.com'")
+    store.conn.commit()
+
+    def fetch(domains):
+        for domain in domains:
+            yield domain, qualified(domain, "stale@ing.com", "recent@ing.com", "fresh@ing.com"), None
+
+    [(_, leads, _)] = incremental_fetch(fetch, store, ["ing.com"], max_age=3600, skip_known=True)
+    assert column(leads, "Email") == ["stale@ing.com", "fresh@ing.com"]
+    assert store.known_emails(["stale@ing.com", "other@ing.com"]) == {"stale@ing.com"}
+
+
+def test_search_leaves_out_rejected_leads(tmp_path):
+    store = LeadStore(str(tmp_path / "leads.sqlite"))
+    store.upsert("ing.com", qualified("ing.com", "a@ing.com", "b@ing.com", "c@ing.com"))
+    store.record_verification({"a@ing.com": "invalid", "b@ing.com": "valid"})
+    assert store.search()["Email"].tolist() == ["b@ing.com", "c@ing.com"]
+    assert len(store.search(include_rejected=True)) == 3
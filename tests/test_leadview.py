@@ -0,0 +1,45 @@
+import pandas as pd
+
+from leadview import apply_edits, matching_index, page_of
+
+
+def salesflow():
+    return pd.DataFrame({
+        "First Name": ["Ann", "Bob", "Cas", "Dirk", None],
+        "Last Name": ["Smit", "Jansen", "de Vries", "Bakker", "Visser"],
+        "Email": ["ann@ing.com", "bob@ing.com", "cas@abn.nl", "dirk@rabo.nl", "x@abn.nl"],
+        "Company": ["ING", "ING", "ABN", "Rabo", "ABN"],
+        "Job Title": ["CFO", "Treasury Manager", "Head of Treasury", None, "Trader"],
+    }, index=[10, 11, 12, 13, 14])
+
+
+def test_no_filters_match_everything():
+    assert matching_index(salesflow()).tolist() == [10, 11, 12, 13, 14]
+
+
+def test_filters_combine():
+    df = salesflow()
+    assert matching_index(df, companies=["ABN"]).tolist() == [12, 14]
+    assert matching_index(df, title="treasury").tolist() == [11, 12]
+    assert matching_index(df, companies=["ING"], title="TREASURY").tolist() == [11]
+    assert matching_index(df, search="de vries").tolist() == [12]
+    assert matching_index(df, search="abn.nl", title="trader").tolist() == [14]
+
+
+def test_search_treats_input_literally():
+    assert matching_index(salesflow(), search="(").tolist() == []
+
+
+def test_pages_are_clamped():
+    index = pd.Index(range(7))
+    labels, pages = page_of(index, 1, 3)
+    assert (labels.tolist(), pages) == ([0, 1, 2], 3)
+    assert page_of(index, 3, 3)[0].tolist() == [6]
+    assert page_of(index, 9, 3)[0].tolist() == [6]
+    assert page_of(pd.Index([]), 1, 3)[1] == 1
+
+
+def test_apply_edits_updates_the_selection_by_label():
+    selected = {10, 13}
+    apply_edits(selected, pd.Index([12, 13, 14]), {0: {"Select": True}, "1": {"Select": False}, 2: {"Email": "x"}})
+    assert selected == {10, 12}
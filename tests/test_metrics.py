@@ -0,0 +1,82 @@
+import json
+
+import pytest
+
+import hunter
+from cache import SQLiteCache
+from metrics import METRICS, Metrics
+
+
+def test_counters_and_histograms_are_keyed_by_labels():
+    metrics = Metrics()
+    metrics.inc("requests_total", status=200)
+    metrics.inc("requests_total", 2, status=200)
+    metrics.inc("requests_total", status=429)
+    for value in (0.004, 0.02, 0.02, 3.0):
+        metrics.observe("request_seconds", value, endpoint="search")
+    assert metrics.counter("requests_total", status=200) == 3
+    snapshot = json.loads(metrics.to_json())
+    [histogram] = snapshot["histograms"]
+    assert (histogram["count"], histogram["p50_s"], histogram["p99_s"]) == (4, 0.025, 5.0)
+    assert histogram["labels"] == {"endpoint": "search"}
+
+
+def test_timer_records_failed_blocks():
+    metrics = Metrics()
+    with pytest.raises(ValueError):
+        with metrics.timer("work_seconds"):
+            raise ValueError
+    assert metrics.snapshot()["histograms"][0]["count"] == 1
+
+
+def test_prometheus_text():
+    metrics = Metrics()
+    metrics.inc("cache_lookups_total", cache="hunter", result="hit")
+    metrics.inc("cache_lookups_total", 3, cache="hunter", result="miss")
+    metrics.observe("export_build_seconds", 0.3, format="csv")
+    text = metrics.to_prometheus()
+    assert '# TYPE leadqualifier_cache_lookups_total counter\n' in text
+    assert 'leadqualifier_cache_lookups_total{cache="hunter",result="miss"} 3\n' in text
+    assert 'leadqualifier_export_build_seconds_bucket{format="csv",le="0.25"} 0\n' in text
+    assert 'leadqualifier_export_build_seconds_bucket{format="csv",le="0.5"} 1\n' in text
+    assert 'leadqualifier_export_build_seconds_bucket{format="csv",le="+Inf"} 1\n' in text
+    assert 'leadqualifier_export_build_seconds_count{format="csv"} 1\n' in text
+    assert metrics.hit_rates() == {"hunter": 0.25}
+
+
+def test_hunter_search_records_credits_and_cache_hits(monkeypatch, tmp_path):
+    class Response:
+        status_code = 200
+        headers = {}
+
+        def json(self):
+            return {"data": {"emails": []}, "meta": {"results": 0}}
+
+    monkeypatch.setattr(hunter.SESSION, "get", lambda url, params=None, timeout=None: Response())
+    METRICS.reset()
+    cache = SQLiteCache(str(tmp_path / "hunter.sqlite"))
+    hunter.domain_search("a.com", "key", cache=cache)
+    hunter.domain_search("a.com", "key", cache=cache)
+    assert METRICS.counter("hunter_credits_used_total") == 1
+    assert METRICS.counter("hunter_requests_total", endpoint="domain-search", status=200) == 1
+    assert METRICS.hit_rates() == {"hunter": 0.5}
+
+
+def test_lead_counts_are_recorded_once_per_domain_with_max_qualified(monkeypatch):
+    emails = [{"value": f"p{i}@a.com", "position": "CFO" if i % 2 else "Intern"} for i in range(9)]
+
+    class Response:
+        status_code = 200
+        headers = {}
+
+        def json(self):
+            return {"data": {"organization": "A", "emails": emails}, "meta": {"results": 9}}
+
+    monkeypatch.setattr(hunter.SESSION, "get", lambda url, params=None, timeout=None: Response())
+    METRICS.reset()
+    qualified, _ = hunter.qualify_domain("a.com", "key", page_size=10, max_qualified=10)
+    assert len(qualified) == 4
+    assert METRICS.counter("leads_seen_total") == 9
+    assert METRICS.counter("leads_qualified_total") == 4
+    [histogram] = [h for h in METRICS.snapshot()["histograms"] if h["name"] == "filter_leads_seconds"]
+    assert histogram["count"] == 1
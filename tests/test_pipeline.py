@@ -0,0 +1,153 @@
+import json
+
+import pandas as pd
+import pytest
+
+import hunter
+import pipeline
+from leadstore import LeadStore
+
+
+class FakeResponse:
+    def __init__(self, status_code, body):
+        self.status_code = status_code
+        self.body = body
+        self.headers = {}
+        self.text = json.dumps(body)
+
+    def json(self):
+        return self.body
+
+
+@pytest.fixture
+def hunter_api(monkeypatch):
+    state = {"calls": [], "failing": set(), "verified": [], "invalid": set()}
+
+    def fake_get(url, params=None, timeout=None):
+        if url.endswith("/account"):
+            return FakeResponse(200, {"data": {"requests": {"searches": {"used": 0, "available": 100}}}})
+        if url.endswith("/email-verifier"):
+            state["verified"].append(params["email"])
+            return FakeResponse(200, {"data": {"status": "invalid" if params["email"] in state["invalid"] else "valid"}})
+        domain = params["domain"]
+        state["calls"].append(domain)
+        if domain in state["failing"]:
+            return FakeResponse(500, {"errors": [{"details": "boom"}]})
+        emails = [
+            {"value": f"cfo@{domain}", "position": "CFO", "first_name": "Ann", "last_name": "Smit"},
+            {"value": f"chef@{domain}", "position": "Chef", "first_name": "Bob", "last_name": "Jansen"},
+        ]
+        return FakeResponse(200, {"data": {"organization": domain.upper(), "emails": emails}, "meta": {"results": 2}})
+    monkeypatch.setattr(hunter.SESSION, "get", fake_get)
+    monkeypatch.setenv("HUNTER_API_KEY", "test-key")
+    return state
+
+
+@pytest.fixture
+def domains_csv(tmp_path):
+    path = tmp_path / "domains.csv"
+    pd.DataFrame({"Company": ["ING", "ABN", "Rabo", "ING again"],
+                  "Domain": ["ing.com", "abnamro.com", "rabobank.com", "ing.com"]}).to_csv(path, index=False)
+    return str(path)
+
+
+def run(domains_csv, tmp_path):
+    return pipeline.main([domains_csv, "--output-dir", str(tmp_path / "out"), "--secrets", str(tmp_path / "none.toml"),
+                          "--template", "Hi {first_name} at {company}", "--no-cache", "--no-store"])
+
+
+def test_cli_writes_outputs_and_resumes_from_checkpoint(hunter_api, domains_csv, tmp_path):
+    hunter_api["failing"].add("abnamro.com")
+    assert run(domains_csv, tmp_path) == 1
+    assert sorted(hunter_api["calls"]) == ["abnamro.com", "ing.com", "rabobank.com"]
+    with open(tmp_path / "out" / "checkpoint.jsonl") as f:
+        assert sorted(json.loads(line)["domain"] for line in f) == ["ing.com", "rabobank.com"]
+
+    hunter_api["calls"].clear()
+    hunter_api["failing"].clear()
+    assert run(domains_csv, tmp_path) == 0
+    assert hunter_api["calls"] == ["abnamro.com"]
+    leads = pd.read_csv(tmp_path / "out" / "salesflow_leads_selected.csv", encoding="utf-8-sig")
+    assert sorted(leads["Email"]) == ["cfo@abnamro.com", "cfo@ing.com", "cfo@rabobank.com"]
+    assert "Hi Ann at ING.COM" in leads["Personalized Message"].tolist()
+    for name in ("qualified_leads_selected.xlsx", "lead_outputs_selected.zip", "sugarcrm_leads_selected.csv"):
+        assert (tmp_path / "out" / name).exists()
+
+
+def test_checkpoint_ignores_truncated_lines(tmp_path):
+    path = tmp_path / "checkpoint.jsonl"
+    path.write_text('{"domain": "ing.com", "leads": []}\n{"domain": "abn', encoding="utf-8")
+    checkpoint = pipeline.Checkpoint(str(path))
+    checkpoint.record("rabobank.com", [])
+    checkpoint.close()
+    assert list(checkpoint.done) == ["ing.com", "rabobank.com"]
+    assert list(pipeline.Checkpoint(str(path)).done) == ["ing.com", "rabobank.com"]
+
+
+def test_lead_store_serves_fresh_domains_without_hunter(hunter_api, domains_csv, tmp_path):
+    args = [domains_csv, "--output-dir", str(tmp_path / "out"), "--secrets", str(tmp_path / "none.toml"),
+            "--no-cache", "--store", str(tmp_path / "leads.sqlite")]
+    assert pipeline.main(args + ["--checkpoint", str(tmp_path / "first.jsonl")]) == 0
+    calls = len(hunter_api["calls"])
+    assert pipeline.main(args + ["--checkpoint", str(tmp_path / "second.jsonl")]) == 0
+    assert len(hunter_api["calls"]) == calls
+    leads = pd.read_csv(tmp_path / "out" / "salesflow_leads_selected.csv", encoding="utf-8-sig")
+    assert sorted(leads["Email"]) == ["cfo@abnamro.com", "cfo@ing.com", "cfo@rabobank.com"]
+
+
+def test_verify_drops_invalid_addresses_before_export(hunter_api, domains_csv, tmp_path):
+    hunter_api["invalid"].add("cfo@rabobank.com")
+    store = tmp_path / "leads.sqlite"
+    assert pipeline.main([
+        domains_csv, "--output-dir", str(tmp_path / "out"), "--secrets", str(tmp_path / "none.toml"),
+        "--no-cache", "--store", str(store), "--verify",
+    ]) == 0
+    assert sorted(hunter_api["verified"]) == ["cfo@abnamro.com", "cfo@ing.com", "cfo@rabobank.com"]
+    leads = pd.read_csv(tmp_path / "out" / "salesflow_leads_selected.csv", encoding="utf-8-sig")
+    assert sorted(leads["Email"]) == ["cfo@abnamro.com", "cfo@ing.com"]
+    stored = LeadStore(str(store)).search(include_rejected=True)
+    assert dict(zip(stored["Email"], stored["Verification"]))["cfo@rabobank.com"] == "invalid"
+    assert "cfo@rabobank.com" not in LeadStore(str(store)).search()["Email"].tolist()
+
+
+# The sharded tests rely on the fork start method (the Linux default) so the
+# worker processes inherit the patched hunter.SESSION.get.
+def shard_emails(path):
+    return sorted(email for leads in pipeline.Checkpoint.load(path)[0].values() for email in [l["Email"] for l in leads])
+
+
+def test_sharded_run_merges_shards_and_resumes_failed_domains(hunter_api, domains_csv, tmp_path):
+    hunter_api["failing"].add("abnamro.com")
+    args = [domains_csv, "--output-dir", str(tmp_path / "out"), "--secrets", str(tmp_path / "none.toml"),
+            "--template", "Hi {first_name}", "--no-cache", "--no-store", "--processes", "2", "--shard-size", "1"]
+    assert pipeline.main(args) == 1
+    paths = pipeline.shard_paths(str(tmp_path / "out" / "checkpoint.jsonl"))
+    assert len(paths) == 3
+    leads = pd.read_csv(tmp_path / "out" / "salesflow_leads_selected.csv", encoding="utf-8-sig")
+    assert sorted(leads["Email"]) == ["cfo@ing.com", "cfo@rabobank.com"]
+
+    hunter_api["failing"].clear()
+    assert pipeline.main(args) == 0
+    paths = pipeline.shard_paths(str(tmp_path / "out" / "checkpoint.jsonl"))
+    assert len(paths) == 4 and shard_emails(paths[-1]) == ["cfo@abnamro.com"]
+    leads = pd.read_csv(tmp_path / "out" / "salesflow_leads_selected.csv", encoding="utf-8-sig")
+    assert sorted(leads["Email"]) == ["cfo@abnamro.com", "cfo@ing.com", "cfo@rabobank.com"]
+
+
+def test_a_crashing_shard_does_not_take_the_others_down(monkeypatch, tmp_path):
+    def fake_get(url, params=None, timeout=None):
+        if params["domain"] == "crash.com":
+            raise RuntimeError("worker bug")
+        # Every domain lists the same shared inbox, which the merge dedupes.
+        emails = [{"value": f"cfo@{params['domain']}", "position": "CFO"}, {"value": "cfo@group.com", "position": "CFO"}]
+        return FakeResponse(200, {"data": {"organization": "X", "emails": emails}, "meta": {"results": 2}})
+    monkeypatch.setattr(hunter.SESSION, "get", fake_get)
+    checkpoint = pipeline.Checkpoint(str(tmp_path / "checkpoint.jsonl"))
+    shards = []
+    qualified, errors = pipeline.run_sharded(
+        ["a.com", "crash.com", "b.com", "c.com"], ["key"], checkpoint, processes=2, shard_size=1,
+        requests_per_second=1000, on_shard=lambda *report: shards.append(report[:2]),
+    )
+    assert qualified["Email"].tolist() == ["cfo@a.com", "cfo@group.com", "cfo@b.com", "cfo@c.com"]
+    assert list(errors) == ["crash.com"] and "worker bug" in errors["crash.com"]
+    assert sorted(shards) == [(1, 4), (2, 4), (3, 4), (4, 4)]
@@ -0,0 +1,33 @@
+import time
+
+from ratelimit import RateLimiter
+
+
+def test_acquire_allows_burst_then_throttles():
+    limiter = RateLimiter(20, burst=5)
+    start = time.monotonic()
+    for _ in range(5):
+        limiter.acquire()
+    assert time.monotonic() - start < 0.05
+    for _ in range(4):
+        limiter.acquire()
+    assert time.monotonic() - start >= 0.15
+
+
+def test_backoff_halves_rate_and_pauses():
+    limiter = RateLimiter(10)
+    limiter.backoff(0.2)
+    assert limiter.rate == 5
+    start = time.monotonic()
+    limiter.acquire()
+    assert time.monotonic() - start >= 0.2
+
+
+def test_backoff_respects_min_rate_and_success_recovers():
+    limiter = RateLimiter(1, min_rate=0.5)
+    for _ in range(5):
+        limiter.backoff(0)
+    assert limiter.rate == 0.5
+    for _ in range(20):
+        limiter.success()
+    assert limiter.rate == 1
@@ -0,0 +1,10 @@
+from benchmarks.startup import measure_fresh
+
+
+def test_app_renders_without_loading_heavy_modules():
+    # Runs app.py in a fresh interpreter; openai and openpyxl must wait
+    # until a message is generated or an xlsx file is read.
+    result = measure_fresh(reruns=1)
+    assert result["exceptions"] == []
+    assert result["loaded"] == []
+    assert result["first_run"] > 0 and len(result["reruns"]) == 1
@@ -0,0 +1,59 @@
+import pandas as pd
+
+from leads import build_salesflow_frame
+from template import LINKEDIN_NOTE_LIMIT, MessageTemplate, message_issues, templatize
+
+
+def test_only_known_placeholders_are_filled():
+    template = MessageTemplate("Hi {first_name}! {name} {} {{company}} at {company} {")
+    assert template.placeholders == {"first_name", "company"}
+    assert template.unknown == ["name"]
+    assert template.render_one(first_name="Ann", company="ING") == "Hi Ann! {name} {} {ING} at ING {"
+
+
+def test_render_is_columnwise_and_keeps_the_index():
+    template = MessageTemplate("{first_name} – {position} @ {company}")
+    messages = template.render({
+        "first_name": pd.Series(["Ann", None], index=[5, 7]),
+        "position": pd.Series(["CFO", "Trader"], index=[5, 7]),
+        "company": pd.Series(["ING", float("nan")], index=[5, 7]),
+    })
+    assert messages.to_dict() == {5: "Ann – CFO @ ING", 7: " – Trader @ "}
+
+
+def test_salesflow_rendering_survives_stray_braces():
+    qualified = pd.DataFrame({
+        "Email": ["a@x.com"], "Full Name": ["Ann Smit"], "Position": ["CFO {EMEA}"], "LinkedIn": [None],
+        "Company": ["X"], "Company Domain": ["x.com"], "Matched Keyword": ["CFO"],
+    })
+    salesflow = build_salesflow_frame(qualified, "Hi {first_name} :-} {position} {0}")
+    assert salesflow["Personalized Message"].tolist() == ["Hi Ann :-} CFO {EMEA} {0}"]
+
+
+def test_message_issues_are_reported_per_row():
+    messages = ["Hi Ann", "Hi ", "x" * (LINKEDIN_NOTE_LIMIT + 1), "Hi " + "y" * LINKEDIN_NOTE_LIMIT]
+    issues = message_issues(messages, ["Ann", " ", "Bob", None])
+    assert issues.tolist() == [
+        "",
+        "missing first name",
+        f"over {LINKEDIN_NOTE_LIMIT} characters ({LINKEDIN_NOTE_LIMIT + 1})",
+        f"missing first name; over {LINKEDIN_NOTE_LIMIT} characters ({LINKEDIN_NOTE_LIMIT + 3})",
+    ]
+
+
+def test_templatize_replaces_whole_words_only():
+    message = "Hi Ann, your Annual report as CFO of Ann Arbor Capital caught my eye."
+    assert templatize(message, "Ann", "CFO", "Ann Arbor Capital") == (
+        "Hi {first_name}, your Annual report as {position} of {company} caught my eye."
+    )
+
+
+def test_templatize_leaves_placeholders_and_blanks_alone():
+    message = "Hi {first_name}, {position} at {company}."
+    assert templatize(message, "{first_name}", "{position}", "{company}") == message
+    assert templatize("Hi there", "", " ", None) == "Hi there"
+
+
+def test_rendering_an_empty_frame_gives_an_empty_frame():
+    empty = pd.DataFrame(columns=["Email", "Full Name", "Position", "LinkedIn", "Company", "Company Domain"])
+    assert build_salesflow_frame(empty, "Hi {first_name} at {company}").empty
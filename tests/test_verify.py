@@ -0,0 +1,54 @@
+import pandas as pd
+
+from leads import QUALIFIED_COLUMNS
+from verify import apply_verdicts, emails_to_verify, verify_leads
+
+
+def qualified(*rows):
+    # rows of (email, confidence, payload verification status)
+    return pd.DataFrame([
+        [email, "Ann Smit", "CFO", None, "ING", "ing.com", "CFO", confidence, status]
+        for email, confidence, status in rows
+    ], columns=QUALIFIED_COLUMNS)
+
+
+def fake_verify(statuses, calls):
+    def verify(emails):
+        calls.extend(emails)
+        for email in emails:
+            if statuses[email] == "error":
+                yield email, None, f"Error verifying {email}"
+            else:
+                yield email, {"status": statuses[email]}, None
+    return verify
+
+
+def test_high_confidence_and_already_rejected_addresses_are_not_checked():
+    frame = qualified(
+        ("a@ing.com", 95, None), ("b@ing.com", 60, "valid"), ("c@ing.com", None, None),
+        ("d@ing.com", 40, "invalid"), ("b@ing.com", 60, "valid"),
+    )
+    assert emails_to_verify(frame, min_confidence=90) == ["b@ing.com", "c@ing.com"]
+    assert emails_to_verify(frame, min_confidence=0) == ["c@ing.com"]
+
+
+def test_verify_leads_drops_rejected_and_keeps_unchecked_leads():
+    frame = qualified(
+        ("a@ing.com", 95, None), ("b@ing.com", 10, None), ("c@ing.com", 10, None),
+        ("d@ing.com", 10, None), ("e@ing.com", 10, "disposable"),
+    )
+    calls, results = [], []
+    verify = fake_verify({"b@ing.com": "invalid", "c@ing.com": "accept_all", "d@ing.com": "error"}, calls)
+    kept, stats = verify_leads(frame, verify, 90, on_result=lambda *result: results.append(result))
+    assert calls == ["b@ing.com", "c@ing.com", "d@ing.com"]
+    assert kept[["Email", "Verification"]].values.tolist() == [
+        ["a@ing.com", None], ["c@ing.com", "accept_all"], ["d@ing.com", None],
+    ]
+    assert stats == {"leads": 5, "verified": 2, "unchecked": 2, "rejected": 2, "errors": 1}
+    assert [status for _, status, _ in results] == ["invalid", "accept_all", None]
+
+
+def test_fresh_verdict_overrides_the_payload_status():
+    kept, stats = apply_verdicts(qualified(("a@ing.com", 10, "invalid")), {"a@ing.com": "valid"})
+    assert kept["Verification"].tolist() == ["valid"]
+    assert stats["rejected"] == 0
@@ -0,0 +1,81 @@
+import pandas as pd
+import pytest
+
+import zapier
+from benchmarks.stubs import start_zapier_stub
+
+
+@pytest.fixture(autouse=True)
+def fast_retries(monkeypatch):
+    monkeypatch.setattr(zapier, "_retry_delay", lambda response, attempt: 0)
+
+
+def leads(count):
+    return [{"email": f"lead{i}@ing.com", "first_name": f"Lead{i}"} for i in range(count)]
+
+
+def test_send_leads_delivers_all_in_order():
+    stub = start_zapier_stub()
+    try:
+        reports = zapier.send_leads(stub.url + "/hooks/catch", leads(50), max_workers=8)
+    finally:
+        stub.shutdown()
+    assert [report["email"] for report in reports] == [f"lead{i}@ing.com" for i in range(50)]
+    assert all(report["success"] and report["status"] == 200 for report in reports)
+    assert len(stub.received) == 50
+
+
+def test_send_leads_retries_transient_errors():
+    stub = start_zapier_stub(failure_rate=0.3, seed=1)
+    try:
+        reports = zapier.send_leads(stub.url, leads(40), max_retries=10)
+    finally:
+        stub.shutdown()
+    assert all(report["success"] for report in reports)
+    assert any(report["attempts"] > 1 for report in reports)
+    assert len(stub.received) == 40
+
+
+def test_send_to_zapier_reports_failure_after_retries():
+    stub = start_zapier_stub(failure_rate=1.0)
+    try:
+        report = zapier.send_to_zapier(zapier.make_session(), stub.url, leads(1)[0], max_retries=2)
+    finally:
+        stub.shutdown()
+    assert (report["success"], report["status"], report["attempts"]) == (False, 503, 3)
+
+
+def test_send_to_zapier_reports_connection_errors():
+    report = zapier.send_to_zapier(zapier.make_session(), "http://127.0.0.1:9", leads(1)[0], timeout=1, max_retries=0)
+    assert report["success"] is False and report["status"] is None and report["error"]
+
+
+class RaisingSession:
+    def __init__(self, error):
+        self.error = error
+        self.posts = 0
+
+    def post(self, url, json=None, timeout=None):
+        self.posts += 1
+        raise self.error
+
+
+def test_send_to_zapier_does_not_resend_after_a_read_timeout():
+    session = RaisingSession(zapier.requests.ReadTimeout("read timed out"))
+    report = zapier.send_to_zapier(session, "http://zapier.invalid", leads(1)[0], max_retries=3)
+    assert session.posts == 1
+    assert (report["success"], report["attempts"]) == (False, 1)
+
+
+def test_send_to_zapier_retries_connect_failures():
+    session = RaisingSession(zapier.requests.ConnectTimeout("connect timed out"))
+    report = zapier.send_to_zapier(session, "http://zapier.invalid", leads(1)[0], max_retries=3)
+    assert session.posts == 4
+    assert report["success"] is False
+
+
+def test_lead_payloads_maps_columns_and_nulls():
+    df = pd.DataFrame([{column: "x" for column in zapier.PAYLOAD_COLUMNS} | {"LinkedIn URL": None}])
+    [payload] = zapier.lead_payloads(df)
+    assert set(payload) == set(zapier.PAYLOAD_COLUMNS.values())
+    assert payload["linkedin_url"] is None
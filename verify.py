@@ -0,0 +1,51 @@
+import pandas as pd
+
+# Hunter's domain-search confidence (0-100) at or above which an address is
+# trusted without spending a verification.
+MIN_CONFIDENCE = 90
+# Verifier statuses that keep a lead out of messages, exports and Zapier.
+# "accept_all" and "unknown" cannot be settled either way and are kept.
+REJECTED_STATUSES = ("invalid", "disposable")
+
+
+def emails_to_verify(qualified, min_confidence=MIN_CONFIDENCE):
+    # Distinct addresses that need a verifier call: everything below
+    # min_confidence (or without a score) that Hunter has not already
+    # rejected in the search payload.
+    confidence = pd.to_numeric(qualified["Confidence"], errors="coerce")
+    needed = ~(confidence >= min_confidence) & ~qualified["Verification"].isin(REJECTED_STATUSES)
+    return list(dict.fromkeys(qualified.loc[needed.to_numpy(), "Email"].dropna()))
+
+
+def apply_verdicts(qualified, statuses, errors=0):
+    # Writes the verifier statuses (email -> status) into the Verification
+    # column and drops rejected leads. Returns (kept_frame, stats).
+    verified = qualified["Email"].map(statuses)
+    status = verified.where(verified.notna(), qualified["Verification"]).astype(object)
+    qualified = qualified.assign(Verification=status.where(status.notna(), None))
+    rejected = qualified["Verification"].isin(REJECTED_STATUSES)
+    stats = {
+        "leads": len(qualified),
+        "verified": int(verified.notna().sum()),
+        "unchecked": int((verified.isna() & ~rejected).sum()),
+        "rejected": int(rejected.sum()),
+        "errors": errors,
+    }
+    return qualified[~rejected.to_numpy()].reset_index(drop=True), stats
+
+
+def verify_leads(qualified, verify, min_confidence=MIN_CONFIDENCE, on_result=None):
+    # verify(emails) yields (email, verdict, error), e.g. a partial of
+    # hunter.verify_emails. A failed check keeps the lead; the verifier
+    # deciding against it is the only way one is dropped.
+    # on_result(email, status, error) is called as each address finishes.
+    statuses = {}
+    errors = 0
+    for email, verdict, error in verify(emails_to_verify(qualified, min_confidence)):
+        if error:
+            errors += 1
+        else:
+            statuses[email] = verdict.get("status")
+        if on_result:
+            on_result(email, statuses.get(email), error)
+    return apply_verdicts(qualified, statuses, errors)
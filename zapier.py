@@ -0,0 +1,90 @@
+import random
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from metrics import METRICS
+
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+REQUEST_TIMEOUT = 10
+MAX_RETRIES = 3
+PAYLOAD_COLUMNS = {
+    "First Name": "first_name",
+    "Last Name": "last_name",
+    "Email": "email",
+    "Job Title": "job_title",
+    "Company": "company",
+    "LinkedIn URL": "linkedin_url",
+    "Personalized Message": "message",
+    "Company Domain": "domain"
+}
+
+
+def make_session(pool_size=8):
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    return session
+
+
+def lead_payloads(df):
+    payloads = df[list(PAYLOAD_COLUMNS)].rename(columns=PAYLOAD_COLUMNS).astype(object)
+    return payloads.where(payloads.notna(), None).to_dict("records")
+
+
+def _retry_delay(response, attempt):
+    retry_after = response.headers.get("Retry-After") if response is not None else None
+    try:
+        return max(float(retry_after), 0.1)
+    except (TypeError, ValueError):
+        return min(0.5 * 2 ** attempt, 10) + random.uniform(0, 0.25)
+
+
+def send_to_zapier(session, url, lead, timeout=REQUEST_TIMEOUT, max_retries=MAX_RETRIES):
+    # Returns a delivery report for one lead; never raises.
+    start = time.monotonic()
+    status = None
+    error = None
+    attempt = 0
+    while True:
+        response = None
+        retryable = False
+        try:
+            with METRICS.timer("zapier_request_seconds"):
+                response = session.post(url, json=lead, timeout=timeout)
+            status = response.status_code
+            error = None if 200 <= status < 300 else response.text[:200]
+            retryable = status in RETRY_STATUSES
+        except requests.RequestException as e:
+            status = None
+            error = str(e)
+            # Only connect-phase failures (ConnectionError, which includes
+            # ConnectTimeout) are sent again. After a read timeout the hook
+            # may already have created the lead, so that is reported as failed.
+            retryable = isinstance(e, requests.ConnectionError)
+        METRICS.inc("zapier_requests_total", status=status or "error")
+        if error is None or not retryable or attempt >= max_retries:
+            break
+        METRICS.inc("zapier_retries_total")
+        time.sleep(_retry_delay(response, attempt))
+        attempt += 1
+    METRICS.inc("zapier_leads_total", result="sent" if error is None else "failed")
+    return {
+        "email": lead.get("email"),
+        "success": error is None,
+        "status": status,
+        "attempts": attempt + 1,
+        "latency_s": round(time.monotonic() - start, 3),
+        "error": error,
+    }
+
+
+def send_leads(url, leads, max_workers=8, timeout=REQUEST_TIMEOUT, max_retries=MAX_RETRIES, session=None):
+    # Posts every lead with up to max_workers requests in flight over one
+    # pooled session. Reports come back in input order.
+    session = session or make_session(max_workers)
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        return list(executor.map(lambda lead: send_to_zapier(session, url, lead, timeout, max_retries), leads))